@@ -0,0 +1,157 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .db_router import primary_pinned
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Склейка одинаковых запросов: пока ключ вычисляется, остальные запросы с тем же ключом
+    ждут того же результата, а после вычисления результат отдается еще REQUEST_COALESCING_TTL секунд.
+    С REQUEST_COALESCING_BACKEND вычисление делится и между процессами через блокировку в общем кэше
+    """
+    key_prefix = 'coalesce:'
+
+    def __init__(self):
+        self._inflight = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        # Вычислено, присоединились к идущему вычислению, отдано из TTL
+        self.computed = 0
+        self.joined = 0
+        self.hits = 0
+
+    @property
+    def ttl(self) -> float:
+        return getattr(settings, 'REQUEST_COALESCING_TTL', 1.0)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'REQUEST_COALESCING_BACKEND', None)
+        return caches[alias] if alias else None
+
+    async def run(self, key: str, compute, cacheable=lambda value: True):
+        """
+        Результат await compute() для key, одно вычисление на все одновременные запросы.
+        cacheable(value) решает, можно ли отдавать результат после завершения вычисления
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                # concurrent.futures.Future, а не asyncio: под WSGI у каждого запроса свой event loop
+                future = self._inflight[key] = Future()
+                self.computed += 1
+            else:
+                self.joined += 1
+
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        # Вычисление - отдельная задача: отмена запроса-лидера не обрывает его для остальных
+        task = asyncio.ensure_future(self._compute(key, compute, cacheable, future))
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute, cacheable, future):
+        try:
+            value = await self._compute_shared(key, compute, cacheable)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            now = time.monotonic()
+            if self.ttl > 0 and cacheable(value):
+                # Заодно вычищаем протухшие результаты, чтобы словарь не рос с числом разных ключей
+                for stale_key in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                    del self._results[stale_key]
+                self._results[key] = (now + self.ttl, value)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    async def _compute_shared(self, key, compute, cacheable):
+        shared = self.shared
+        if shared is None or self.ttl <= 0:
+            return await compute()
+
+        result_key = f'{self.key_prefix}{key}'
+        lock_key = f'{self.key_prefix}lock:{key}'
+        lock_timeout = getattr(settings, 'REQUEST_COALESCING_LOCK_TIMEOUT', 10)
+
+        value = await shared.aget(result_key)
+        if value is not None:
+            return value
+
+        if await shared.aadd(lock_key, 1, timeout=lock_timeout):
+            try:
+                value = await compute()
+                if cacheable(value):
+                    await shared.aset(result_key, value, timeout=self.ttl)
+                return value
+            finally:
+                await shared.adelete(lock_key)
+
+        # Ключ вычисляет другой процесс: ждем его результат, но не дольше блокировки
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+            value = await shared.aget(result_key)
+            if value is not None:
+                return value
+            if await shared.aget(lock_key) is None:
+                break
+        logger.info('Computing %s without coalescing: no shared result', key)
+        return await compute()
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+        self.computed = 0
+        self.joined = 0
+        self.hits = 0
+
+
+single_flight = SingleFlight()
+
+
+def coalesce_requests(view):
+    """
+    Склеивает одновременные одинаковые GET к async-view: ключ - путь и отсортированные параметры запроса.
+    Повторно отдаются только ответы 200. Клиент в окне read-your-writes получает свежий ответ
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if primary_pinned():
+            return await view(request, *args, **kwargs)
+
+        params = sorted((name, value) for name, values in request.GET.lists() for value in values)
+        key = f'{request.path}?{urlencode(params)}'
+
+        async def render():
+            response = await view(request, *args, **kwargs)
+            return response.status_code, response['Content-Type'], response.content
+
+        status_code, content_type, content = await single_flight.run(
+            key, render, cacheable=lambda value: value[0] == 200
+        )
+        return HttpResponse(content, status=status_code, content_type=content_type)
+
+    return wrapper
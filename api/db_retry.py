@@ -0,0 +1,55 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE конфликтов, после которых транзакцию можно безопасно повторить целиком:
+# serialization_failure, deadlock_detected, lock_not_available
+RETRYABLE_SQLSTATES = {'40001', '40P01', '55P03'}
+
+
+class WriteConflict(OperationalError):
+    """
+    Конфликт, который обнаружил сам сервис: например, id занял параллельный запрос
+    между проверкой и вставкой. Повтор транзакции увидит чужую строку
+    """
+
+
+def is_conflict(error: OperationalError) -> bool:
+    """
+    Конфликт параллельных транзакций: в PostgreSQL - по SQLSTATE, в SQLite - блокировка базы или таблицы
+    """
+    if isinstance(error, WriteConflict):
+        return True
+    cause = error.__cause__
+    sqlstate = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    if sqlstate is not None:
+        return sqlstate in RETRYABLE_SQLSTATES
+    return 'locked' in str(error)
+
+
+def retry_on_conflict(func):
+    """
+    Повторяет транзакцию func при конфликте с параллельной транзакцией.
+    Ставится над transaction.atomic: повторять можно только транзакцию целиком,
+    поэтому внутри внешней транзакции ошибка пробрасывается сразу
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = getattr(settings, 'DB_CONFLICT_RETRIES', 3)
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == attempts or connection.in_atomic_block or not is_conflict(e):
+                    raise
+                logger.info('Retrying %s after conflict (attempt %s): %s', func.__qualname__, attempt, e)
+                # Случайная пауза, чтобы конфликтующие транзакции не столкнулись снова
+                time.sleep(random.uniform(0, min(0.01 * 2 ** attempt, 0.2)))
+
+    return wrapper
@@ -0,0 +1,94 @@
+import functools
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Чтение внутри read_from_replica, признак того, что клиент недавно писал,
+# и реплика, выбранная для текущего запроса
+_replica_allowed = ContextVar('replica_allowed', default=False)
+_primary_pinned = ContextVar('primary_pinned', default=False)
+_chosen_replica = ContextVar('chosen_replica', default=None)
+
+
+def read_from_replica(func):
+    """
+    Разрешает роутеру отправлять чтения func на реплику.
+    Поддерживает и синхронные, и async-методы сервисов
+    """
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _replica_allowed.set(True)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _replica_allowed.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _replica_allowed.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _replica_allowed.reset(token)
+
+    return wrapper
+
+
+def pin_to_primary(pinned: bool = True):
+    """
+    Все чтения текущего контекста идут в основную БД (read-your-writes), возвращает токен для сброса.
+    Заодно сбрасывает выбранную реплику: следующий запрос выбирает ее заново
+    """
+    return _primary_pinned.set(pinned), _chosen_replica.set(None)
+
+
+def primary_pinned() -> bool:
+    """
+    Текущий запрос в окне read-your-writes после записи клиента
+    """
+    return _primary_pinned.get()
+
+
+def unpin(token):
+    pinned_token, replica_token = token
+    _chosen_replica.reset(replica_token)
+    _primary_pinned.reset(pinned_token)
+
+
+class ReplicaRouter:
+    """
+    Отправляет чтения из методов с read_from_replica на одну из реплик DATABASE_REPLICAS.
+    Все остальное, записи, чтения внутри транзакции и чтения клиента в окне
+    REPLICA_PIN_SECONDS после его записи идут в default
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or not _replica_allowed.get() or _primary_pinned.get():
+            return None
+        # Внутри транзакции реплика может не видеть ее же незакоммиченных изменений
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        # Все чтения запроса идут в одну реплику: версия для ETag и сами данные
+        # читаются из одного снимка, и данные не бывают старше версии
+        alias = _chosen_replica.get()
+        if alias not in replicas:
+            alias = random.choice(replicas)
+            _chosen_replica.set(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них можно связывать между собой
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in getattr(settings, 'DATABASE_REPLICAS', [])
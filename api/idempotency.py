@@ -0,0 +1,182 @@
+import functools
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Клиентские ошибки, которые определяются самим запросом и повторяются так же: их ответ сохраняется.
+# Остальные (405, 401/403, 429...) зависят не от тела запроса, ключ после них освобождается
+REPLAYABLE_CLIENT_ERRORS = frozenset({400, 404, 409, 422})
+
+
+def _error(code: str, message: str, status: int) -> JsonResponse:
+    return JsonResponse({
+        'error': {
+            'code': code,
+            'message': message
+        }
+    }, status=status)
+
+
+def _lease_seconds() -> int:
+    return getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 30)
+
+
+class LeaseRenewer:
+    """
+    Продлевает аренду ключей выполняющихся запросов процесса: фоновый поток раз в треть
+    IDEMPOTENCY_LEASE_SECONDS обновляет lease_until всех своих ключей одним UPDATE.
+    Пока процесс жив, его запросы не теряют ключи, как бы долго они ни выполнялись
+    """
+
+    def __init__(self):
+        # owner -> ключ, который он занимает
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, key: str, owner: str):
+        with self._lock:
+            self._keys[owner] = key
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='idempotency-lease', daemon=True)
+                self._thread.start()
+
+    def discard(self, owner: str):
+        with self._lock:
+            self._keys.pop(owner, None)
+
+    def renew(self) -> int:
+        """
+        Продлевает аренду всех выполняющихся запросов процесса, возвращает число продленных ключей
+        """
+        with self._lock:
+            keys = dict(self._keys)
+        if not keys:
+            return 0
+        # Поиск по первичному ключу, owner отсекает ключи, которые уже забрал другой запрос
+        return IdempotencyKey.objects.filter(
+            key__in=keys.values(), owner__in=keys, status_code__isnull=True
+        ).update(
+            lease_until=timezone.now() + timedelta(seconds=_lease_seconds())
+        )
+
+    def _run(self):
+        while True:
+            time.sleep(_lease_seconds() / 3)
+            with self._lock:
+                if not self._keys:
+                    self._thread = None
+                    return
+            try:
+                self.renew()
+            except Exception:
+                logger.exception('Failed to renew idempotency key leases')
+            finally:
+                # Поток живет дольше запросов, соединения с БД закрываем сами
+                connections.close_all()
+
+
+lease_renewer = LeaseRenewer()
+
+
+def _reserve(key: str, fingerprint: str, owner: str) -> bool:
+    """
+    Занимает ключ под выполняющийся запрос owner. Протухший ответ и истекшая аренда
+    (воркер упал и перестал ее продлевать) освобождают ключ, False - ключ занят живым запросом
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+    lease_until = now + timedelta(seconds=_lease_seconds())
+    IdempotencyKey.objects.filter(key=key, created_at__lt=expired).delete()
+    if IdempotencyKey.objects.filter(key=key, status_code__isnull=True, lease_until__lt=now).update(
+        fingerprint=fingerprint, owner=owner, lease_until=lease_until, created_at=now
+    ):
+        return True
+
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, fingerprint=fingerprint, owner=owner, lease_until=lease_until)
+        return True
+    except IntegrityError:
+        return False
+
+
+def _replay(record: IdempotencyKey) -> HttpResponse:
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Idempotency-Key для POST-эндпоинтов: первый запрос выполняется и его ответ сохраняется
+    на IDEMPOTENCY_KEY_TTL секунд, повтор с тем же ключом и телом получает сохраненный ответ
+    одним SELECT по первичному ключу, без сервисов и блокировок.
+    Сохраняются только ответы 2xx и REPLAYABLE_CLIENT_ERRORS, после остальных запрос можно повторить
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        if not key or len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return _error('VALIDATION_ERROR', f'{IDEMPOTENCY_HEADER} must be 1-255 characters', 400)
+
+        fingerprint = hashlib.sha256(
+            b'\n'.join([request.method.encode(), request.path.encode(), request.body])
+        ).hexdigest()
+        ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None and record.created_at >= timezone.now() - ttl:
+            if record.fingerprint != fingerprint:
+                return _error(
+                    'IDEMPOTENCY_KEY_REUSED', f'{IDEMPOTENCY_HEADER} was already used for another request', 422
+                )
+            if record.status_code is not None:
+                return _replay(record)
+
+        owner = uuid.uuid4().hex
+        if not _reserve(key, fingerprint, owner):
+            return _error('IDEMPOTENCY_IN_PROGRESS', f'Request with this {IDEMPOTENCY_HEADER} is in progress', 409)
+
+        # Запись ключа ограничена owner: если аренду все же забрали, чужой результат не перезаписывается
+        reservation = IdempotencyKey.objects.filter(key=key, owner=owner, status_code__isnull=True)
+        lease_renewer.add(key, owner)
+        try:
+            response = view(request, *args, **kwargs)
+            # Ответ DRF рендерится лениво, а сохранить нужно уже готовые байты
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        except BaseException:
+            reservation.delete()
+            raise
+        finally:
+            lease_renewer.discard(owner)
+
+        if 200 <= response.status_code < 300 or response.status_code in REPLAYABLE_CLIENT_ERRORS:
+            reservation.update(
+                status_code=response.status_code,
+                content_type=response.get('Content-Type', ''),
+                body=response.content
+            )
+        else:
+            reservation.delete()
+        return response
+
+    return wrapper
@@ -0,0 +1,153 @@
+import functools
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+
+from . import slow_queries, tracing
+from .metrics import DB_QUERY_SECONDS
+
+# Счетчики текущего запроса (None - запрос не измеряется) и метод сервиса, выполняющий запросы к БД
+_request_stats = ContextVar('request_stats', default=None)
+_current_service = ContextVar('current_service', default=None)
+
+# Запросы к БД вне методов сервисов: view, middleware, проверка версий
+UNATTRIBUTED = 'view'
+
+
+class RequestStats:
+    """
+    Число SQL-запросов и время БД за запрос, в целом и по методам сервисов
+    """
+    __slots__ = ('queries', 'db_time', 'services')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        # имя метода -> [число запросов, время БД]
+        self.services = {}
+
+    def record(self, service: str, duration: float):
+        self.queries += 1
+        self.db_time += duration
+        totals = self.services.get(service)
+        if totals is None:
+            self.services[service] = [1, duration]
+        else:
+            totals[0] += 1
+            totals[1] += duration
+
+
+def start_request():
+    """
+    Начинает учет запросов к БД в текущем контексте, возвращает счетчики и токен для finish_request
+    """
+    stats = RequestStats()
+    return stats, _request_stats.set(stats)
+
+
+def finish_request(token):
+    _request_stats.reset(token)
+
+
+def query_timer(execute, sql, params, many, context):
+    """
+    execute_wrapper соединения: счетчики измеряемого запроса, span трассы и журнал медленных запросов
+    (в том числе из фоновых задач). Когда выключено все - проверки двух ContextVar и настройки
+    """
+    stats = _request_stats.get()
+    span = tracing.current_span()
+    slow_threshold = slow_queries.threshold()
+    if stats is None and span is None and slow_threshold is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        service = _current_service.get() or UNATTRIBUTED
+        alias = context['connection'].alias
+        if stats is not None:
+            stats.record(service, duration)
+            DB_QUERY_SECONDS.observe(duration, alias)
+        if span is not None:
+            tracing.record_query(span, alias, sql, started, duration)
+        if slow_threshold is not None and duration >= slow_threshold:
+            slow_queries.slow_query_log.record(alias, sql, params, many, duration, service)
+
+
+def install_query_timer(connection):
+    # connection_created приходит при каждом переподключении одного и того же DatabaseWrapper
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def _attributed(label: str, func):
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token = _current_service.set(label)
+            span = tracing.enter_span(label)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                tracing.exit_span(span)
+                _current_service.reset(token)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_service.set(label)
+        span = tracing.enter_span(label)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            tracing.exit_span(span)
+            _current_service.reset(token)
+
+    return wrapper
+
+
+def _traced(label: str, func):
+    # Только span трассы: запросы внутренних методов учитываются на вызвавший их публичный метод
+    if iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            span = tracing.enter_span(label)
+            if span is None:
+                return await func(*args, **kwargs)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                tracing.exit_span(span)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        span = tracing.enter_span(label)
+        if span is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            tracing.exit_span(span)
+
+    return wrapper
+
+
+def instrument_service(cls):
+    """
+    Декоратор класса сервиса: запросы к БД из его публичных classmethod-ов
+    записываются на 'Класс.метод' (вложенный вызов - на внутренний метод).
+    Метка ставится и вне измеряемого запроса - для журнала медленных запросов фоновых задач.
+    Все classmethod-ы, включая внутренние, открывают span трассы запроса
+    """
+    for name, attr in list(vars(cls).items()):
+        if not isinstance(attr, classmethod) or name.startswith('__'):
+            continue
+        wrap = _traced if name.startswith('_') else _attributed
+        setattr(cls, name, classmethod(wrap(f'{cls.__name__}.{name}', attr.__func__)))
+    return cls
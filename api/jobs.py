@@ -0,0 +1,46 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'JOBS_MAX_WORKERS', 2),
+                    thread_name_prefix='jobs'
+                )
+    return _executor
+
+
+def _run(func, *args):
+    # Поток пула живет дольше запроса, поэтому соединения с БД закрываем сами
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background job %s failed', args)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args):
+    """
+    Запускает func(*args) в пуле фоновых потоков после коммита текущей транзакции.
+    При JOBS_RUN_EAGERLY выполняет сразу в текущем потоке (для тестов)
+    """
+    if getattr(settings, 'JOBS_RUN_EAGERLY', False):
+        func(*args)
+        return
+
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, *args))
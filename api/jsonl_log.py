@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlLog:
+    """
+    Строки JSON в файл с ротацией по размеру. Подготовка (prepare) и запись идут в отдельном потоке,
+    вызывающий код ждет только постановки в очередь. Сверх <prefix>_MAX_PENDING ожидающих записей
+    новые отбрасываются. Настройки: <prefix>_LOG_FILE, <prefix>_LOG_MAX_BYTES, <prefix>_LOG_BACKUP_COUNT
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._executor = None
+        self._handler = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.dropped = 0
+
+    def _setting(self, name: str):
+        return getattr(settings, f'{self.prefix}_{name}')
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix=self.prefix.lower().replace('_', '-')
+                    )
+        return self._executor
+
+    def _get_handler(self) -> RotatingFileHandler:
+        path = os.path.abspath(str(self._setting('LOG_FILE')))
+        if self._handler is None or self._handler.baseFilename != path:
+            if self._handler is not None:
+                self._handler.close()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._handler = RotatingFileHandler(
+                path,
+                maxBytes=self._setting('LOG_MAX_BYTES'),
+                backupCount=self._setting('LOG_BACKUP_COUNT'),
+                encoding='utf-8',
+                delay=True
+            )
+        return self._handler
+
+    def prepare(self, entry):
+        """
+        Превращает entry в словарь для записи, выполняется в потоке записи
+        """
+        return entry
+
+    def submit(self, entry):
+        """
+        Ставит entry в очередь записи, возвращает Future записи или None, если запись отброшена
+        """
+        with self._lock:
+            if self._pending >= self._setting('MAX_PENDING'):
+                self.dropped += 1
+                return None
+            self._pending += 1
+        return self._get_executor().submit(self._write, entry)
+
+    def _write(self, entry):
+        try:
+            line = json.dumps(self.prepare(entry), ensure_ascii=False, default=str)
+            with self._lock:
+                handler = self._get_handler()
+            handler.handle(logging.makeLogRecord({'msg': line, 'levelno': logging.INFO}))
+        except Exception:
+            logger.exception('Failed to write %s record', self.prefix)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def flush(self):
+        """
+        Ждет записи всех уже поставленных в очередь записей
+        """
+        self._get_executor().submit(lambda: None).result()
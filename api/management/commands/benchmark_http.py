@@ -0,0 +1,82 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает читающие эндпоинты запущенного сервера и печатает requests/sec и перцентили задержки. '
+        'Для сравнения WSGI и ASGI запускается дважды - против gunicorn и против uvicorn'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8080', help='Адрес запущенного сервера')
+        parser.add_argument('--requests', type=int, default=2000, help='Число запросов на эндпоинт')
+        parser.add_argument('--concurrency', type=int, default=32, help='Число параллельных клиентов')
+        parser.add_argument('--team', default='bench-team-0', help='team_name для /team/get и /statistic')
+        parser.add_argument('--user', default=None, help='user_id для /users/getReview, по умолчанию - участник --team')
+        parser.add_argument('--timeout', type=float, default=10, help='Таймаут запроса, с')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        user_id = options['user'] or (
+            User.objects.filter(team__name=options['team']).order_by('id').values_list('id', flat=True).first()
+        )
+        if user_id is None:
+            raise CommandError(f"Team '{options['team']}' has no members, pass --user or seed the database")
+        endpoints = {
+            '/health': {},
+            '/team/get': {'team_name': options['team']},
+            '/users/getReview': {'user_id': user_id},
+            '/statistic': {'team': options['team'], 'limit': 100},
+        }
+
+        self.stdout.write(
+            f"{'endpoint':<20} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+        )
+        for path, params in endpoints.items():
+            url = f'{base_url}{path}?{urlencode(params)}' if params else f'{base_url}{path}'
+            self._check(url, options['timeout'])
+            rps, p50, p99, errors = self._load(url, options['requests'], options['concurrency'], options['timeout'])
+            self.stdout.write(f'{path:<20} {rps:>9.1f} {p50:>9.2f} {p99:>9.2f} {errors:>7}')
+
+    @staticmethod
+    def _check(url: str, timeout: float):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            raise CommandError(f'{url} answered {e.code}, seed the database first (benchmark_query_plans --seed)')
+        except urllib.error.URLError as e:
+            raise CommandError(f'{url} is unreachable: {e.reason}')
+
+    @staticmethod
+    def _load(url: str, requests_count: int, concurrency: int, timeout: float) -> tuple:
+        def request(_):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, TimeoutError):
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(request, range(requests_count)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        errors = sum(1 for _, ok in results if not ok)
+        return requests_count / elapsed, percentile(0.50), percentile(0.99), errors
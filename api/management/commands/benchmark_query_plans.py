@@ -0,0 +1,138 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import Team, User, PullRequest
+from api.services import StatsService
+
+# Индексы горячих запросов, которые снимаются для замера "до":
+# pr_status_created_id_idx из миграции 0002, остальные из 0003_hot_query_indexes
+HOT_INDEXES = [
+    'users_team_active_idx',
+    'pr_status_created_id_idx',
+    'pr_open_idx',
+    'pr_reviewers_user_pr_idx',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы горячих запросов services.py без индексов и с индексами из миграций. '
+        'Запускать на отдельной БД: с --seed заполняет ее синтетическими данными'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Заполнить БД синтетическими данными')
+        parser.add_argument('--prs', type=int, default=1_000_000, help='Число PR при заполнении')
+        parser.add_argument('--teams', type=int, default=100, help='Число команд при заполнении')
+        parser.add_argument('--team-size', type=int, default=20, help='Размер команды при заполнении')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Размер пачки bulk_create')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self._seed(options['prs'], options['teams'], options['team_size'], options['batch_size'])
+
+        team = Team.objects.filter(members__isnull=False).order_by('id').first()
+        if team is None:
+            raise CommandError('Database is empty, run with --seed')
+        queries = self._hot_queries(team)
+
+        # Замер "до": индексы снимаются внутри транзакции, которая затем откатывается
+        self.stdout.write(self.style.MIGRATE_HEADING('=== Before: hot query indexes dropped ==='))
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index_name in HOT_INDEXES:
+                    cursor.execute(f'DROP INDEX {index_name}')
+            self._explain(queries)
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('=== After: indexes from migrations ==='))
+        self._explain(queries)
+
+    @staticmethod
+    def _hot_queries(team: Team) -> dict:
+        member_ids = list(User.objects.filter(team=team).values_list('id', flat=True))
+        through = PullRequest.reviewers.through
+
+        return {
+            # PullRequestService._assign_reviewers / UserService.load_active_ids
+            'roster lookup': User.objects.filter(team=team, is_active=True).values_list('id', flat=True),
+            # StatsService.get_review_stats?status=OPEN, первая страница
+            'statistic page': (
+                PullRequest.objects.filter(status=PullRequest.Status.OPEN)
+                .order_by('-created_at', '-id').values('id', 'created_at')[:101]
+            ),
+            # TeamService._affected_open_pr_ids для деактивации всей команды
+            'deactivation open PRs': (
+                through.objects.filter(user_id__in=member_ids, pullrequest__status=PullRequest.Status.OPEN)
+                .values_list('pullrequest_id', flat=True)
+            ),
+            # UserService.get_user_review_assignments
+            'review queue': PullRequest.objects.filter(reviewers=member_ids[0]).values('id', 'status'),
+        }
+
+    def _explain(self, queries: dict):
+        explain_options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+
+        for name, queryset in queries.items():
+            started = time.perf_counter()
+            # all() - свежая копия, без кэша результатов предыдущего замера
+            rows = len(list(queryset.all()))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(self.style.SUCCESS(f'--- {name}: {rows} rows, {elapsed_ms:.1f} ms'))
+            self.stdout.write(queryset.explain(**explain_options))
+
+    def _seed(self, prs_count: int, teams_count: int, team_size: int, batch_size: int):
+        self.stdout.write(f'Seeding {teams_count} teams x {team_size} users and {prs_count} PRs...')
+        now = timezone.now()
+
+        Team.objects.bulk_create([Team(name=f'bench-team-{i}') for i in range(teams_count)])
+        teams = list(Team.objects.filter(name__startswith='bench-team-'))
+        User.objects.bulk_create([
+            User(id=f'bench-{team.id}-{i}', username=f'Bench {i}', team=team, is_active=random.random() > 0.1)
+            for team in teams for i in range(team_size)
+        ], batch_size=batch_size)
+        members = [
+            [f'bench-{team.id}-{i}' for i in range(team_size)]
+            for team in teams
+        ]
+
+        through = PullRequest.reviewers.through
+        created_at_field = PullRequest._meta.get_field('created_at')
+        # auto_now_add перезаписал бы распределенные по времени даты создания
+        created_at_field.auto_now_add = False
+        try:
+            for start in range(0, prs_count, batch_size):
+                pull_requests = []
+                assignments = []
+                for i in range(start, min(start + batch_size, prs_count)):
+                    team_members = random.choice(members)
+                    author_id, *reviewer_ids = random.sample(team_members, 3)
+                    created_at = now - timedelta(minutes=prs_count - i)
+                    merged = random.random() < 0.8
+                    pull_requests.append(PullRequest(
+                        id=f'bench-pr-{i}',
+                        name=f'Bench PR {i}',
+                        author_id=author_id,
+                        status=PullRequest.Status.MERGED if merged else PullRequest.Status.OPEN,
+                        created_at=created_at,
+                        merged_at=created_at + timedelta(hours=1) if merged else None
+                    ))
+                    assignments += [through(pullrequest_id=f'bench-pr-{i}', user_id=user_id) for user_id in reviewer_ids]
+
+                with transaction.atomic():
+                    PullRequest.objects.bulk_create(pull_requests)
+                    through.objects.bulk_create(assignments)
+                self.stdout.write(f'  {start + len(pull_requests)} / {prs_count}')
+        finally:
+            created_at_field.auto_now_add = True
+
+        StatsService.rebuild_review_counters()
+        # Свежая статистика планировщика, иначе планы "до" и "после" не сравнимы
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
@@ -0,0 +1,104 @@
+import random
+import threading
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.models import Team, User, PullRequest
+from api.services import PullRequestService
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные записи сервисов (create_pull_request, reassign_reviewer на общих PR, merge_pull_request) '
+        'из N потоков со своими соединениями: операций в секунду по числу воркеров. '
+        'Запускать на отдельной БД: создает команду bench-writes и PR с префиксом bench-w-'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8', help='Числа потоков через запятую')
+        parser.add_argument('--ops', type=int, default=200, help='Операций на поток')
+        parser.add_argument('--team-size', type=int, default=20, help='Размер команды')
+        parser.add_argument('--hot-prs', type=int, default=4, help='Число общих PR, на которых гоняются reassign')
+
+    def handle(self, *args, **options):
+        team, _ = Team.objects.get_or_create(name='bench-writes')
+        member_ids = [f'bench-w-{i}' for i in range(options['team_size'])]
+        for user_id in member_ids:
+            User.objects.update_or_create(
+                id=user_id, defaults={'username': user_id, 'team': team, 'is_active': True}
+            )
+
+        self.stdout.write(f"{'workers':>7} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'domain errors':>14} {'errors':>7}")
+        for workers in [int(value) for value in options['workers'].split(',')]:
+            run = uuid.uuid4().hex[:8]
+            hot_ids = [f'bench-w-{run}-hot-{i}' for i in range(options['hot_prs'])]
+            for index, pr_id in enumerate(hot_ids):
+                PullRequestService.create_pull_request(pr_id, 'Hot', member_ids[index % len(member_ids)])
+            ops_per_second, p50, p99, domain_errors, errors = self._load(
+                run, workers, options['ops'], member_ids, hot_ids
+            )
+            self.stdout.write(f'{workers:>7} {ops_per_second:>9.1f} {p50:>9.2f} {p99:>9.2f} {domain_errors:>14} {errors:>7}')
+
+    @staticmethod
+    def _load(run: str, workers: int, ops: int, member_ids: list, hot_ids: list) -> tuple:
+        barrier = threading.Barrier(workers)
+        latencies = []
+        outcomes = {'domain_errors': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def operation(index: int, i: int):
+            # Каждая третья операция - reassign на общем PR, каждая десятая - merge своего PR
+            if i % 3 == 2:
+                pr_id = random.choice(hot_ids)
+                reviewer_ids = list(
+                    PullRequest.reviewers.through.objects.filter(pullrequest_id=pr_id).values_list('user_id', flat=True)
+                )
+                if reviewer_ids:
+                    PullRequestService.reassign_reviewer(pr_id, random.choice(reviewer_ids))
+                return
+            pr_id = f'bench-w-{run}-{index}-{i}'
+            PullRequestService.create_pull_request(pr_id, 'PR', random.choice(member_ids))
+            if i % 10 == 9:
+                PullRequestService.merge_pull_request(pr_id)
+
+        def worker(index: int):
+            local = []
+            try:
+                barrier.wait()
+                for i in range(ops):
+                    started = time.perf_counter()
+                    try:
+                        operation(index, i)
+                    except ValidationError:
+                        with lock:
+                            outcomes['domain_errors'] += 1
+                    except Exception:
+                        with lock:
+                            outcomes['errors'] += 1
+                    local.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        return (
+            len(latencies) / elapsed, percentile(0.50), percentile(0.99),
+            outcomes['domain_errors'], outcomes['errors']
+        )
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Удаляет сохраненные ответы Idempotency-Key старше IDEMPOTENCY_KEY_TTL'
+
+    def handle(self, *args, **options):
+        expired = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired).delete()
+        self.stdout.write(f'Deleted {deleted} expired idempotency key(s)')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services import StatsService
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики открытых и смерженных ревью пользователей'
+
+    def handle(self, *args, **options):
+        updated = StatsService.rebuild_review_counters()
+        self.stdout.write(f'Rebuilt review counters for {updated} user(s)')
\ No newline at end of file
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services import JobService
+
+
+class Command(BaseCommand):
+    help = 'Перезапускает фоновые задачи, прерванные вместе с процессом'
+
+    def handle(self, *args, **options):
+        job_ids = JobService.resume_stale_jobs()
+        self.stdout.write(f'Resumed {len(job_ids)} job(s)')
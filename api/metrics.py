@@ -0,0 +1,340 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+
+# Границы корзин гистограмм, секунды
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+_registry = []
+
+
+class _Metric:
+    """
+    Метрика с метками. Значения копятся в отдельной копии на каждый поток,
+    поэтому запись идет без блокировок, а /metrics суммирует копии всех потоков
+    """
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards = []
+        # Только регистрация новой копии потока, не запись значений
+        self._shards_lock = threading.Lock()
+        _registry.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _collect(self) -> dict:
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                merged[labels] = self._merge(merged.get(labels), value)
+        return merged
+
+    def clear(self):
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @staticmethod
+    def _merge(total, value):
+        return (total or 0) + value
+
+    def expose(self, values: dict) -> list:
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+                for labels, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        # Счетчики корзин (последняя - +Inf), затем сумма и количество
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    @staticmethod
+    def _merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def expose(self, collected: dict) -> list:
+        lines = []
+        for labels, values in sorted(collected.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(
+                    f'{self.name}_bucket{_labels(self.labelnames + ("le",), labels + (le,))} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(values[-2])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {values[-1]}')
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('route', 'method')
+)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_duration_seconds', 'SQL query latency by database alias', ('alias',), buckets=QUERY_BUCKETS
+)
+DOMAIN_ERRORS = Counter(
+    'pr_domain_errors_total', 'Domain errors of pull request operations by code', ('code',)
+)
+REASSIGNMENTS = Counter(
+    'reviewer_reassignments_total', 'Reviewer replacements performed, by operation', ('operation',)
+)
+
+
+def _snapshot() -> dict:
+    """
+    Значения процесса: метрики реестра, счетчики кэшей и состояние пулов соединений
+    """
+    from .coalescing import single_flight
+    from .response_cache import response_cache
+    from .roster_cache import roster_cache
+
+    pools = {}
+    for alias in connections:
+        # Только уже созданный пул: обращение к DatabaseWrapper.pool создало бы его.
+        # Пул есть только у PostgreSQL с OPTIONS['pool']
+        pool = getattr(type(connections[alias]), '_connection_pools', {}).get(alias)
+        if pool is not None:
+            pools[alias] = pool.get_stats()
+    return {
+        'metrics': {metric.name: metric._collect() for metric in _registry},
+        'caches': {
+            'roster': [roster_cache.hits, roster_cache.misses],
+            'response': [response_cache.hits, response_cache.misses],
+            # Для склейки запросов попадание - ответ без собственного вычисления
+            'coalescing': [single_flight.joined + single_flight.hits, single_flight.computed],
+        },
+        'pools': pools,
+    }
+
+
+def _add(total, value):
+    # Значения счетчиков и гистограмм (списки корзин) складываются поэлементно
+    if total is None:
+        return list(value) if isinstance(value, list) else value
+    return [a + b for a, b in zip(total, value)] if isinstance(value, list) else total + value
+
+
+def _merge(snapshots: list) -> dict:
+    merged = {'metrics': {}, 'caches': {}, 'pools': {}}
+    for snapshot in snapshots:
+        for name, values in snapshot.get('metrics', {}).items():
+            series = merged['metrics'].setdefault(name, {})
+            for labels, value in values.items():
+                series[labels] = _add(series.get(labels), value)
+        for cache, counts in snapshot.get('caches', {}).items():
+            merged['caches'][cache] = _add(merged['caches'].get(cache), counts)
+        for alias, stats in snapshot.get('pools', {}).items():
+            totals = merged['pools'].setdefault(alias, {})
+            for stat, value in stats.items():
+                totals[stat] = totals.get(stat, 0) + value
+    return merged
+
+
+def _dump(snapshot: dict) -> str:
+    return json.dumps({
+        **snapshot,
+        'metrics': {name: [[list(labels), value] for labels, value in values.items()]
+                    for name, values in snapshot['metrics'].items()},
+    })
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding='utf-8') as file:
+        snapshot = json.load(file)
+    snapshot['metrics'] = {name: {tuple(labels): value for labels, value in values}
+                           for name, values in snapshot.get('metrics', {}).items()}
+    return snapshot
+
+
+def _write(path: str, snapshot: dict):
+    # Запись через временный файл: читатель не увидит наполовину записанный снимок
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        file.write(_dump(snapshot))
+    os.replace(temporary, path)
+
+
+class _SnapshotWriter:
+    """
+    При METRICS_MULTIPROCESS_DIR каждый воркер раз в METRICS_SNAPSHOT_SECONDS пишет снимок
+    своих метрик в <pid>.json, а /metrics в любом воркере складывает снимки всех процессов
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @staticmethod
+    def directory():
+        return getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+
+    def write(self):
+        directory = self.directory()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            _write(os.path.join(directory, f'{os.getpid()}.json'), _snapshot())
+
+    def ensure_started(self):
+        # Поток свой у каждого процесса: после fork воркера pid меняется
+        if self._pid == os.getpid() or not self.directory():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='metrics-snapshot', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(getattr(settings, 'METRICS_SNAPSHOT_SECONDS', 5))
+            try:
+                self.write()
+            except OSError:
+                pass
+
+
+snapshot_writer = _SnapshotWriter()
+
+
+def mark_process_dead(pid: int, directory: str):
+    """
+    Хук gunicorn child_exit: счетчики завершившегося воркера переносятся в dead.json,
+    чтобы суммы не уменьшались, а состояние его пулов больше не учитывается
+    """
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    dead_path = os.path.join(directory, 'dead.json')
+    snapshots = [_load(path)] + ([_load(dead_path)] if os.path.exists(dead_path) else [])
+    merged = _merge(snapshots)
+    merged['pools'] = {}
+    _write(dead_path, merged)
+    os.remove(path)
+
+
+def _collect_all() -> dict:
+    directory = snapshot_writer.directory()
+    if not directory:
+        return _snapshot()
+    snapshot_writer.write()
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            try:
+                snapshots.append(_load(os.path.join(directory, name)))
+            except (OSError, ValueError):
+                # Файл удалили или заменили между listdir и чтением
+                pass
+    return _merge(snapshots)
+
+
+def _gauges(data: dict) -> list:
+    """
+    Состояние пулов соединений и доли попаданий в кэши
+    """
+    lines = []
+    pool_stats = data['pools']
+    for name, stat, documentation in [
+        ('db_pool_size', 'pool_size', 'Connections currently managed by the pool'),
+        ('db_pool_available', 'pool_available', 'Idle connections in the pool'),
+        ('db_pool_requests_waiting', 'requests_waiting', 'Requests waiting for a pool connection'),
+    ]:
+        if pool_stats:
+            lines += [f'# HELP {name} {documentation}', f'# TYPE {name} gauge']
+            lines += [f'{name}{{alias="{alias}"}} {stats.get(stat, 0)}' for alias, stats in pool_stats.items()]
+
+    for name, kind, documentation, value in [
+        ('cache_hits_total', 'counter', 'In-process cache hits', lambda hits, misses: hits),
+        ('cache_misses_total', 'counter', 'In-process cache misses', lambda hits, misses: misses),
+        ('cache_hit_ratio', 'gauge', 'In-process cache hit ratio', lambda hits, misses:
+            _number(hits / (hits + misses) if hits + misses else 0.0)),
+    ]:
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{{cache="{cache}"}} {value(*counts)}' for cache, counts in data['caches'].items()]
+    return lines
+
+
+def render() -> str:
+    """
+    Метрики в текстовом формате Prometheus: процесса или, при METRICS_MULTIPROCESS_DIR, сумма по всем воркерам
+    """
+    data = _collect_all()
+    lines = []
+    for metric in _registry:
+        lines += [f'# HELP {metric.name} {metric.documentation}', f'# TYPE {metric.name} {metric.kind}']
+        lines += metric.expose(data['metrics'].get(metric.name, {}))
+    lines += _gauges(data)
+    return '\n'.join(lines) + '\n'
+
+
+def observe_request(request, response, duration: float):
+    if not settings.METRICS_ENABLED:
+        return
+    snapshot_writer.ensure_started()
+    match = request.resolver_match
+    # Для неизвестных путей одна метка, чтобы 404 не плодили ряды
+    route = match.route if match is not None else 'unmatched'
+    HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+    HTTP_REQUEST_SECONDS.observe(duration, route, request.method)
+
+
+def clear():
+    for metric in _registry:
+        metric.clear()
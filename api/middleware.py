@@ -0,0 +1,216 @@
+import cProfile
+import json
+import logging
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics, tracing
+from .db_router import pin_to_primary, unpin
+from .instrumentation import start_request, finish_request
+from .profiling import PROFILE_ID_HEADER, profile_requested, save_profile
+
+logger = logging.getLogger('api.requests')
+
+REPLICA_PIN_COOKIE = 'primary_pin_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _is_pinned(request) -> bool:
+    try:
+        return float(request.COOKIES.get(REPLICA_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _remember_write(request, response):
+    # После записи клиент REPLICA_PIN_SECONDS читает из default, пока реплика догоняет
+    if request.method not in SAFE_METHODS and response.status_code < 500:
+        pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        response.set_cookie(
+            REPLICA_PIN_COOKIE, str(time.time() + pin_seconds),
+            max_age=pin_seconds, httponly=True, samesite='Lax'
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_pin_middleware(get_response):
+    """
+    Read-your-writes для ReplicaRouter: запросы клиента, который недавно писал, читают из default
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = pin_to_primary(_is_pinned(request))
+            try:
+                response = await get_response(request)
+            finally:
+                unpin(token)
+            return _remember_write(request, response)
+    else:
+        def middleware(request):
+            token = pin_to_primary(_is_pinned(request))
+            try:
+                response = get_response(request)
+            finally:
+                unpin(token)
+            return _remember_write(request, response)
+
+    return middleware
+
+
+def _report(request, response, stats, started):
+    """
+    Время запроса в метрики, а при REQUEST_INSTRUMENTATION - Server-Timing и структурированная
+    строка лога: время запроса, число SQL-запросов и время БД всего и по методам сервисов
+    """
+    duration = time.perf_counter() - started
+    metrics.observe_request(request, response, duration)
+    if not settings.REQUEST_INSTRUMENTATION:
+        return response
+
+    total_ms = duration * 1000
+    services = {
+        name: {'queries': queries, 'db_ms': round(db_time * 1000, 2)}
+        for name, (queries, db_time) in sorted(stats.services.items(), key=lambda item: -item[1][1])
+    }
+    timings = [
+        f'total;dur={total_ms:.2f}',
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+    ] + [
+        f'svc.{name};dur={totals["db_ms"]:.2f};desc="{totals["queries"]} queries"'
+        for name, totals in services.items()
+    ]
+    response['Server-Timing'] = ', '.join(timings)
+    if not logger.isEnabledFor(logging.INFO):
+        return response
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'queries': stats.queries,
+        'db_ms': round(stats.db_time * 1000, 2),
+        'services': services,
+    }))
+    return response
+
+
+@sync_and_async_middleware
+def instrumentation_middleware(get_response):
+    """
+    Число SQL-запросов, время БД и методы сервисов, которые их выполнили, для каждого запроса,
+    и метрики запросов для /metrics. Выключается REQUEST_INSTRUMENTATION = False и METRICS_ENABLED = False
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not (settings.REQUEST_INSTRUMENTATION or settings.METRICS_ENABLED):
+                return await get_response(request)
+            started = time.perf_counter()
+            stats, token = start_request()
+            try:
+                response = await get_response(request)
+            finally:
+                finish_request(token)
+            return _report(request, response, stats, started)
+    else:
+        def middleware(request):
+            if not (settings.REQUEST_INSTRUMENTATION or settings.METRICS_ENABLED):
+                return get_response(request)
+            started = time.perf_counter()
+            stats, token = start_request()
+            try:
+                response = get_response(request)
+            finally:
+                finish_request(token)
+            return _report(request, response, stats, started)
+
+    return middleware
+
+
+TRACE_ID_HEADER = 'X-Trace-Id'
+
+
+def _finish_trace(request, response, started):
+    span = started[0]
+    match = request.resolver_match
+    span.name = match.view_name if match is not None else 'unmatched'
+    span.attributes = {'method': request.method, 'path': request.path, 'status': response.status_code}
+    tracing.finish_trace(started)
+    response[TRACE_ID_HEADER] = span.trace.trace_id
+    return response
+
+
+@sync_and_async_middleware
+def tracing_middleware(get_response):
+    """
+    Трасса запроса: вложенные span-ы view, методов сервисов и SQL-запросов пишутся деревом в JSONL.
+    Трассируется доля TRACING_SAMPLE_RATE запросов, но не больше TRACING_MAX_TRACES_PER_SECOND,
+    id трассы - в заголовке X-Trace-Id. Выключается TRACING_ENABLED = False
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = tracing.start_trace('request')
+            if started is None:
+                return await get_response(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                tracing.finish_trace(started)
+                raise
+            return _finish_trace(request, response, started)
+    else:
+        def middleware(request):
+            started = tracing.start_trace('request')
+            if started is None:
+                return get_response(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                tracing.finish_trace(started)
+                raise
+            return _finish_trace(request, response, started)
+
+    return middleware
+
+
+def _profiled(get_response, request):
+    profiler = cProfile.Profile()
+    response = profiler.runcall(get_response, request)
+    response[PROFILE_ID_HEADER] = save_profile(profiler, request, response)
+    return response
+
+
+def _profiled_in_thread(get_response, request):
+    try:
+        return _profiled(async_to_sync(get_response), request)
+    finally:
+        # Поток пула живет дольше запроса, соединения с БД закрываем сами
+        connections.close_all()
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """
+    Профиль cProfile одного запроса по заголовку X-Profile или параметру ?_profile= при PROFILING_ENABLED.
+    Профиль пишется в PROFILING_DIR, его id - в заголовок X-Profile-Id.
+    Запрос без флага проходит после одной проверки настройки
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not (settings.PROFILING_ENABLED and profile_requested(request)):
+                return await get_response(request)
+            # cProfile видит только свой поток. Остаток цепочки запускается из отдельного потока
+            # через async_to_sync: синхронные view и запросы ORM (в том числе из async-view)
+            # asgiref выполняет в потоке, вызвавшем async_to_sync, то есть под профилировщиком
+            return await sync_to_async(_profiled_in_thread, thread_sensitive=False)(get_response, request)
+    else:
+        def middleware(request):
+            if not (settings.PROFILING_ENABLED and profile_requested(request)):
+                return get_response(request)
+            return _profiled(get_response, request)
+
+    return middleware
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:33
+
+import django.db.models.expressions
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_review_counters(apps, schema_editor):
+    # Заполняем счетчики для уже существующих назначений
+    User = apps.get_model('api', 'User')
+    PullRequest = apps.get_model('api', 'PullRequest')
+    through = PullRequest.reviewers.through
+
+    def count_reviews(status):
+        return Coalesce(Subquery(
+            through.objects
+            .filter(user_id=OuterRef('pk'), pullrequest__status=status)
+            .values('user_id')
+            .annotate(reviews=Count('id'))
+            .values('reviews')
+        ), 0)
+
+    User.objects.update(
+        open_reviews=count_reviews('OPEN'),
+        merged_reviews=count_reviews('MERGED')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.CharField(max_length=36, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('BULK_DEACTIVATE', 'Bulk deactivate')], max_length=32)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('payload', models.JSONField(default=dict)),
+                ('cursor', models.CharField(blank=True, default='', max_length=100)),
+                ('total_prs', models.PositiveIntegerField(default=0)),
+                ('processed_prs', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'jobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='review_strategy',
+            field=models.CharField(blank=True, choices=[('random', 'Random'), ('round_robin', 'Round robin'), ('least_loaded', 'Least loaded')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='merged_reviews',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='open_reviews',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_review_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pullrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='pr_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pullrequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='pr_status_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pullrequest',
+            index=models.Index(fields=['merged_at'], name='pr_merged_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(models.F('open_reviews'), '+', models.F('merged_reviews')), descending=True), name='users_reviews_total_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_review_counters_jobs_and_stats_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pullrequest',
+            index=models.Index(condition=models.Q(('status', 'OPEN')), fields=['id'], name='pr_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['team', 'is_active'], name='users_team_active_idx'),
+        ),
+        # Обратный индекс through-таблицы ревьюверов (у автосозданной модели нет Meta.indexes)
+        migrations.RunSQL(
+            'CREATE INDEX pr_reviewers_user_pr_idx ON pull_requests_reviewers (user_id, pullrequest_id)',
+            'DROP INDEX pr_reviewers_user_pr_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('key', models.CharField(max_length=160, primary_key=True, serialize=False)),
+                ('version', models.CharField(max_length=32)),
+            ],
+            options={
+                'db_table': 'version_stamps',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:41
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+
+
+def copy_version_stamps(apps, schema_editor):
+    # Переносим уже выданные версии, чтобы ETag клиентов не сбросились
+    Team = apps.get_model('api', 'Team')
+    User = apps.get_model('api', 'User')
+    VersionStamp = apps.get_model('api', 'VersionStamp')
+
+    def stamp(prefix, field):
+        return Coalesce(Subquery(
+            VersionStamp.objects
+            .filter(key=Concat(Value(prefix), OuterRef(field), output_field=models.CharField()))
+            .values('version')[:1]
+        ), Value(''))
+
+    Team.objects.update(version=stamp('team:', 'name'))
+    User.objects.update(review_version=stamp('user:', 'id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='review_version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.RunPython(copy_version_stamps, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='VersionStamp',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_versions_on_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='lease_until',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='owner',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
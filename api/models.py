@@ -4,7 +4,16 @@ from django.utils import timezone
 
 
 class Team(models.Model):
+    class ReviewStrategy(models.TextChoices):
+        RANDOM = 'random', 'Random'
+        ROUND_ROBIN = 'round_robin', 'Round robin'
+        LEAST_LOADED = 'least_loaded', 'Least loaded'
+
     name = models.CharField(max_length=100, unique=True)
+    # Пустое значение - стратегия по умолчанию из REVIEWER_STRATEGY
+    review_strategy = models.CharField(max_length=20, choices=ReviewStrategy.choices, blank=True, default='')
+    # Версия представления /team/get для ETag, пустая - данные еще не менялись через сервисы
+    version = models.CharField(max_length=32, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -19,6 +28,11 @@ class User(models.Model):
     username = models.CharField(max_length=100)
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='members', null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Денормализованные счетчики назначений ревьювером, пересчет: manage.py rebuild_review_counters
+    open_reviews = models.IntegerField(default=0)
+    merged_reviews = models.IntegerField(default=0)
+    # Версия очереди ревью /users/getReview для ETag, меняется тем же UPDATE, что и счетчики
+    review_version = models.CharField(max_length=32, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -26,6 +40,15 @@ class User(models.Model):
 
     class Meta:
         db_table = 'users'
+        indexes = [
+            # Состав команды: активные участники для назначения ревьюверов
+            models.Index(fields=['team', 'is_active'], name='users_team_active_idx'),
+            # Пользователи с ревью в порядке убывания их числа для /statistic
+            models.Index(
+                (models.F('open_reviews') + models.F('merged_reviews')).desc(),
+                name='users_reviews_total_idx'
+            ),
+        ]
 
 
 class PullRequest(models.Model):
@@ -53,4 +76,76 @@ class PullRequest(models.Model):
         return f"{self.name} ({self.id})"
 
     class Meta:
-        db_table = 'pull_requests'
\ No newline at end of file
+        db_table = 'pull_requests'
+        indexes = [
+            # Keyset-пагинация /statistic по (created_at, id) и фильтры по статусу и времени мержа
+            models.Index(fields=['-created_at', '-id'], name='pr_created_id_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='pr_status_created_id_idx'),
+            models.Index(fields=['merged_at'], name='pr_merged_at_idx'),
+            # Частичный индекс открытых PR: проверка статуса при переназначениях без чтения таблицы
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='OPEN'),
+                name='pr_open_idx'
+            ),
+        ]
+
+
+class Job(models.Model):
+    class Kind(models.TextChoices):
+        BULK_DEACTIVATE = 'BULK_DEACTIVATE', 'Bulk deactivate'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.CharField(max_length=36, primary_key=True)
+    kind = models.CharField(max_length=32, choices=Kind.choices)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    payload = models.JSONField(default=dict)
+    # Курсор по id PR: все PR до него включительно уже обработаны
+    cursor = models.CharField(max_length=100, blank=True, default='')
+    total_prs = models.PositiveIntegerField(default=0)
+    processed_prs = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} ({self.id})"
+
+    class Meta:
+        db_table = 'jobs'
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохраненный ответ POST-запроса с заголовком Idempotency-Key: повтор запроса
+    получает тот же статус и тело без выполнения сервисов
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    # sha256 метода, пути и тела: тот же ключ с другим запросом - ошибка клиента
+    fingerprint = models.CharField(max_length=64)
+    # Пустой статус - запрос с этим ключом еще выполняется
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    body = models.BinaryField(default=b'')
+    # Выполняющий запрос и срок его аренды ключа: запрос продлевает аренду, пока жив,
+    # чужой запрос может забрать ключ только после ее истечения
+    owner = models.CharField(max_length=32, blank=True, default='')
+    lease_until = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        indexes = [
+            # Очистка протухших ключей: manage.py purge_idempotency_keys
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
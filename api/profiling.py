@@ -0,0 +1,45 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import time
+import uuid
+
+from django.conf import settings
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+
+def profile_requested(request) -> bool:
+    """
+    Запрошено ли профилирование: заголовок X-Profile или параметр ?_profile=.
+    При заданном PROFILING_SECRET значение должно с ним совпасть, иначе подойдет любое непустое
+    """
+    flag = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM)
+    if not flag:
+        return False
+    secret = settings.PROFILING_SECRET
+    return not secret or hmac.compare_digest(flag.encode(), secret.encode())
+
+
+def save_profile(profiler: cProfile.Profile, request, response) -> str:
+    """
+    Сохраняет профиль в PROFILING_DIR: <id>.prof для pstats/snakeviz и <id>.txt
+    с PROFILING_TOP_FUNCTIONS самыми дорогими по накопленному времени функциями. Возвращает id
+    """
+    profile_id = f'{time.strftime("%Y%m%dT%H%M%S")}-{uuid.uuid4().hex[:8]}'
+    directory = str(settings.PROFILING_DIR)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, profile_id)
+
+    profiler.dump_stats(f'{path}.prof')
+    summary = io.StringIO()
+    summary.write(f'{request.method} {request.get_full_path()} -> {response.status_code}\n\n')
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.PROFILING_TOP_FUNCTIONS)
+    with open(f'{path}.txt', 'w', encoding='utf-8') as file:
+        file.write(summary.getvalue())
+    return profile_id
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+
+class ResponseCache:
+    """
+    LRU-кэш отрендеренных JSON-ответов: ключ версии (VersionService.team_key/user_key) -> (версия, байты).
+    Ответ отдается только при совпадении версии, поэтому кэш не может вернуть устаревшие данные,
+    а явный сброс из сервисов освобождает место сразу после записи
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self) -> int:
+        return getattr(settings, 'RESPONSE_CACHE_SIZE', 1024)
+
+    def get(self, key: str, version: str):
+        """
+        Байты ответа для key в версии version или None
+        """
+        if self.max_size <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, version: str, content: bytes):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (version, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_on_commit(self, keys):
+        """
+        Сбрасывает ответы сразу и еще раз после коммита, чтобы параллельный
+        запрос не успел закэшировать состояние до коммита
+        """
+        keys = list(keys)
+        self.invalidate(keys)
+        transaction.on_commit(lambda: self.invalidate(keys))
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+response_cache = ResponseCache()
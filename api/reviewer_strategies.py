@@ -0,0 +1,252 @@
+import heapq
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .models import User
+
+
+class ReviewerStrategy:
+    """
+    Стратегия выбора ревьюверов из состава команды.
+    roster - кортеж id активных участников из roster_cache, exclude - id, которых выбирать нельзя
+    """
+    name = None
+
+    def pick(self, team_id, roster: tuple, exclude: set, count: int) -> list:
+        raise NotImplementedError
+
+    def release(self, user_ids):
+        """
+        Уведомление о том, что ревью пользователей закрыты (мерж или переназначение)
+        """
+
+
+class RandomStrategy(ReviewerStrategy):
+    name = 'random'
+
+    def pick(self, team_id, roster: tuple, exclude: set, count: int) -> list:
+        candidates = [user_id for user_id in roster if user_id not in exclude]
+        count = min(count, len(candidates))
+        if count == 0:
+            return []
+        if count == 1:
+            return [random.choice(candidates)]
+        return random.sample(candidates, count)
+
+
+class RoundRobinStrategy(ReviewerStrategy):
+    """
+    Выбирает участников по кругу: курсор команды сдвигается после каждого выбора
+    """
+    name = 'round_robin'
+
+    def __init__(self):
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def pick(self, team_id, roster: tuple, exclude: set, count: int) -> list:
+        if not roster:
+            return []
+
+        selected = []
+        with self._lock:
+            cursor = self._cursors.get(team_id, 0) % len(roster)
+            next_cursor = cursor
+            # Обходим состав не больше одного раза, пропуская исключенных
+            for offset in range(len(roster)):
+                if len(selected) == count:
+                    break
+                user_id = roster[(cursor + offset) % len(roster)]
+                if user_id in exclude:
+                    continue
+                selected.append(user_id)
+                next_cursor = cursor + offset + 1
+            self._cursors[team_id] = next_cursor % len(roster)
+        return selected
+
+
+class LeastLoadedStrategy(ReviewerStrategy):
+    """
+    Выбирает участников с наименьшим числом открытых ревью.
+    Счетчики загружаются из БД один раз на команду и затем поддерживаются в памяти,
+    на каждую команду держится куча (число ревью, id) с ленивым удалением устаревших записей.
+    Изменения видны сразу (пачка PR распределяется равномерно). Внутри undo_on_error они пишутся
+    в журнал потока и возвращаются назад, если блок записи завершился исключением
+    """
+    name = 'least_loaded'
+
+    def __init__(self):
+        self._counts = {}
+        self._heaps = {}
+        self._rosters = {}
+        self._members = {}
+        self._teams_by_user = {}
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def refresh_seconds(self) -> int:
+        return getattr(settings, 'REVIEWER_LOAD_REFRESH_SECONDS', 60)
+
+    @staticmethod
+    def _load_counts(user_ids) -> dict:
+        # Денормализованный счетчик User.open_reviews
+        counts = dict.fromkeys(user_ids, 0)
+        counts.update(User.objects.filter(id__in=list(user_ids)).values_list('id', 'open_reviews'))
+        return counts
+
+    def _ensure_heap(self, team_id, roster: tuple):
+        cached_roster = self._rosters.get(team_id)
+        fresh = time.monotonic() - self._loaded_at.get(team_id, 0) < self.refresh_seconds
+        if fresh and (cached_roster is roster or cached_roster == roster):
+            # Куча разрослась устаревшими записями - перестраиваем из счетчиков
+            if len(self._heaps[team_id]) > 2 * len(roster) + 16:
+                self._rebuild_heap(team_id, roster)
+            return
+
+        self._counts.update(self._load_counts(roster))
+        self._teams_by_user.update(dict.fromkeys(roster, team_id))
+        self._rebuild_heap(team_id, roster)
+        self._rosters[team_id] = roster
+        self._members[team_id] = frozenset(roster)
+        self._loaded_at[team_id] = time.monotonic()
+
+    def _rebuild_heap(self, team_id, roster: tuple):
+        self._heaps[team_id] = [(self._counts[user_id], user_id) for user_id in roster]
+        heapq.heapify(self._heaps[team_id])
+
+    def _shift(self, user_id, delta: int, record: bool = True):
+        # Вызывается под self._lock. Ушедшие из состава (деактивированные, переведенные) не возвращаются
+        # в кучу: при возвращении в состав их счетчик перечитается из БД
+        team_id = self._teams_by_user.get(user_id)
+        if user_id not in self._members.get(team_id, ()) or self._counts[user_id] + delta < 0:
+            return
+        self._counts[user_id] += delta
+        heapq.heappush(self._heaps[team_id], (self._counts[user_id], user_id))
+        journals = getattr(self._local, 'journals', None)
+        if record and journals:
+            journal = journals[-1]
+            journal[user_id] = journal.get(user_id, 0) + delta
+
+    def begin(self):
+        """
+        Открывает журнал изменений счетчиков потока (вложенные блоки - свой журнал на уровень)
+        """
+        self._local.__dict__.setdefault('journals', []).append({})
+
+    def commit(self):
+        """
+        Закрывает журнал: изменения остаются, во вложенном блоке переходят в журнал внешнего
+        """
+        journals = self._local.journals
+        journal = journals.pop()
+        if journals:
+            for user_id, delta in journal.items():
+                journals[-1][user_id] = journals[-1].get(user_id, 0) + delta
+
+    def rollback(self):
+        """
+        Закрывает журнал и возвращает счетчики к состоянию на его открытии
+        """
+        journal = self._local.journals.pop()
+        with self._lock:
+            for user_id, delta in journal.items():
+                self._shift(user_id, -delta, record=False)
+
+    def pick(self, team_id, roster: tuple, exclude: set, count: int) -> list:
+        if not roster:
+            return []
+
+        with self._lock:
+            self._ensure_heap(team_id, roster)
+            heap = self._heaps[team_id]
+            members = self._members[team_id]
+
+            selected = []
+            skipped = []
+            seen = set()
+            while heap and len(selected) < count:
+                open_reviews, user_id = heapq.heappop(heap)
+                # Запись устарела (счетчик с тех пор менялся, участник ушел из состава)
+                # или дублирует уже просмотренную
+                if self._counts.get(user_id) != open_reviews or user_id not in members or user_id in seen:
+                    continue
+                seen.add(user_id)
+                if user_id in exclude:
+                    skipped.append((open_reviews, user_id))
+                    continue
+                selected.append(user_id)
+
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            for user_id in selected:
+                self._shift(user_id, 1)
+        return selected
+
+    def release(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._counts.get(user_id):
+                    self._shift(user_id, -1)
+
+    def is_tracking(self) -> bool:
+        return bool(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._heaps.clear()
+            self._rosters.clear()
+            self._members.clear()
+            self._teams_by_user.clear()
+            self._loaded_at.clear()
+            self._local.journals = []
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (RandomStrategy(), RoundRobinStrategy(), LeastLoadedStrategy())
+}
+
+
+def get_strategy(team=None) -> ReviewerStrategy:
+    """
+    Стратегия команды, а если она не задана - REVIEWER_STRATEGY из настроек
+    """
+    name = getattr(team, 'review_strategy', '') or getattr(settings, 'REVIEWER_STRATEGY', RandomStrategy.name)
+    return STRATEGIES[name]
+
+
+def release(user_ids):
+    """
+    Передает всем стратегиям закрытие ревью пользователей
+    """
+    user_ids = list(user_ids)
+    for strategy in STRATEGIES.values():
+        strategy.release(user_ids)
+
+
+def tracks_load() -> bool:
+    return STRATEGIES[LeastLoadedStrategy.name].is_tracking()
+
+
+@contextmanager
+def undo_on_error():
+    """
+    Блок записи, использующий стратегии (декоратор или with поверх transaction.atomic):
+    если он завершился исключением и транзакция откатилась, счетчики least_loaded
+    в памяти возвращаются назад. При успехе изменения остаются
+    """
+    strategy = STRATEGIES[LeastLoadedStrategy.name]
+    strategy.begin()
+    try:
+        yield
+    except BaseException:
+        strategy.rollback()
+        raise
+    strategy.commit()
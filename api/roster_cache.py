@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class RosterCache:
+    """
+    LRU-кэш составов команд: team_id -> кортеж id активных участников.
+    Сброс доходит только до процесса, который писал, поэтому локальная запись
+    живет не дольше ROSTER_CACHE_LOCAL_TTL секунд. При заданном ROSTER_CACHE_BACKEND составы хранятся в общем кэше Django,
+    чтобы все воркеры видели одни и те же данные (не дольше ROSTER_CACHE_SHARED_TTL секунд).
+    Сброс увеличивает поколение команды: состав, прочитанный из БД до сброса, не сохраняется
+    """
+    key_prefix = 'roster:'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self) -> int:
+        return getattr(settings, 'ROSTER_CACHE_SIZE', 1024)
+
+    @property
+    def shared_ttl(self):
+        return getattr(settings, 'ROSTER_CACHE_SHARED_TTL', 60)
+
+    @property
+    def local_ttl(self):
+        return getattr(settings, 'ROSTER_CACHE_LOCAL_TTL', 5)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'ROSTER_CACHE_BACKEND', None)
+        return caches[alias] if alias else None
+
+    def get_or_load(self, team_id, loader) -> tuple:
+        """
+        Возвращает состав команды из кэша, при промахе загружает его через loader(team_id)
+        """
+        if team_id is None:
+            return ()
+        if self.max_size <= 0:
+            return tuple(loader(team_id))
+
+        shared = self.shared
+        if shared is not None:
+            active_ids = shared.get(f'{self.key_prefix}{team_id}')
+            if active_ids is None:
+                self.misses += 1
+                generation = self._generations.get(team_id, 0)
+                active_ids = tuple(loader(team_id))
+                if self._generations.get(team_id, 0) == generation:
+                    shared.set(f'{self.key_prefix}{team_id}', active_ids, timeout=self.shared_ttl)
+            else:
+                self.hits += 1
+            return active_ids
+
+        with self._lock:
+            active_ids = self._lookup(team_id)
+            if active_ids is not None:
+                self.hits += 1
+                return active_ids
+            generation = self._generations.get(team_id, 0)
+
+        self.misses += 1
+        active_ids = tuple(loader(team_id))
+        with self._lock:
+            # Состав сбросили, пока он читался из БД: прочитанное могло устареть
+            if self._generations.get(team_id, 0) == generation:
+                self._store(team_id, active_ids)
+        return active_ids
+
+    def _lookup(self, team_id):
+        # Вызывается под self._lock. Просроченная запись удаляется: ее могли сбросить в другом процессе
+        entry = self._entries.get(team_id)
+        if entry is None:
+            return None
+        active_ids, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[team_id]
+            return None
+        self._entries.move_to_end(team_id)
+        return active_ids
+
+    def _store(self, team_id, active_ids):
+        # Вызывается под self._lock
+        ttl = self.local_ttl
+        self._entries[team_id] = (active_ids, time.monotonic() + ttl if ttl is not None else None)
+        self._entries.move_to_end(team_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get_many_or_load(self, team_ids, loader) -> dict:
+        """
+        Возвращает составы нескольких команд, промахи загружаются одним вызовом loader(team_ids) -> {team_id: ids}
+        """
+        team_ids = [team_id for team_id in dict.fromkeys(team_ids) if team_id is not None]
+        if not team_ids:
+            return {}
+        if self.max_size <= 0:
+            loaded = loader(team_ids)
+            return {team_id: tuple(loaded.get(team_id, ())) for team_id in team_ids}
+
+        shared = self.shared
+        if shared is not None:
+            found = shared.get_many([f'{self.key_prefix}{team_id}' for team_id in team_ids])
+            rosters = {
+                team_id: found[f'{self.key_prefix}{team_id}']
+                for team_id in team_ids if f'{self.key_prefix}{team_id}' in found
+            }
+        else:
+            with self._lock:
+                rosters = {team_id: self._lookup(team_id) for team_id in team_ids}
+                rosters = {team_id: active_ids for team_id, active_ids in rosters.items() if active_ids is not None}
+
+        missing = [team_id for team_id in team_ids if team_id not in rosters]
+        with self._lock:
+            generations = {team_id: self._generations.get(team_id, 0) for team_id in missing}
+        self.hits += len(rosters)
+        self.misses += len(missing)
+        if not missing:
+            return rosters
+
+        loaded = loader(missing)
+        loaded = {team_id: tuple(loaded.get(team_id, ())) for team_id in missing}
+        rosters.update(loaded)
+
+        with self._lock:
+            fresh = {
+                team_id: active_ids for team_id, active_ids in loaded.items()
+                if self._generations.get(team_id, 0) == generations[team_id]
+            }
+            if shared is None:
+                for team_id, active_ids in fresh.items():
+                    self._store(team_id, active_ids)
+        if shared is not None and fresh:
+            shared.set_many(
+                {f'{self.key_prefix}{team_id}': active_ids for team_id, active_ids in fresh.items()},
+                timeout=self.shared_ttl
+            )
+        return rosters
+
+    def invalidate(self, team_ids):
+        team_ids = [team_id for team_id in set(team_ids) if team_id is not None]
+        if not team_ids:
+            return
+
+        with self._lock:
+            for team_id in team_ids:
+                self._entries.pop(team_id, None)
+                self._generations[team_id] = self._generations.get(team_id, 0) + 1
+
+        shared = self.shared
+        if shared is not None:
+            shared.delete_many([f'{self.key_prefix}{team_id}' for team_id in team_ids])
+
+    def invalidate_on_commit(self, team_ids):
+        """
+        Сбрасывает составы сразу и еще раз после коммита, чтобы параллельный
+        запрос не успел закэшировать состояние до коммита
+        """
+        team_ids = list(team_ids)
+        self.invalidate(team_ids)
+        transaction.on_commit(lambda: self.invalidate(team_ids))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+roster_cache = RosterCache()
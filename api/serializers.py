@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Team, User, PullRequest
+from .models import Team, User, PullRequest, Job
 
 
 class TeamMemberSerializer(serializers.ModelSerializer):
@@ -55,7 +55,7 @@ class PullRequestSerializer(serializers.ModelSerializer):
 class PullRequestShortSerializer(serializers.ModelSerializer):
     pull_request_id = serializers.CharField(source='id')
     pull_request_name = serializers.CharField(source='name')
-    author_id = serializers.CharField(source='author.id')
+    author_id = serializers.CharField()
     status = serializers.CharField()
 
     class Meta:
@@ -74,7 +74,7 @@ class PRReviewerStatsSerializer(serializers.Serializer):
     id = serializers.CharField()
     name = serializers.CharField()
     status = serializers.CharField()
-    team_name = serializers.CharField(source='author.team.name')
+    team_name = serializers.CharField(allow_null=True)
     reviewers_count = serializers.IntegerField()
     created_at = serializers.DateTimeField()
     merged_at = serializers.DateTimeField(allow_null=True)
@@ -82,4 +82,19 @@ class PRReviewerStatsSerializer(serializers.Serializer):
 
 class StatsSerializer(serializers.Serializer):
     user_review_stats = UserReviewStatsSerializer(many=True)
-    pr_reviewer_stats = PRReviewerStatsSerializer(many=True)
\ No newline at end of file
+    pr_reviewer_stats = PRReviewerStatsSerializer(many=True)
+    next_cursor = serializers.CharField(allow_null=True)
+    next_user_cursor = serializers.CharField(allow_null=True)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    job_id = serializers.CharField(source='id')
+    createdAt = serializers.DateTimeField(source='created_at', format='%Y-%m-%dT%H:%M:%SZ')
+    finishedAt = serializers.DateTimeField(source='finished_at', format='%Y-%m-%dT%H:%M:%SZ', allow_null=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            'job_id', 'kind', 'status', 'total_prs', 'processed_prs',
+            'result', 'error', 'createdAt', 'finishedAt'
+        ]
@@ -1,12 +1,42 @@
-import random
-from django.db import transaction
+import base64
+import json
+import uuid
+from asgiref.sync import sync_to_async
+from datetime import datetime, timedelta
+from django.db import transaction, IntegrityError
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.utils import timezone
-from .models import Team, User, PullRequest
-from django.db.models import Count
+from django.utils.dateparse import parse_datetime
+from django.conf import settings
+from .models import Team, User, PullRequest, Job
+from .jobs import submit
+from .db_retry import retry_on_conflict, WriteConflict
+from .db_router import read_from_replica
+from .instrumentation import instrument_service
+from .metrics import DOMAIN_ERRORS, REASSIGNMENTS
+from .roster_cache import roster_cache
+from .response_cache import response_cache
+from . import reviewer_strategies
+from .signals import users_bulk_updated
+from django.db.models import Count, F, Case, When, Value, Subquery, OuterRef, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from django.db import models
 
+# Размер батча для upsert пользователей в /team/add
+USER_UPSERT_BATCH_SIZE = 1000
 
+# Размер страницы /statistic по умолчанию и максимальный
+STATS_DEFAULT_LIMIT = 100
+STATS_MAX_LIMIT = 1000
+
+# Размер пачки серверного курсора в выгрузке /export/pullRequests
+EXPORT_CHUNK_SIZE = 1000
+
+# Максимальный размер пачки в пакетных эндпоинтах /pullRequest/bulk*
+PR_BULK_MAX_ITEMS = 1000
+
+
+@instrument_service
 class TeamService:
     """
     Сервис для управления командами и пользователями
@@ -14,51 +44,71 @@ class TeamService:
 
     @classmethod
     @transaction.atomic
-    def create_team_with_members(cls, team_name: str, members_data: list) -> Team:
+    def create_team_with_members(cls, team_name: str, members_data: list, review_strategy: str = None) -> Team:
         """
-        Создает команду с пользователями
+        Создает команду с пользователями, review_strategy задает стратегию выбора ревьюверов команды
         """
         # Проверяем, существует ли команда
-        team = Team.objects.filter(name=team_name)
-        if team.exists() and len(members_data) == 0:
+        team = Team.objects.filter(name=team_name).first()
+        # Без участников повторный запрос допустим, только если он меняет стратегию команды
+        if team is not None and len(members_data) == 0 and review_strategy in (None, team.review_strategy):
             raise ValidationError('team_name already exists', code='TEAM_EXISTS')
 
-        elif not team.exists():
-            team = Team.objects.create(name=team_name)
-        else:
-            team = team.first()
+        # Новая версия команды пишется вместе со строкой команды, если она и так записывается
+        version = VersionService.new_version()
+        if team is None:
+            team = Team.objects.create(name=team_name, review_strategy=review_strategy or '', version=version)
+        elif review_strategy is not None and team.review_strategy != review_strategy:
+            team.review_strategy = review_strategy
+            team.version = version
+            team.save(update_fields=['review_strategy', 'version'])
         # Создаем/обновляем пользователей и добавляем их в команду
-        for member_data in members_data:
-            cls._create_or_update_user(team, member_data)
+        cls._bulk_upsert_users(team, members_data, version)
 
         return team
 
     @classmethod
-    def _create_or_update_user(cls, team: Team, member_data: dict) -> User:
-        user_id = member_data['user_id']
-        username = member_data['username']
-        is_active = member_data['is_active']
+    def _bulk_upsert_users(cls, team: Team, members_data: list, version: str) -> None:
+        """
+        Создает/обновляет пользователей одним INSERT ... ON CONFLICT на батч,
+        число запросов не зависит от размера списка участников.
+        version - новая версия команды, уже записанная в ее строку, если team.version с ней совпадает
+        """
+        # Повторы user_id схлопываем: побеждает последний, как при поштучном обновлении
+        members_by_id = {member_data['user_id']: member_data for member_data in members_data}
 
-        # Ищем существующего пользователя
-        try:
-            user = User.objects.get(id=user_id)
-            # Обновляем данные пользователя
-            user.username = username
-            user.is_active = is_active
-            user.team = team  # Устанавливаем команду
-            user.save()
-        except User.DoesNotExist:
-            # Создаем нового пользователя
-            user = User.objects.create(
-                id=user_id,
-                username=username,
-                team=team,  # Устанавливаем команду
-                is_active=is_active
+        # Команды, из которых переводятся участники: их составы тоже устаревают
+        previous_teams = dict(
+            User.objects.filter(id__in=list(members_by_id), team__isnull=False).exclude(team=team)
+            .values_list('team_id', 'team__name').distinct()
+        )
+
+        users = [
+            User(
+                id=member_data['user_id'],
+                username=member_data['username'],
+                team=team,
+                is_active=member_data['is_active']
             )
+            for member_data in members_by_id.values()
+        ]
 
-        return user
+        User.objects.bulk_create(
+            users,
+            batch_size=USER_UPSERT_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=['username', 'team', 'is_active']
+        )
+        users_bulk_updated.send(sender=cls, team_ids=set(previous_teams) | {team.id})
+        # Составы команд, из которых ушли участники, тоже изменились
+        VersionService.bump_teams(
+            [*previous_teams, team.id if team.version != version else None], version
+        )
+        VersionService.invalidate(team_names=[*previous_teams.values(), team.name])
 
     @classmethod
+    @read_from_replica
     def get_team_with_members(cls, team_name: str) -> Team:
         try:
             team = Team.objects.prefetch_related('members').get(name=team_name)
@@ -67,6 +117,17 @@ class TeamService:
             raise Team.DoesNotExist(f"Team '{team_name}' not found")
 
     @classmethod
+    @read_from_replica
+    async def aget_team_with_members(cls, team_name: str) -> Team:
+        try:
+            team = await Team.objects.prefetch_related('members').aget(name=team_name)
+            return team
+        except Team.DoesNotExist:
+            raise Team.DoesNotExist(f"Team '{team_name}' not found")
+
+    @classmethod
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
     @transaction.atomic
     def bulk_deactivate_team_members(cls, team_name: str, user_ids: list = None):
         """
@@ -78,87 +139,196 @@ class TeamService:
             raise ObjectDoesNotExist(f"Team '{team_name}' not found")
 
         # Определяем пользователей для деактивации
+        users_to_deactivate = User.objects.filter(team=team)
         if user_ids:
-            users_to_deactivate = User.objects.filter(team=team, id__in=user_ids)
-        else:
-            users_to_deactivate = User.objects.filter(team=team)
+            users_to_deactivate = users_to_deactivate.filter(id__in=user_ids)
 
-        users_to_deactivate = list(users_to_deactivate)
+        deactivating_ids = set(users_to_deactivate.values_list('id', flat=True))
 
-        if not users_to_deactivate:
+        if not deactivating_ids:
             return
 
-        # Получаем все открытые PR где эти пользователи являются ревьюверами
-        open_prs = PullRequest.objects.filter(
-            status='OPEN',
-            reviewers__in=users_to_deactivate
-        ).distinct().prefetch_related('reviewers')
-
-        # Безопасная переназначаемость ревьюверов
-        cls._safely_reassign_reviewers(open_prs, users_to_deactivate, team)
+        # Безопасная переназначаемость ревьюверов, заодно выдает новые версии команде и ревьюверам
+        cls._safely_reassign_reviewers(deactivating_ids, team)
 
         # Деактивируем пользователей
-        User.objects.filter(
-            id__in=[user.id for user in users_to_deactivate]
-        ).update(is_active=False)
+        User.objects.filter(id__in=deactivating_ids).update(is_active=False)
+        users_bulk_updated.send(sender=cls, team_ids=[team.id])
 
     @classmethod
-    def _safely_reassign_reviewers(cls, open_prs: list, users_to_deactivate: list, team: Team):
+    def _safely_reassign_reviewers(cls, deactivating_ids: set, team: Team, pr_ids: list = None) -> int:
         """
-        Безопасная переназначаемость ревьюверов в открытых PR
+        Безопасная переназначаемость ревьюверов в открытых PR.
+        План строится в памяти по одному чтению through-таблицы и состава команды,
+        применяется одним DELETE и одним bulk INSERT.
+        pr_ids ограничивает обработку частью PR (для фоновых задач)
+
+        Returns:
+            int: Количество выполненных замен
         """
-        # Получаем активных пользователей команды (кроме тех, кого деактивируем)
-        active_users = User.objects.filter(
-            team=team,
-            is_active=True
-        ).exclude(id__in=[user.id for user in users_to_deactivate])
+        through = PullRequest.reviewers.through
 
-        for pr in open_prs:
-            # Получаем текущих ревьюверов которые будут деактивированы
-            deactivating_reviewers = [
-                user for user in users_to_deactivate
-                if pr.reviewers.filter(id=user.id).exists()
-            ]
+        # Все назначения открытых PR, где есть хотя бы один деактивируемый ревьювер
+        if pr_ids is not None:
+            affected_pr_ids = pr_ids
+        else:
+            affected_pr_ids = through.objects.filter(
+                user_id__in=deactivating_ids
+            ).values('pullrequest_id')
+        # Блокируем затронутые открытые PR в порядке id: параллельные reassign/merge этих PR ждут плана
+        locked_pr_ids = list(
+            PullRequest.objects.select_for_update()
+            .filter(id__in=affected_pr_ids, status=PullRequest.Status.OPEN)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        assignments = through.objects.filter(
+            pullrequest_id__in=locked_pr_ids
+        ).values_list('id', 'pullrequest_id', 'user_id', 'pullrequest__author_id')
 
-            if not deactivating_reviewers:
+        # Активные пользователи команды (кроме тех, кого деактивируем)
+        active_ids = tuple(
+            user_id for user_id in roster_cache.get_or_load(team.id, UserService.load_active_ids)
+            if user_id not in deactivating_ids
+        )
+        strategy = reviewer_strategies.get_strategy(team)
+
+        reviewers_by_pr = {}
+        authors = {}
+        rows_to_replace = []
+        removed_reviewers = {}
+        for row_id, pr_id, user_id, author_id in assignments:
+            reviewers_by_pr.setdefault(pr_id, set()).add(user_id)
+            authors[pr_id] = author_id
+            if user_id in deactivating_ids:
+                rows_to_replace.append((row_id, pr_id))
+                removed_reviewers[row_id] = user_id
+
+        rows_to_delete = []
+        rows_to_create = []
+        for row_id, pr_id in rows_to_replace:
+            taken = reviewers_by_pr[pr_id]
+            # Выбираем замену среди активных участников, кроме автора и уже назначенных
+            selected = strategy.pick(team.id, active_ids, taken | {authors[pr_id]}, 1)
+            if not selected:
                 continue
 
-            # Доступные кандидаты для замены
-            available_candidates = active_users.exclude(
-                id=pr.author.id
-            ).exclude(
-                id__in=list(pr.reviewers.values_list('id', flat=True))
+            new_reviewer_id = selected[0]
+
+            rows_to_delete.append(row_id)
+            rows_to_create.append(through(pullrequest_id=pr_id, user_id=new_reviewer_id))
+            # Новый ревьювер больше не кандидат для этого PR
+            taken.add(new_reviewer_id)
+
+        open_deltas = {}
+        if rows_to_delete:
+            through.objects.filter(id__in=rows_to_delete).delete()
+            through.objects.bulk_create(rows_to_create)
+
+            for row_id in rows_to_delete:
+                user_id = removed_reviewers[row_id]
+                open_deltas[user_id] = open_deltas.get(user_id, 0) - 1
+            for row in rows_to_create:
+                open_deltas[row.user_id] = open_deltas.get(row.user_id, 0) + 1
+            UserService.shift_review_counters(open_deltas)
+
+        # Состав команды меняется деактивацией, очереди ревью - заменами (их версии выдал UPDATE счетчиков)
+        VersionService.bump_teams([team.id])
+        VersionService.invalidate(team_names=[team.name], user_ids=open_deltas)
+        if rows_to_create:
+            transaction.on_commit(lambda: REASSIGNMENTS.inc('deactivate', amount=len(rows_to_create)))
+        return len(rows_to_create)
+
+    @classmethod
+    def _affected_open_pr_ids(cls, deactivating_ids, after: str = '', limit: int = None) -> list:
+        """
+        Id открытых PR с деактивируемыми ревьюверами по возрастанию, начиная после after
+        """
+        pr_ids = (
+            PullRequest.reviewers.through.objects
+            .filter(
+                user_id__in=deactivating_ids,
+                pullrequest__status=PullRequest.Status.OPEN,
+                pullrequest_id__gt=after
             )
+            .order_by('pullrequest_id')
+            .values_list('pullrequest_id', flat=True)
+            .distinct()
+        )
+        if limit is not None:
+            pr_ids = pr_ids[:limit]
+        return list(pr_ids)
 
-            # Для каждого деактивируемого ревьювера ищем замену
-            for old_reviewer in deactivating_reviewers:
-                if available_candidates.exists():
-                    # Выбираем случайного кандидата
-                    new_reviewer = random.choice(list(available_candidates))
+    @classmethod
+    def run_bulk_deactivation_job(cls, job: Job):
+        """
+        Фоновая массовая деактивация: пользователи деактивируются сразу,
+        открытые PR обрабатываются частями, каждая часть коммитится отдельно вместе с курсором.
+        Повторный запуск продолжает с сохраненного курсора
+        """
+        try:
+            team = Team.objects.get(name=job.payload['team_name'])
+        except Team.DoesNotExist:
+            raise ObjectDoesNotExist(f"Team '{job.payload['team_name']}' not found")
 
-                    # Переназначаем
-                    pr.reviewers.remove(old_reviewer)
-                    pr.reviewers.add(new_reviewer)
+        if 'deactivating_ids' not in job.payload:
+            with transaction.atomic():
+                users_to_deactivate = User.objects.filter(team=team)
+                if job.payload.get('user_ids'):
+                    users_to_deactivate = users_to_deactivate.filter(id__in=job.payload['user_ids'])
+                deactivating_ids = sorted(users_to_deactivate.values_list('id', flat=True))
 
-                    # Убираем нового ревьювера из доступных кандидатов для этого PR
-                    available_candidates = available_candidates.exclude(id=new_reviewer.id)
+                # Деактивируем сразу, чтобы новые PR не назначались на уходящих пользователей
+                User.objects.filter(id__in=deactivating_ids).update(is_active=False)
+                users_bulk_updated.send(sender=cls, team_ids=[team.id])
+                VersionService.bump_teams([team.id])
+                VersionService.invalidate(team_names=[team.name])
 
+                job.payload['deactivating_ids'] = deactivating_ids
+                job.payload['reassigned'] = 0
+                job.total_prs = len(cls._affected_open_pr_ids(deactivating_ids))
+                job.save(update_fields=['payload', 'total_prs', 'updated_at'])
+
+        deactivating_ids = set(job.payload['deactivating_ids'])
+        chunk_size = getattr(settings, 'BULK_DEACTIVATE_CHUNK_SIZE', 200)
+
+        while deactivating_ids:
+            with reviewer_strategies.undo_on_error(), transaction.atomic():
+                pr_ids = cls._affected_open_pr_ids(deactivating_ids, after=job.cursor, limit=chunk_size)
+                if not pr_ids:
+                    break
+
+                job.payload['reassigned'] += cls._safely_reassign_reviewers(deactivating_ids, team, pr_ids)
+                job.cursor = pr_ids[-1]
+                job.processed_prs += len(pr_ids)
+                job.save(update_fields=['payload', 'cursor', 'processed_prs', 'updated_at'])
+
+        return {
+            'deactivated': len(deactivating_ids),
+            'reassigned': job.payload['reassigned']
+        }
+
+@instrument_service
 class UserService:
     """
     Сервис для управления пользователями
     """
 
     @classmethod
+    @transaction.atomic
     def set_user_active_status(cls, user_id: str, is_active: bool) -> User:
         try:
-            user = User.objects.get(id=user_id)
+            user = User.objects.select_related('team').get(id=user_id)
             user.is_active = is_active
-            user.save()
+            user.save(update_fields=['is_active'])
+            VersionService.bump_teams([user.team_id])
+            VersionService.invalidate(team_names=[user.team.name if user.team else None])
             return user
         except User.DoesNotExist:
             raise User.DoesNotExist(f"User '{user_id}' not found")
 
     @classmethod
+    @read_from_replica
     def get_user_review_assignments(cls, user_id: str) -> list:
         try:
             user = User.objects.get(id=user_id)
@@ -167,83 +337,265 @@ class UserService:
         except User.DoesNotExist:
             raise User.DoesNotExist(f"User '{user_id}' not found")
 
+    @classmethod
+    @read_from_replica
+    async def aget_user_review_assignments(cls, user_id: str) -> list:
+        try:
+            user = await User.objects.only('id').aget(id=user_id)
+            assigned_prs = PullRequest.objects.filter(reviewers=user)
+            return [pr async for pr in assigned_prs]
+        except User.DoesNotExist:
+            raise User.DoesNotExist(f"User '{user_id}' not found")
 
+    @classmethod
+    def shift_review_counters(cls, open_deltas: dict, merged_deltas: dict = None):
+        """
+        Сдвигает счетчики ревью пользователей одним UPDATE: {user_id: изменение}.
+        Тот же UPDATE выдает новую версию очереди ревью всем переданным пользователям,
+        в том числе с нулевым итогом: их очередь все равно поменялась
+        """
+        merged_deltas = merged_deltas or {}
+        user_ids = list(set(open_deltas) | set(merged_deltas))
+        if not user_ids:
+            return
+
+        def shift(field, deltas):
+            return F(field) + Case(
+                *[When(id=user_id, then=Value(delta)) for user_id, delta in deltas.items() if delta],
+                default=Value(0),
+                output_field=models.IntegerField()
+            )
+
+        updates = {'review_version': VersionService.new_version()}
+        if any(open_deltas.values()):
+            updates['open_reviews'] = shift('open_reviews', open_deltas)
+        if any(merged_deltas.values()):
+            updates['merged_reviews'] = shift('merged_reviews', merged_deltas)
+        User.objects.filter(id__in=user_ids).update(**updates)
+
+    @classmethod
+    def load_active_ids(cls, team_id) -> list:
+        """
+        Загрузчик состава для roster_cache: id активных участников команды
+        """
+        return list(
+            User.objects.filter(team_id=team_id, is_active=True)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    @classmethod
+    def load_active_ids_many(cls, team_ids) -> dict:
+        """
+        Пакетный загрузчик для roster_cache: {team_id: id активных участников} одним запросом
+        """
+        rosters = {team_id: [] for team_id in team_ids}
+        active = (
+            User.objects.filter(team_id__in=list(team_ids), is_active=True)
+            .order_by('id')
+            .values_list('team_id', 'id')
+        )
+        for team_id, user_id in active:
+            rosters[team_id].append(user_id)
+        return rosters
+
+
+@instrument_service
 class PullRequestService:
     """
     Сервис для управления Pull Request'ами
     """
 
     @classmethod
-    @transaction.atomic
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
     def create_pull_request(cls, pr_id: str, pr_name: str, author_id: str) -> PullRequest:
-        # Проверяем, существует ли PR
-        if PullRequest.objects.filter(id=pr_id).exists():
+        """
+        Создает PR с ревьюверами одной транзакцией без точек сохранения. При составе из кэша
+        это SELECT автора с командой, INSERT PR, INSERT в through-таблицу и UPDATE счетчиков ревьюверов.
+        Занятый id определяет сам INSERT по первичному ключу, без отдельной проверки
+        """
+        try:
+            return cls._insert_pull_request(pr_id, pr_name, author_id)
+        except IntegrityError:
+            # PR_EXISTS - только если id действительно занят. Прочие нарушения (внешние ключи) пробрасываются.
+            # Выбор ревьюверов стратегией откатывает undo_on_error
+            if not PullRequest.objects.filter(id=pr_id).exists():
+                raise
+            DOMAIN_ERRORS.inc('PR_EXISTS')
             raise ValidationError('PR id already exists', code='PR_EXISTS')
 
-        # Получаем автора
+    @classmethod
+    @transaction.atomic
+    def _insert_pull_request(cls, pr_id: str, pr_name: str, author_id: str) -> PullRequest:
+        # Получаем автора вместе с командой
         try:
-            author = User.objects.get(id=author_id)
+            author = User.objects.select_related('team').get(id=author_id)
         except User.DoesNotExist:
             raise ObjectDoesNotExist(f"Author '{author_id}' not found")
 
         # Проверяем, что у автора есть команда
-        if not author.team:
+        if author.team_id is None:
             raise ObjectDoesNotExist(f"Author '{author_id}' has no team")
 
-        # Создаем PR
+        # Назначаем ревьюверов
+        reviewers = cls._assign_reviewers(author)
+
+        # create() с заданным id - это INSERT без предварительного SELECT
         pr = PullRequest.objects.create(
             id=pr_id,
             name=pr_name,
             author=author
         )
-
-        # Назначаем ревьюверов
-        reviewers = cls._assign_reviewers(author)
-        pr.reviewers.set(reviewers)
+        through = PullRequest.reviewers.through
+        through.objects.bulk_create([through(pullrequest_id=pr_id, user_id=user_id) for user_id in reviewers])
+        UserService.shift_review_counters(dict.fromkeys(reviewers, 1))
+        VersionService.invalidate(user_ids=reviewers)
 
         return pr
 
+    @classmethod
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
+    @transaction.atomic
+    def bulk_create_pull_requests(cls, items: list) -> list:
+        """
+        Создает пачку PR за фиксированное число запросов независимо от ее размера.
+        items - список {'pull_request_id', 'pull_request_name', 'author_id'}
+
+        Returns:
+            list: по элементу на каждый входной PR в исходном порядке -
+                {'pull_request_id', 'pr'} при успехе или {'pull_request_id', 'error': {'code', 'message'}}
+        """
+        results = [{'pull_request_id': item.get('pull_request_id')} for item in items]
+
+        def fail(result, code, message):
+            result['error'] = {'code': code, 'message': message}
+            # Только после коммита: откаченная попытка retry_on_conflict не должна посчитать ошибку
+            transaction.on_commit(lambda: DOMAIN_ERRORS.inc(code))
+
+        fields = ('pull_request_id', 'pull_request_name', 'author_id')
+        valid = []
+        seen_ids = set()
+        for item, result in zip(items, results):
+            if not all(item.get(field) for field in fields):
+                fail(result, 'VALIDATION_ERROR', 'pull_request_id, pull_request_name, and author_id are required')
+            elif not all(isinstance(item[field], str) for field in fields):
+                fail(result, 'VALIDATION_ERROR', 'pull_request_id, pull_request_name, and author_id must be strings')
+            elif item['pull_request_id'] in seen_ids:
+                fail(result, 'PR_EXISTS', 'PR id already exists')
+            else:
+                seen_ids.add(item['pull_request_id'])
+                valid.append((item, result))
+
+        # Уже занятые id - до выбора ревьюверов, в той же транзакции, что и вставка
+        existing_ids = set(
+            PullRequest.objects.filter(id__in=seen_ids).values_list('id', flat=True)
+        ) if seen_ids else set()
+        # Авторы с командами - одним запросом на всю пачку
+        authors = User.objects.select_related('team').in_bulk({item['author_id'] for item, _ in valid})
+
+        accepted = []
+        for item, result in valid:
+            author = authors.get(item['author_id'])
+            if item['pull_request_id'] in existing_ids:
+                fail(result, 'PR_EXISTS', 'PR id already exists')
+            elif author is None:
+                fail(result, 'NOT_FOUND', f"Author '{item['author_id']}' not found")
+            elif author.team_id is None:
+                fail(result, 'NOT_FOUND', f"Author '{author.id}' has no team")
+            else:
+                accepted.append((item, result, author))
+
+        if not accepted:
+            return results
+
+        # Составы всех задействованных команд - из кэша, промахи одним запросом
+        rosters = roster_cache.get_many_or_load(
+            [author.team_id for _, _, author in accepted], UserService.load_active_ids_many
+        )
+
+        picked = []
+        for item, result, author in accepted:
+            strategy = reviewer_strategies.get_strategy(author.team)
+            reviewers = strategy.pick(author.team_id, rosters[author.team_id], {author.id}, 2)
+            pr = PullRequest(id=item['pull_request_id'], name=item['pull_request_name'], author=author)
+            picked.append((result, pr, reviewers))
+
+        inserted = [pr for _, pr, _ in picked]
+        try:
+            PullRequest.objects.bulk_create(inserted)
+        except IntegrityError as e:
+            # id занял параллельный запрос после проверки: повтор транзакции получит его в existing_ids
+            raise WriteConflict('PR id taken by a concurrent request') from e
+
+        assignments = []
+        review_deltas = {}
+        through = PullRequest.reviewers.through
+        for result, pr, reviewers in picked:
+            assignments += [through(pullrequest_id=pr.id, user_id=user_id) for user_id in reviewers]
+            for user_id in reviewers:
+                review_deltas[user_id] = review_deltas.get(user_id, 0) + 1
+            result['pr'] = pr
+
+        through.objects.bulk_create(assignments)
+        UserService.shift_review_counters(review_deltas)
+        VersionService.invalidate(user_ids=review_deltas)
+        # Ревьюверы для сериализации - одним запросом на всю пачку
+        prefetch_related_objects(inserted, 'reviewers')
+
+        return results
+
     @classmethod
     def _assign_reviewers(cls, author: User) -> list:
-        # Получаем активных пользователей из команды автора, исключая самого автора
-        available_reviewers = User.objects.filter(
-            team=author.team,
-            is_active=True
-        ).exclude(id=author.id)
-
-        # Случайным образом выбираем до 2 ревьюверов
-        reviewers_count = min(2, available_reviewers.count())
-        if reviewers_count > 0:
-            selected_reviewers = random.sample(
-                list(available_reviewers),
-                reviewers_count
-            )
-        else:
-            selected_reviewers = []
+        """
+        Returns:
+            list: id выбранных ревьюверов
+        """
+        # Выбираем до 2 активных участников команды автора, исключая самого автора
+        roster = roster_cache.get_or_load(author.team_id, UserService.load_active_ids)
+        strategy = reviewer_strategies.get_strategy(author.team)
 
-        return selected_reviewers
+        return strategy.pick(author.team_id, roster, {author.id}, 2)
 
     @classmethod
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
     @transaction.atomic
     def merge_pull_request(cls, pr_id: str) -> PullRequest:
         try:
-            pr = PullRequest.objects.get(id=pr_id)
+            # Блокировка строки PR: параллельные merge/reassign того же PR выполняются по очереди
+            pr = PullRequest.objects.select_for_update().get(id=pr_id)
 
             if pr.status != PullRequest.Status.MERGED:
                 pr.status = PullRequest.Status.MERGED
                 pr.merged_at = timezone.now()
                 pr.save()
+                reviewer_ids = list(pr.reviewers.values_list('id', flat=True))
+                # Ревью всех назначенных ревьюверов переходят из открытых в смерженные
+                User.objects.filter(id__in=reviewer_ids).update(
+                    open_reviews=F('open_reviews') - 1,
+                    merged_reviews=F('merged_reviews') + 1,
+                    review_version=VersionService.new_version()
+                )
+                VersionService.invalidate(user_ids=reviewer_ids)
+                # Счетчики в памяти нужны только стратегии least_loaded, и только если она уже используется
+                if reviewer_strategies.tracks_load():
+                    reviewer_strategies.release(reviewer_ids)
 
             return pr
         except PullRequest.DoesNotExist:
             raise PullRequest.DoesNotExist(f"PR '{pr_id}' not found")
 
     @classmethod
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
     @transaction.atomic
     def reassign_reviewer(cls, pr_id: str, old_user_id: str) -> tuple:
         try:
-            pr = PullRequest.objects.get(id=pr_id)
-            old_reviewer = User.objects.get(id=old_user_id)
+            # Блокировка строки PR: два reassign одного PR не выберут одного и того же кандидата
+            pr = PullRequest.objects.select_for_update().get(id=pr_id)
+            old_reviewer = User.objects.select_related('team').get(id=old_user_id)
         except PullRequest.DoesNotExist:
             raise ObjectDoesNotExist(f"PR '{pr_id}' not found")
         except User.DoesNotExist:
@@ -251,72 +603,612 @@ class PullRequestService:
 
         # Проверяем доменные правила
         if pr.status == PullRequest.Status.MERGED:
+            DOMAIN_ERRORS.inc('PR_MERGED')
             raise ValidationError('cannot reassign on merged PR', code='PR_MERGED')
 
-        if not pr.reviewers.filter(id=old_user_id).exists():
+        current_reviewer_ids = set(pr.reviewers.values_list('id', flat=True))
+        if old_user_id not in current_reviewer_ids:
+            DOMAIN_ERRORS.inc('NOT_ASSIGNED')
             raise ValidationError('reviewer is not assigned to this PR', code='NOT_ASSIGNED')
 
+        # Ищем кандидата из той же команды, исключая автора и уже назначенных ревьюверов
+        roster = roster_cache.get_or_load(old_reviewer.team_id, UserService.load_active_ids)
+        strategy = reviewer_strategies.get_strategy(old_reviewer.team)
+        selected = strategy.pick(old_reviewer.team_id, roster, current_reviewer_ids | {pr.author_id}, 1)
 
-        # Ищем доступных кандидатов из той же команды
-        available_candidates = User.objects.filter(
-            team=old_reviewer.team,
-            is_active=True
-        ).exclude(id=pr.author.id).exclude(id=old_user_id)
-
-        # Исключаем уже назначенных ревьюверов
-        current_reviewer_ids = list(pr.reviewers.values_list('id', flat=True))
-        available_candidates = available_candidates.exclude(id__in=current_reviewer_ids)
-
-        if not available_candidates.exists():
+        if not selected:
+            DOMAIN_ERRORS.inc('NO_CANDIDATE')
             raise ValidationError('no active replacement candidate in team', code='NO_CANDIDATE')
 
-        # Выбираем случайного кандидата
-        new_reviewer = random.choice(list(available_candidates))
+        new_reviewer = User.objects.get(id=selected[0])
 
         # Обновляем ревьюверов
         pr.reviewers.remove(old_reviewer)
         pr.reviewers.add(new_reviewer)
+        UserService.shift_review_counters({old_user_id: -1, new_reviewer.id: 1})
+        VersionService.invalidate(user_ids=[old_user_id, new_reviewer.id])
+        reviewer_strategies.release([old_user_id])
+        transaction.on_commit(lambda: REASSIGNMENTS.inc('reassign'))
 
         return pr, new_reviewer
 
+    @classmethod
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
+    @transaction.atomic
+    def bulk_merge_pull_requests(cls, pr_ids: list) -> list:
+        """
+        Мержит пачку PR: один UPDATE по всем открытым PR пачки, повторный мерж идемпотентен, как в merge_pull_request
+
+        Returns:
+            list: по элементу на каждый id в исходном порядке - {'pull_request_id', 'pr'} или {'pull_request_id', 'error'}
+        """
+        pr_ids = list(dict.fromkeys(pr_ids))
+        # Блокируем открытые PR пачки, чтобы набор смерженных этим запросом был точным
+        merging_ids = list(
+            PullRequest.objects.select_for_update()
+            .filter(id__in=pr_ids, status=PullRequest.Status.OPEN)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        if merging_ids:
+            PullRequest.objects.filter(id__in=merging_ids).update(
+                status=PullRequest.Status.MERGED,
+                merged_at=timezone.now()
+            )
+            # Ревью переходят из открытых в смерженные, у ревьювера может быть несколько PR в пачке
+            reviewer_ids = list(
+                PullRequest.reviewers.through.objects.filter(pullrequest_id__in=merging_ids)
+                .values_list('user_id', flat=True)
+            )
+            open_deltas = {}
+            for user_id in reviewer_ids:
+                open_deltas[user_id] = open_deltas.get(user_id, 0) - 1
+            UserService.shift_review_counters(
+                open_deltas, {user_id: -delta for user_id, delta in open_deltas.items()}
+            )
+            VersionService.invalidate(user_ids=open_deltas)
+            if reviewer_strategies.tracks_load():
+                reviewer_strategies.release(reviewer_ids)
+
+        pull_requests = cls._load_for_response(pr_ids)
+        return [
+            {'pull_request_id': pr_id, 'pr': pull_requests[pr_id]} if pr_id in pull_requests
+            else {'pull_request_id': pr_id, 'error': {'code': 'NOT_FOUND', 'message': f"PR '{pr_id}' not found"}}
+            for pr_id in pr_ids
+        ]
 
+    @classmethod
+    @retry_on_conflict
+    @reviewer_strategies.undo_on_error()
+    @transaction.atomic
+    def bulk_reassign_reviewers(cls, items: list) -> list:
+        """
+        Переназначает пачку ревьюверов: items - список {'pull_request_id', 'old_user_id'}.
+        План строится в памяти по одному чтению PR, пользователей, through-таблицы и составов,
+        проверки и доменные ошибки те же, что в reassign_reviewer; замены внутри пачки
+        видны следующим элементам. Применяется одним DELETE и одним bulk INSERT.
+
+        Returns:
+            list: по элементу на каждый входной элемент в исходном порядке -
+                {'pull_request_id', 'old_user_id', 'pr', 'replaced_by'} или {'pull_request_id', 'old_user_id', 'error'}
+        """
+        results = [
+            {'pull_request_id': item.get('pull_request_id'), 'old_user_id': item.get('old_user_id')}
+            for item in items
+        ]
+
+        def fail(result, code, message):
+            result['error'] = {'code': code, 'message': message}
+            transaction.on_commit(lambda: DOMAIN_ERRORS.inc(code))
+
+        pr_ids = {item.get('pull_request_id') for item in items if item.get('pull_request_id')}
+        pull_requests = (
+            PullRequest.objects.select_for_update().only('id', 'status', 'author_id').order_by('id').in_bulk(pr_ids)
+        )
+        old_reviewers = User.objects.select_related('team').in_bulk(
+            {item.get('old_user_id') for item in items if item.get('old_user_id')}
+        )
+
+        through = PullRequest.reviewers.through
+        rows = {}
+        reviewers_by_pr = {pr_id: set() for pr_id in pull_requests}
+        for row_id, pr_id, user_id in through.objects.filter(
+            pullrequest_id__in=list(pull_requests)
+        ).values_list('id', 'pullrequest_id', 'user_id'):
+            rows[(pr_id, user_id)] = row_id
+            reviewers_by_pr[pr_id].add(user_id)
+
+        rosters = roster_cache.get_many_or_load(
+            [user.team_id for user in old_reviewers.values()], UserService.load_active_ids_many
+        )
+
+        rows_to_delete = []
+        rows_to_create = {}
+        open_deltas = {}
+        released = []
+        for item, result in zip(items, results):
+            pr_id, old_user_id = item.get('pull_request_id'), item.get('old_user_id')
+            pr, old_reviewer = pull_requests.get(pr_id), old_reviewers.get(old_user_id)
+
+            if not all([pr_id, old_user_id]):
+                fail(result, 'VALIDATION_ERROR', 'pull_request_id and old_user_id are required')
+                continue
+            if pr is None:
+                fail(result, 'NOT_FOUND', f"PR '{pr_id}' not found")
+                continue
+            if old_reviewer is None:
+                fail(result, 'NOT_FOUND', f"User '{old_user_id}' not found")
+                continue
+            if pr.status == PullRequest.Status.MERGED:
+                fail(result, 'PR_MERGED', 'cannot reassign on merged PR')
+                continue
+
+            current_reviewer_ids = reviewers_by_pr[pr_id]
+            if old_user_id not in current_reviewer_ids:
+                fail(result, 'NOT_ASSIGNED', 'reviewer is not assigned to this PR')
+                continue
+
+            strategy = reviewer_strategies.get_strategy(old_reviewer.team)
+            selected = strategy.pick(
+                old_reviewer.team_id, rosters.get(old_reviewer.team_id, ()),
+                current_reviewer_ids | {pr.author_id}, 1
+            )
+            if not selected:
+                fail(result, 'NO_CANDIDATE', 'no active replacement candidate in team')
+                continue
+
+            new_user_id = selected[0]
+            # Ревьювер мог быть назначен ранее в этой же пачке - тогда строки в БД еще нет
+            if rows_to_create.pop((pr_id, old_user_id), None) is None:
+                rows_to_delete.append(rows.pop((pr_id, old_user_id)))
+            rows_to_create[(pr_id, new_user_id)] = through(pullrequest_id=pr_id, user_id=new_user_id)
+            current_reviewer_ids.discard(old_user_id)
+            current_reviewer_ids.add(new_user_id)
+            open_deltas[old_user_id] = open_deltas.get(old_user_id, 0) - 1
+            open_deltas[new_user_id] = open_deltas.get(new_user_id, 0) + 1
+            released.append(old_user_id)
+            result['replaced_by'] = new_user_id
+
+        if not released:
+            return results
+
+        through.objects.filter(id__in=rows_to_delete).delete()
+        through.objects.bulk_create(rows_to_create.values())
+        # open_deltas содержит и ревьюверов с нулевым итогом: их очередь все равно поменялась
+        UserService.shift_review_counters(open_deltas)
+        VersionService.invalidate(user_ids=open_deltas)
+        reviewer_strategies.release(released)
+        transaction.on_commit(lambda: REASSIGNMENTS.inc('bulk_reassign', amount=len(released)))
+
+        pull_requests = cls._load_for_response(
+            [result['pull_request_id'] for result in results if 'replaced_by' in result]
+        )
+        for result in results:
+            if 'replaced_by' in result:
+                result['pr'] = pull_requests[result['pull_request_id']]
+        return results
+
+    @classmethod
+    def _load_for_response(cls, pr_ids) -> dict:
+        """
+        PR с автором и ревьюверами для сериализации ответа пакетных операций
+        """
+        return PullRequest.objects.select_related('author').prefetch_related('reviewers').in_bulk(list(pr_ids))
+
+
+class JobService:
+    """
+    Сервис фоновых задач
+    """
+
+    @classmethod
+    def start_bulk_deactivation(cls, team_name: str, user_ids: list = None) -> Job:
+        if not Team.objects.filter(name=team_name).exists():
+            raise ObjectDoesNotExist(f"Team '{team_name}' not found")
+
+        job = Job.objects.create(
+            id=uuid.uuid4().hex,
+            kind=Job.Kind.BULK_DEACTIVATE,
+            payload={'team_name': team_name, 'user_ids': user_ids}
+        )
+        submit(cls.run_job, job.id)
+        return job
+
+    @classmethod
+    def get_job(cls, job_id: str) -> Job:
+        try:
+            return Job.objects.get(id=job_id)
+        except Job.DoesNotExist:
+            raise Job.DoesNotExist(f"Job '{job_id}' not found")
+
+    @classmethod
+    def run_job(cls, job_id: str, statuses: tuple = (Job.Status.PENDING,), stale_before=None):
+        """
+        Захватывает задачу условным UPDATE и выполняет ее.
+        Задачу в другом статусе (уже выполняется или завершена) пропускает
+        """
+        jobs = Job.objects.filter(id=job_id, status__in=statuses)
+        if stale_before is not None:
+            jobs = jobs.filter(updated_at__lt=stale_before)
+        claimed = jobs.update(
+            status=Job.Status.RUNNING,
+            updated_at=timezone.now()
+        )
+        if not claimed:
+            return
+
+        job = Job.objects.get(id=job_id)
+        try:
+            result = TeamService.run_bulk_deactivation_job(job)
+        except Exception as e:
+            job.status = Job.Status.FAILED
+            job.error = str(e)
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+            return
+
+        job.status = Job.Status.DONE
+        job.result = result
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'finished_at', 'updated_at'])
+
+    @classmethod
+    def resume_stale_jobs(cls) -> list:
+        """
+        Перезапускает задачи, прерванные вместе с процессом:
+        ожидающие и выполняющиеся без обновлений дольше JOBS_STALE_SECONDS
+        """
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'JOBS_STALE_SECONDS', 300))
+        statuses = (Job.Status.PENDING, Job.Status.RUNNING)
+        job_ids = list(
+            Job.objects.filter(
+                status__in=statuses,
+                updated_at__lt=stale_before
+            ).order_by('created_at').values_list('id', flat=True)
+        )
+        for job_id in job_ids:
+            cls.run_job(job_id, statuses=statuses, stale_before=stale_before)
+        return job_ids
+
+
+class ExportService:
+    """
+    Сервис выгрузки данных для аналитики
+    """
+
+    @classmethod
+    def iter_pull_requests(cls, since=None, status: str = None, team_name: str = None, chunk_size: int = None):
+        """
+        Потоково отдает PR с ревьюверами: строки PR читаются серверным курсором,
+        ревьюверы подгружаются одним запросом на каждую пачку из chunk_size PR.
+        since отбирает PR, созданные или смерженные не раньше указанного момента
+        """
+        chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+
+        batch = []
+        for pr in cls._export_queryset(since, status, team_name).iterator(chunk_size=chunk_size):
+            batch.append(pr)
+            if len(batch) == chunk_size:
+                yield from cls._with_reviewers(batch)
+                batch = []
+        if batch:
+            yield from cls._with_reviewers(batch)
+
+    @classmethod
+    async def aiter_pull_requests(cls, since=None, status: str = None, team_name: str = None, chunk_size: int = None):
+        """
+        Асинхронная версия iter_pull_requests для ASGI: под ASGI синхронный итератор ответа
+        Django сначала целиком собирает в список, а этот отдается по пачке.
+        Ревьюверы пачки подгружаются одним вызовом sync_to_async
+        """
+        chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+
+        batch = []
+        async for pr in cls._export_queryset(since, status, team_name).aiterator(chunk_size=chunk_size):
+            batch.append(pr)
+            if len(batch) == chunk_size:
+                for pr_with_reviewers in await sync_to_async(cls._with_reviewers)(batch):
+                    yield pr_with_reviewers
+                batch = []
+        if batch:
+            for pr_with_reviewers in await sync_to_async(cls._with_reviewers)(batch):
+                yield pr_with_reviewers
+
+    @staticmethod
+    def _export_queryset(since, status, team_name):
+        pull_requests = (
+            PullRequest.objects
+            .annotate(team_name=F('author__team__name'))
+            .values('id', 'name', 'author_id', 'team_name', 'status', 'created_at', 'merged_at')
+            .order_by('created_at', 'id')
+        )
+        if since:
+            pull_requests = pull_requests.filter(models.Q(created_at__gte=since) | models.Q(merged_at__gte=since))
+        if status:
+            pull_requests = pull_requests.filter(status=status)
+        if team_name:
+            pull_requests = pull_requests.filter(author__team__name=team_name)
+        return pull_requests
+
+    @staticmethod
+    def _with_reviewers(batch: list) -> list:
+        reviewers = {}
+        rows = (
+            PullRequest.reviewers.through.objects
+            .filter(pullrequest_id__in=[pr['id'] for pr in batch])
+            .order_by('id')
+            .values_list('pullrequest_id', 'user_id')
+        )
+        for pr_id, user_id in rows:
+            reviewers.setdefault(pr_id, []).append(user_id)
+
+        for pr in batch:
+            pr['reviewers'] = reviewers.get(pr['id'], [])
+        return batch
+
+
+@instrument_service
 class StatsService:
     """
     Сервис для сбора статистики
     """
 
     @classmethod
-    def get_review_stats(cls):
+    @read_from_replica
+    def get_review_stats(cls, limit: int = None, cursor: str = None, team_name: str = None, status: str = None,
+                         created_from=None, created_to=None, merged_from=None, merged_to=None,
+                         user_cursor: str = None):
         """
+        Статистика с keyset-пагинацией: PR по (created_at, id) в порядке убывания, курсор cursor,
+        ревьюверы по (prs_reviewed по убыванию, id), курсор user_cursor. Без курсоров отдаются первые
+        страницы обеих частей, с курсором - продолжение только его части
+
         Returns:
-            dict: Статистика по пользователям и PR
+            dict: Статистика по пользователям и PR и курсоры следующих страниц
         """
+        limit = min(limit or STATS_DEFAULT_LIMIT, STATS_MAX_LIMIT)
+
+        # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+        user_review_stats = []
+        if cursor is None or user_cursor is not None:
+            user_review_stats = list(cls._user_stats_queryset(team_name, user_cursor)[:limit + 1])
+
+        pr_reviewer_stats = []
+        if user_cursor is None or cursor is not None:
+            pr_reviewer_stats = cls._pr_stats_queryset(
+                cursor, team_name, status, created_from, created_to, merged_from, merged_to
+            )
+            pr_reviewer_stats = list(pr_reviewer_stats[:limit + 1])
+
+        return cls._stats_page(user_review_stats, pr_reviewer_stats, limit)
+
+    @classmethod
+    @read_from_replica
+    async def aget_review_stats(cls, limit: int = None, cursor: str = None, team_name: str = None,
+                                status: str = None, created_from=None, created_to=None,
+                                merged_from=None, merged_to=None, user_cursor: str = None):
+        """
+        Асинхронная версия get_review_stats для ASGI
+        """
+        limit = min(limit or STATS_DEFAULT_LIMIT, STATS_MAX_LIMIT)
+
+        user_review_stats = []
+        if cursor is None or user_cursor is not None:
+            user_review_stats = [row async for row in cls._user_stats_queryset(team_name, user_cursor)[:limit + 1]]
+
+        pr_reviewer_stats = []
+        if user_cursor is None or cursor is not None:
+            pr_reviewer_stats = cls._pr_stats_queryset(
+                cursor, team_name, status, created_from, created_to, merged_from, merged_to
+            )
+            pr_reviewer_stats = [row async for row in pr_reviewer_stats[:limit + 1]]
+
+        return cls._stats_page(user_review_stats, pr_reviewer_stats, limit)
+
+    @classmethod
+    def _user_stats_queryset(cls, team_name: str = None, user_cursor: str = None):
+        # Чтение денормализованных счетчиков по индексу users_reviews_total_idx
         user_review_stats = (
             User.objects
-            .filter(assigned_prs__isnull=False)
             .annotate(
-                prs_reviewed=Count('assigned_prs'),
-                open_prs_reviewed=Count('assigned_prs', filter=models.Q(assigned_prs__status='OPEN')),
-                merged_prs_reviewed=Count('assigned_prs', filter=models.Q(assigned_prs__status='MERGED'))
+                prs_reviewed=F('open_reviews') + F('merged_reviews'),
+                open_prs_reviewed=F('open_reviews'),
+                merged_prs_reviewed=F('merged_reviews')
             )
+            .filter(prs_reviewed__gt=0)
             .values('id', 'username', 'prs_reviewed', 'open_prs_reviewed', 'merged_prs_reviewed')
-            .order_by('-prs_reviewed')
+            .order_by('-prs_reviewed', 'id')
         )
+        if team_name:
+            user_review_stats = user_review_stats.filter(team__name=team_name)
+        if user_cursor is not None:
+            prs_reviewed, user_id = cls._decode_user_cursor(user_cursor)
+            user_review_stats = user_review_stats.filter(
+                models.Q(prs_reviewed__lt=prs_reviewed) | models.Q(prs_reviewed=prs_reviewed, id__gt=user_id)
+            )
+        return user_review_stats
 
+    @classmethod
+    def _pr_stats_queryset(cls, cursor, team_name, status, created_from, created_to, merged_from, merged_to):
+        # Число ревьюверов считается подзапросом только для строк страницы
+        reviewers_count = (
+            PullRequest.reviewers.through.objects
+            .filter(pullrequest_id=OuterRef('pk'))
+            .values('pullrequest_id')
+            .annotate(reviewers=Count('id'))
+            .values('reviewers')
+        )
         pr_reviewer_stats = (
             PullRequest.objects
             .annotate(
-                reviewers_count=Count('reviewers'),
+                reviewers_count=Coalesce(Subquery(reviewers_count), 0),
                 team_name=models.F('author__team__name')
             )
             .values(
                 'id', 'name', 'status', 'team_name',
                 'reviewers_count', 'created_at', 'merged_at'
             )
-            .order_by('-created_at')
+            .order_by('-created_at', '-id')
         )
 
+        if team_name:
+            pr_reviewer_stats = pr_reviewer_stats.filter(author__team__name=team_name)
+        if status:
+            pr_reviewer_stats = pr_reviewer_stats.filter(status=status)
+        if created_from:
+            pr_reviewer_stats = pr_reviewer_stats.filter(created_at__gte=created_from)
+        if created_to:
+            pr_reviewer_stats = pr_reviewer_stats.filter(created_at__lt=created_to)
+        if merged_from:
+            pr_reviewer_stats = pr_reviewer_stats.filter(merged_at__gte=merged_from)
+        if merged_to:
+            pr_reviewer_stats = pr_reviewer_stats.filter(merged_at__lt=merged_to)
+        if cursor is not None:
+            created_at, pr_id = cls._decode_cursor(cursor)
+            pr_reviewer_stats = pr_reviewer_stats.filter(
+                models.Q(created_at__lt=created_at) | models.Q(created_at=created_at, id__lt=pr_id)
+            )
+        return pr_reviewer_stats
+
+    @classmethod
+    def _stats_page(cls, user_review_stats: list, pr_reviewer_stats: list, limit: int) -> dict:
+        next_cursor = None
+        if len(pr_reviewer_stats) > limit:
+            pr_reviewer_stats = pr_reviewer_stats[:limit]
+            last = pr_reviewer_stats[-1]
+            next_cursor = cls._encode_cursor(last['created_at'], last['id'])
+
+        next_user_cursor = None
+        if len(user_review_stats) > limit:
+            user_review_stats = user_review_stats[:limit]
+            last = user_review_stats[-1]
+            next_user_cursor = cls._encode_cursor(last['prs_reviewed'], last['id'])
+
         return {
-            'user_review_stats': list(user_review_stats),
-            'pr_reviewer_stats': list(pr_reviewer_stats)
-        }
\ No newline at end of file
+            'user_review_stats': user_review_stats,
+            'pr_reviewer_stats': pr_reviewer_stats,
+            'next_cursor': next_cursor,
+            'next_user_cursor': next_user_cursor
+        }
+
+    @staticmethod
+    def _encode_cursor(position, last_id: str) -> str:
+        # Курсор - последняя строка страницы: (created_at, id) для PR, (prs_reviewed, id) для ревьюверов
+        if isinstance(position, datetime):
+            position = position.isoformat()
+        payload = json.dumps([position, last_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        try:
+            created_at, pr_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            created_at = parse_datetime(created_at)
+        except (ValueError, TypeError):
+            created_at = None
+        if created_at is None:
+            raise ValidationError('cursor is invalid', code='VALIDATION_ERROR')
+        return created_at, pr_id
+
+    @staticmethod
+    def _decode_user_cursor(user_cursor: str) -> tuple:
+        try:
+            prs_reviewed, user_id = json.loads(base64.urlsafe_b64decode(user_cursor.encode()))
+        except (ValueError, TypeError):
+            prs_reviewed = user_id = None
+        if not isinstance(prs_reviewed, int) or not isinstance(user_id, str):
+            raise ValidationError('user_cursor is invalid', code='VALIDATION_ERROR')
+        return prs_reviewed, user_id
+
+    @classmethod
+    @transaction.atomic
+    def rebuild_review_counters(cls) -> int:
+        """
+        Пересчитывает счетчики ревью всех пользователей по through-таблице
+
+        Returns:
+            int: Количество обновленных пользователей
+        """
+        through = PullRequest.reviewers.through
+
+        def count_reviews(status):
+            return Coalesce(Subquery(
+                through.objects
+                .filter(user_id=OuterRef('pk'), pullrequest__status=status)
+                .values('user_id')
+                .annotate(reviews=Count('id'))
+                .values('reviews')
+            ), 0)
+
+        return User.objects.update(
+            open_reviews=count_reviews(PullRequest.Status.OPEN),
+            merged_reviews=count_reviews(PullRequest.Status.MERGED)
+        )
+
+
+class VersionService:
+    """
+    Версии представлений для ETag /team/get и /users/getReview: колонки Team.version и User.review_version.
+    Новая версия записывается тем же запросом, что и данные (INSERT/UPDATE команды, UPDATE счетчиков ревью),
+    отдельный UPDATE команд - только там, где строку команды ничто другое не пишет
+    """
+    # ETag данных, которые не менялись через сервисы с появления версий
+    UNVERSIONED_ETAG = '"0"'
+
+    @staticmethod
+    def team_key(team_name: str) -> str:
+        return f'team:{team_name}'
+
+    @staticmethod
+    def user_key(user_id: str) -> str:
+        return f'user:{user_id}'
+
+    @staticmethod
+    def new_version() -> str:
+        return uuid.uuid4().hex
+
+    @classmethod
+    def bump_teams(cls, team_ids, version: str = None):
+        """
+        Выдает новую версию командам одним UPDATE
+        """
+        team_ids = [team_id for team_id in team_ids if team_id is not None]
+        if team_ids:
+            Team.objects.filter(id__in=team_ids).update(version=version or cls.new_version())
+
+    @classmethod
+    def invalidate(cls, team_names=(), user_ids=()):
+        """
+        Сбрасывает отрендеренные ответы команд и очередей ревью, которым текущая транзакция выдала новую версию
+        """
+        keys = (
+            {cls.team_key(name) for name in team_names if name}
+            | {cls.user_key(user_id) for user_id in user_ids if user_id}
+        )
+        if keys:
+            response_cache.invalidate_on_commit(keys)
+
+    @classmethod
+    def _etag(cls, version) -> str:
+        return f'"{version}"' if version else cls.UNVERSIONED_ETAG
+
+    @classmethod
+    @read_from_replica
+    async def aget_team_etag(cls, team_name: str) -> str:
+        """
+        Сильный ETag по версии команды, для данных без версии и несуществующей команды - UNVERSIONED_ETAG.
+        Читается до самих данных, поэтому ETag никогда не новее отданного представления
+        """
+        version = await Team.objects.filter(name=team_name).values_list('version', flat=True).afirst()
+        return cls._etag(version)
+
+    @classmethod
+    @read_from_replica
+    async def aget_user_etag(cls, user_id: str) -> str:
+        """
+        Сильный ETag по версии очереди ревью пользователя, аналогично aget_team_etag
+        """
+        version = await User.objects.filter(id=user_id).values_list('review_version', flat=True).afirst()
+        return cls._etag(version)
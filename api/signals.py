@@ -0,0 +1,40 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import User
+from .instrumentation import install_query_timer
+from .roster_cache import roster_cache
+
+# Отправляется сервисами после массовых записей пользователей (update/bulk_create),
+# для которых Django не шлет post_save. Аргумент team_ids - затронутые команды
+users_bulk_updated = Signal()
+
+
+@receiver(post_init, sender=User)
+def remember_user_team(sender, instance, **kwargs):
+    # Запоминаем исходную команду, чтобы при переводе сбросить состав обеих команд
+    # (через __dict__, чтобы не загружать отложенное поле)
+    instance._roster_team_id = instance.__dict__.get('team_id')
+
+
+@receiver(post_save, sender=User)
+def invalidate_roster_on_save(sender, instance, **kwargs):
+    roster_cache.invalidate_on_commit([instance.team_id, instance._roster_team_id])
+    instance._roster_team_id = instance.team_id
+
+
+@receiver(post_delete, sender=User)
+def invalidate_roster_on_delete(sender, instance, **kwargs):
+    roster_cache.invalidate_on_commit([instance.team_id, instance._roster_team_id])
+
+
+@receiver(users_bulk_updated)
+def invalidate_roster_on_bulk_update(sender, team_ids, **kwargs):
+    roster_cache.invalidate_on_commit(team_ids)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    # Счетчики запросов и времени БД для instrumentation_middleware
+    install_query_timer(connection)
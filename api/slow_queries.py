@@ -0,0 +1,103 @@
+import itertools
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .jsonl_log import JsonlLog
+
+# Операторы, для которых снимается план. EXPLAIN без ANALYZE их не выполняет
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# Плейсхолдер параметра и экранированный % в SQL Django
+PLACEHOLDER = re.compile(r'%[s%]')
+
+
+def threshold():
+    """
+    Порог медленного запроса в секундах или None, если журнал выключен
+    """
+    threshold_ms = settings.SLOW_QUERY_THRESHOLD_MS
+    return None if threshold_ms is None else threshold_ms / 1000
+
+
+def explain(alias: str, sql: str, params=None):
+    """
+    План запроса без выполнения: EXPLAIN (ANALYZE false) в PostgreSQL, EXPLAIN QUERY PLAN в SQLite.
+    Без params значения параметров в БД не передаются и в план не попадают: PostgreSQL строит
+    общий план по $1, $2... (GENERIC_PLAN, PostgreSQL 16+), SQLite получает NULL.
+    Возвращает None, если общий план не поддерживается (PostgreSQL до 16)
+    """
+    connection = connections[alias]
+    options = {'analyze': False} if connection.vendor == 'postgresql' else {}
+    if params is None:
+        placeholders = PLACEHOLDER.findall(sql).count('%s')
+        if placeholders and connection.vendor == 'postgresql':
+            if connection.pg_version < 160000:
+                return None
+            options['generic_plan'] = True
+            numbers = itertools.count(1)
+            # Без params драйвер не подставляет значения, поэтому %% снимается здесь же
+            sql = PLACEHOLDER.sub(lambda match: f'${next(numbers)}' if match.group() == '%s' else '%', sql)
+        else:
+            params = [None] * placeholders
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix(**options)} {sql}', params)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class SlowQueryLog(JsonlLog):
+    """
+    Журнал медленных запросов: строка JSON на запрос в файл SLOW_QUERY_LOG_FILE с ротацией.
+    План снимается в потоке записи, запрос-источник ждет только постановки в очередь.
+    Значения параметров (персональные данные, токены) пишутся и передаются в EXPLAIN
+    только при SLOW_QUERY_LOG_PARAMS, иначе в записи остается их число
+    """
+
+    def __init__(self):
+        super().__init__('SLOW_QUERY')
+
+    def record(self, alias: str, sql: str, params, many: bool, duration: float, service: str):
+        """
+        Ставит медленный запрос в очередь записи, возвращает Future записи или None, если он отброшен
+        """
+        # Свой EXPLAIN тоже может оказаться медленным
+        if sql.lstrip()[:7].upper() == 'EXPLAIN':
+            return None
+
+        entry = {
+            'time': timezone.now().isoformat(),
+            'alias': alias,
+            'duration_ms': round(duration * 1000, 2),
+            'service': service,
+            'sql': sql,
+        }
+        if many:
+            # У executemany сохраняется первый набор параметров и их число
+            batch = params if isinstance(params, (list, tuple)) else []
+            params = batch[0] if batch else None
+            entry['batch_size'] = len(batch)
+        if settings.SLOW_QUERY_LOG_PARAMS:
+            entry['params'] = params
+        else:
+            entry['params_count'] = len(params) if isinstance(params, (list, tuple, dict)) else 0
+        return self.submit(entry)
+
+    def prepare(self, entry: dict) -> dict:
+        if settings.SLOW_QUERY_EXPLAIN and entry['sql'].lstrip()[:6].upper().startswith(EXPLAINABLE):
+            try:
+                plan = explain(entry['alias'], entry['sql'], entry.get('params'))
+                if plan is None:
+                    entry['plan_error'] = 'GENERIC_PLAN requires PostgreSQL 16'
+                else:
+                    entry['plan'] = plan
+            except Exception as e:
+                entry['plan_error'] = str(e)
+            finally:
+                # Поток живет дольше запроса, соединения с БД закрываем сами
+                connections.close_all()
+        return entry
+
+
+slow_query_log = SlowQueryLog()
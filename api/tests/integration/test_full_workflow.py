@@ -1,3 +1,5 @@
+import json
+from asgiref.sync import async_to_sync
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -30,8 +32,8 @@ class FullWorkflowIntegrationTest(APITestCase):
         # Проверяем что команда создана через GET API
         response = self.client.get(f"{reverse('api:team-get')}?team_name=backend-team")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['team_name'], 'backend-team')
-        self.assertEqual(len(response.data['members']), 4)
+        self.assertEqual(response.json()['team_name'], 'backend-team')
+        self.assertEqual(len(response.json()['members']), 4)
 
         # Создаем PR через API
         pr_data = {
@@ -54,9 +56,9 @@ class FullWorkflowIntegrationTest(APITestCase):
         reviewer_id = assigned_reviewers[0]
         response = self.client.get(f"{reverse('api:user-get-review')}?user_id={reviewer_id}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['user_id'], reviewer_id)
-        self.assertEqual(len(response.data['pull_requests']), 1)
-        self.assertEqual(response.data['pull_requests'][0]['pull_request_id'], 'feature-auth')
+        self.assertEqual(response.json()['user_id'], reviewer_id)
+        self.assertEqual(len(response.json()['pull_requests']), 1)
+        self.assertEqual(response.json()['pull_requests'][0]['pull_request_id'], 'feature-auth')
 
         # Переназначаем одного ревьювера через API
         reassign_data = {
@@ -72,13 +74,13 @@ class FullWorkflowIntegrationTest(APITestCase):
         # Проверяем что у старого ревьювера больше нет этого PR
         response = self.client.get(f"{reverse('api:user-get-review')}?user_id={reviewer_id}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['pull_requests']), 0)
+        self.assertEqual(len(response.json()['pull_requests']), 0)
 
         # Проверяем что у нового ревьювера появился этот PR
         response = self.client.get(f"{reverse('api:user-get-review')}?user_id={new_reviewer}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['pull_requests']), 1)
-        self.assertEqual(response.data['pull_requests'][0]['pull_request_id'], 'feature-auth')
+        self.assertEqual(len(response.json()['pull_requests']), 1)
+        self.assertEqual(response.json()['pull_requests'][0]['pull_request_id'], 'feature-auth')
 
         # Мержим PR через API
         merge_data = {"pull_request_id": "feature-auth"}
@@ -340,16 +342,16 @@ class DataConsistencyIntergrationTest(APITestCase):
 
         response = self.client.get(f"{reverse('api:team-get')}?team_name=consistency-team")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['members']), 3)
+        self.assertEqual(len(response.json()['members']), 3)
 
         # Проверяем PR для каждого пользователя
         for user_id in ["c1", "c2", "c3"]:
             response = self.client.get(f"{reverse('api:user-get-review')}?user_id={user_id}")
             self.assertEqual(response.status_code, status.HTTP_200_OK)
             if user_id == "c1":
-                self.assertEqual(len(response.data['pull_requests']), 0)
+                self.assertEqual(len(response.json()['pull_requests']), 0)
             else:
-                self.assertTrue(len(response.data['pull_requests']) >= 0)
+                self.assertTrue(len(response.json()['pull_requests']) >= 0)
 
         merge_data = {"pull_request_id": "consistency-pr-1"}
         response = self.client.post(reverse('api:pr-merge'), merge_data, format='json')
@@ -357,8 +359,287 @@ class DataConsistencyIntergrationTest(APITestCase):
 
         response = self.client.get(f"{reverse('api:user-get-review')}?user_id=c2")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        for pr in response.data['pull_requests']:
+        for pr in response.json()['pull_requests']:
             if pr['pull_request_id'] == 'consistency-pr-1':
                 self.assertEqual(pr['status'], 'MERGED')
             else:
-                self.assertEqual(pr['status'], 'OPEN')
\ No newline at end of file
+                self.assertEqual(pr['status'], 'OPEN')
+
+class BulkDeactivateJobIntergrationTest(APITestCase):
+    """
+    Intergration тесты фоновой массовой деактивации
+    """
+
+    def test_async_bulk_deactivate_workflow(self):
+        """
+        Intergration тест: запуск фоновой деактивации и опрос прогресса
+        """
+        team_data = {
+            "team_name": "async-team",
+            "members": [
+                {"user_id": f"a{i}", "username": f"Async {i}", "is_active": True}
+                for i in range(1, 5)
+            ]
+        }
+        self.client.post(reverse('api:team-add'), team_data, format='json')
+        pr_data = {"pull_request_id": "async-pr", "pull_request_name": "Async PR", "author_id": "a1"}
+        self.client.post(reverse('api:pr-create'), pr_data, format='json')
+
+        deactivate_data = {"team_name": "async-team", "user_ids": ["a2", "a3"], "async": True}
+        response = self.client.post(reverse('api:team-bulk-deactivate'), deactivate_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job']['job_id']
+
+        response = self.client.get(f"{reverse('api:jobs-get')}?job_id={job_id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['job']['status'], 'DONE')
+        self.assertEqual(response.data['job']['result']['deactivated'], 2)
+
+        response = self.client.get(f"{reverse('api:jobs-get')}?job_id=missing")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class StatisticIntergrationTest(APITestCase):
+    """
+    Intergration тесты статистики
+    """
+
+    def test_statistic_pagination_workflow(self):
+        """
+        Intergration тест: постраничное чтение статистики и валидация параметров
+        """
+        team_data = {
+            "team_name": "stats-team",
+            "members": [
+                {"user_id": f"st{i}", "username": f"Stats {i}", "is_active": True}
+                for i in range(1, 4)
+            ]
+        }
+        self.client.post(reverse('api:team-add'), team_data, format='json')
+        for i in range(3):
+            pr_data = {"pull_request_id": f"stats-pr-{i}", "pull_request_name": "Stats PR", "author_id": "st1"}
+            self.client.post(reverse('api:pr-create'), pr_data, format='json')
+
+        response = self.client.get(f"{reverse('api:statistic-view')}?limit=2&team=stats-team")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['pr_reviewer_stats']), 2)
+        self.assertEqual(len(response.json()['user_review_stats']), 2)
+        self.assertEqual(response.json()['pr_reviewer_stats'][0]['team_name'], 'stats-team')
+
+        response = self.client.get(
+            f"{reverse('api:statistic-view')}?limit=2&cursor={response.json()['next_cursor']}"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['pr_reviewer_stats']), 1)
+        self.assertIsNone(response.json()['next_cursor'])
+
+        response = self.client.get(f"{reverse('api:statistic-view')}?status=CLOSED")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f"{reverse('api:statistic-view')}?created_from=yesterday")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Время без зоны считается UTC
+        response = self.client.get(f"{reverse('api:statistic-view')}?created_from=2024-01-01T00:00:00&team=stats-team")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['pr_reviewer_stats']), 3)
+
+    async def _export(self, params):
+        # Выгрузка - асинхронный поток, читаем ее через ASGI-клиент
+        response = await self.async_client.get(reverse('api:export-pull-requests'), params)
+        if not response.streaming:
+            return response, response.content
+        return response, b''.join([chunk async for chunk in response.streaming_content])
+
+    def test_export_pull_requests_ndjson(self):
+        """
+        Intergration тест: потоковая выгрузка PR в NDJSON
+        """
+        team_data = {
+            "team_name": "export-team",
+            "members": [
+                {"user_id": f"ex{i}", "username": f"Export {i}", "is_active": True}
+                for i in range(1, 4)
+            ]
+        }
+        self.client.post(reverse('api:team-add'), team_data, format='json')
+        for i in range(2):
+            pr_data = {"pull_request_id": f"export-pr-{i}", "pull_request_name": "Export PR", "author_id": "ex1"}
+            self.client.post(reverse('api:pr-create'), pr_data, format='json')
+
+        response, content = async_to_sync(self._export)({'team': 'export-team'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([line['pull_request_id'] for line in lines], ['export-pr-0', 'export-pr-1'])
+        self.assertEqual(len(lines[0]['assigned_reviewers']), 2)
+
+        response = self.client.get(f"{reverse('api:export-pull-requests')}?since=yesterday")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Время без зоны считается UTC
+        response, content = async_to_sync(self._export)({'since': '2024-01-01T00:00:00', 'team': 'export-team'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(content.splitlines()), 2)
+class BulkPullRequestIntergrationTest(APITestCase):
+    """
+    Intergration тесты пакетных операций над PR
+    """
+
+    def setUp(self):
+        team_data = {
+            "team_name": "bulk-team",
+            "members": [
+                {"user_id": f"bk{i}", "username": f"Bulk {i}", "is_active": True}
+                for i in range(1, 5)
+            ]
+        }
+        self.client.post(reverse('api:team-add'), team_data, format='json')
+
+    def test_bulk_create_workflow(self):
+        """
+        Intergration тест: пакетное создание PR с ошибками по элементам
+        """
+        bulk_data = {"pull_requests": [
+            {"pull_request_id": "bulk-pr-1", "pull_request_name": "Bulk PR 1", "author_id": "bk1"},
+            {"pull_request_id": "bulk-pr-2", "pull_request_name": "Bulk PR 2", "author_id": "missing"},
+        ]}
+        response = self.client.post(reverse('api:pr-bulk-create'), bulk_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first, second = response.data['results']
+        self.assertEqual(first['pr']['pull_request_id'], 'bulk-pr-1')
+        self.assertEqual(len(first['pr']['assigned_reviewers']), 2)
+        self.assertEqual(second['error']['code'], 'NOT_FOUND')
+
+        response = self.client.post(reverse('api:pr-bulk-create'), bulk_data, format='json')
+        self.assertEqual(response.data['results'][0]['error']['code'], 'PR_EXISTS')
+
+        response = self.client.post(reverse('api:pr-bulk-create'), {"pull_requests": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_merge_and_reassign_workflow(self):
+        """
+        Intergration тест: пакетное переназначение и пакетный мерж
+        """
+        bulk_data = {"pull_requests": [
+            {"pull_request_id": f"bulk-pr-{i}", "pull_request_name": f"Bulk PR {i}", "author_id": "bk1"}
+            for i in range(3)
+        ]}
+        response = self.client.post(reverse('api:pr-bulk-create'), bulk_data, format='json')
+        reviewers = [result['pr']['assigned_reviewers'] for result in response.data['results']]
+
+        reassign_data = {"reassignments": [
+            {"pull_request_id": "bulk-pr-0", "old_user_id": reviewers[0][0]},
+            {"pull_request_id": "missing", "old_user_id": "bk2"},
+        ]}
+        response = self.client.post(reverse('api:pr-bulk-reassign'), reassign_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        replaced, missing = response.data['results']
+        self.assertIn(replaced['replaced_by'], replaced['pr']['assigned_reviewers'])
+        self.assertNotIn(reviewers[0][0], replaced['pr']['assigned_reviewers'])
+        self.assertEqual(missing['error']['code'], 'NOT_FOUND')
+
+        merge_data = {"pull_request_ids": ["bulk-pr-0", "bulk-pr-1", "missing"]}
+        response = self.client.post(reverse('api:pr-bulk-merge'), merge_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [result.get('pr', {}).get('status') for result in response.data['results']]
+        self.assertEqual(statuses, ['MERGED', 'MERGED', None])
+
+        reassign_data = {"reassignments": [{"pull_request_id": "bulk-pr-1", "old_user_id": reviewers[1][0]}]}
+        response = self.client.post(reverse('api:pr-bulk-reassign'), reassign_data, format='json')
+        self.assertEqual(response.data['results'][0]['error']['code'], 'PR_MERGED')
+
+        response = self.client.post(reverse('api:pr-bulk-merge'), {"pull_request_ids": "bulk-pr-2"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetIntergrationTest(APITestCase):
+    """
+    Intergration тесты ETag / If-None-Match для /team/get и /users/getReview
+    """
+
+    def setUp(self):
+        team_data = {
+            "team_name": "etag-team",
+            "members": [
+                {"user_id": f"et{i}", "username": f"Etag {i}", "is_active": True}
+                for i in range(1, 5)
+            ]
+        }
+        self.client.post(reverse('api:team-add'), team_data, format='json')
+        self.team_url = f"{reverse('api:team-get')}?team_name=etag-team"
+
+    def _review_url(self, user_id):
+        return f"{reverse('api:user-get-review')}?user_id={user_id}"
+
+    def _assert_not_modified(self, url, etag):
+        # Проверка версии - один запрос колонки версии команды или пользователя, без чтения участников и PR
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_team_etag_workflow(self):
+        """
+        Intergration тест: ETag команды меняется после setIsActive, /team/add и массовой деактивации
+        """
+        response = self.client.get(self.team_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self._assert_not_modified(self.team_url, etag)
+
+        writes = [
+            ('api:user-set-active', {"user_id": "et1", "is_active": False}),
+            ('api:team-add', {"team_name": "etag-team", "members": [
+                {"user_id": "et5", "username": "Etag 5", "is_active": True}
+            ]}),
+            ('api:team-bulk-deactivate', {"team_name": "etag-team", "user_ids": ["et2"]}),
+        ]
+        for url_name, data in writes:
+            self.client.post(reverse(url_name), data, format='json')
+            response = self.client.get(self.team_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url_name)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+        members = {member['user_id']: member['is_active'] for member in response.json()['members']}
+        self.assertEqual(members, {"et1": False, "et2": False, "et3": True, "et4": True, "et5": True})
+
+    def test_unversioned_etag_never_not_modified(self):
+        """
+        Intergration тест: If-None-Match с ETag данных без версии ("0") не дает 304 для несуществующих
+        команды и пользователя - view отвечает 404
+        """
+        response = self.client.get(f"{reverse('api:team-get')}?team_name=missing", HTTP_IF_NONE_MATCH='"0"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(self._review_url("missing"), HTTP_IF_NONE_MATCH='"0"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_review_queue_etag_workflow(self):
+        """
+        Intergration тест: ETag очереди ревью меняется при создании, переназначении и мерже PR
+        """
+        response = self.client.post(reverse('api:pr-create'), {
+            "pull_request_id": "etag-pr", "pull_request_name": "Etag PR", "author_id": "et1"
+        }, format='json')
+        old_reviewer = response.data['pr']['assigned_reviewers'][0]
+
+        response = self.client.get(self._review_url(old_reviewer))
+        self.assertEqual(len(response.json()['pull_requests']), 1)
+        old_etag = response['ETag']
+        self._assert_not_modified(self._review_url(old_reviewer), old_etag)
+
+        response = self.client.post(reverse('api:pr-reassign'), {
+            "pull_request_id": "etag-pr", "old_user_id": old_reviewer
+        }, format='json')
+        new_reviewer = response.data['replaced_by']
+
+        response = self.client.get(self._review_url(old_reviewer), HTTP_IF_NONE_MATCH=old_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['pull_requests'], [])
+
+        response = self.client.get(self._review_url(new_reviewer))
+        new_etag = response['ETag']
+        self.client.post(reverse('api:pr-merge'), {"pull_request_id": "etag-pr"}, format='json')
+        response = self.client.get(self._review_url(new_reviewer), HTTP_IF_NONE_MATCH=new_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['pull_requests'][0]['status'], 'MERGED')
@@ -0,0 +1,124 @@
+import asyncio
+
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from api.coalescing import SingleFlight, coalesce_requests, single_flight
+from api.db_router import pin_to_primary, unpin
+
+
+@override_settings(REQUEST_COALESCING_TTL=1.0, REQUEST_COALESCING_BACKEND=None)
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    async def _slow(self, value='stats'):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return value
+
+    async def test_concurrent_requests_share_one_computation(self):
+        """Тест что одновременные запросы с одним ключом вычисляются один раз"""
+        results = await asyncio.gather(*[self.flight.run('k', self._slow) for _ in range(10)])
+
+        self.assertEqual(results, ['stats'] * 10)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((self.flight.computed, self.flight.joined), (1, 9))
+
+    async def test_result_reused_within_ttl(self):
+        """Тест повторной выдачи результата в пределах TTL и пересчета после"""
+        with override_settings(REQUEST_COALESCING_TTL=0.05):
+            await self.flight.run('k', self._slow)
+            await self.flight.run('k', self._slow)
+            self.assertEqual((self.calls, self.flight.hits), (1, 1))
+
+            await asyncio.sleep(0.06)
+            await self.flight.run('k', self._slow)
+        self.assertEqual(self.calls, 2)
+
+        await self.flight.run('other', self._slow)
+        self.assertEqual(self.calls, 3)
+
+    async def test_errors_and_uncacheable_results_not_reused(self):
+        """Тест что ошибка достается всем ждущим, но ни ошибка, ни неподходящий результат не запоминаются"""
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError('boom')
+
+        results = await asyncio.gather(*[self.flight.run('k', failing) for _ in range(3)], return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+        await self.flight.run('k', self._slow, cacheable=lambda value: False)
+        await self.flight.run('k', self._slow, cacheable=lambda value: False)
+        self.assertEqual(self.calls, 2)
+
+    @override_settings(REQUEST_COALESCING_BACKEND='default')
+    async def test_shared_between_processes(self):
+        """Тест что второй процесс берет результат первого из общего кэша"""
+        self.addCleanup(cache.clear)
+        other_process = SingleFlight()
+
+        self.assertEqual(await self.flight.run('k', self._slow), 'stats')
+        self.assertEqual(await other_process.run('k', lambda: self._slow('other')), 'stats')
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(REQUEST_COALESCING_BACKEND='default')
+    async def test_waits_for_other_process_lock(self):
+        """Тест ожидания результата, который вычисляет процесс, держащий блокировку"""
+        self.addCleanup(cache.clear)
+        await cache.aadd('coalesce:lock:k', 1)
+
+        async def other_process_finishes():
+            await asyncio.sleep(0.05)
+            await cache.aset('coalesce:k', 'from other process')
+            await cache.adelete('coalesce:lock:k')
+
+        finisher = asyncio.ensure_future(other_process_finishes())
+        self.assertEqual(await self.flight.run('k', self._slow), 'from other process')
+        await finisher
+        self.assertEqual(self.calls, 0)
+
+
+@override_settings(REQUEST_COALESCING_TTL=1.0, REQUEST_COALESCING_BACKEND=None)
+class CoalesceRequestsTest(SimpleTestCase):
+    def setUp(self):
+        single_flight.clear()
+        self.addCleanup(single_flight.clear)
+        self.factory = RequestFactory()
+        self.calls = 0
+
+        @coalesce_requests
+        async def view(request):
+            self.calls += 1
+            await asyncio.sleep(0.02)
+            status = 400 if 'bad' in request.GET else 200
+            return JsonResponse({'calls': self.calls}, status=status)
+
+        self.view = view
+
+    async def test_normalized_query_params(self):
+        """Тест что порядок параметров не влияет на ключ, а другие значения - влияют"""
+        responses = await asyncio.gather(
+            self.view(self.factory.get('/statistic', {'team': 'a', 'limit': '10'})),
+            self.view(self.factory.get('/statistic?limit=10&team=a')),
+        )
+        self.assertEqual([response.content for response in responses], [b'{"calls": 1}'] * 2)
+        self.assertEqual(responses[1]['Content-Type'], 'application/json')
+
+        await self.view(self.factory.get('/statistic', {'team': 'b', 'limit': '10'}))
+        self.assertEqual(self.calls, 2)
+
+    async def test_errors_and_pinned_clients_not_reused(self):
+        """Тест что ошибки не переиспользуются, а клиент после записи получает свежий ответ"""
+        await self.view(self.factory.get('/statistic', {'bad': '1'}))
+        response = await self.view(self.factory.get('/statistic', {'bad': '1'}))
+        self.assertEqual((response.status_code, self.calls), (400, 2))
+
+        await self.view(self.factory.get('/statistic'))
+        token = pin_to_primary()
+        try:
+            await self.view(self.factory.get('/statistic'))
+        finally:
+            unpin(token)
+        self.assertEqual(self.calls, 4)
@@ -0,0 +1,176 @@
+import random
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from api.db_retry import retry_on_conflict
+from api.models import Team, User, PullRequest
+from api.services import PullRequestService, StatsService
+
+
+class ConcurrentAssignmentScenarios:
+    """
+    Параллельные create/reassign/merge из нескольких потоков, у каждого свое соединение с БД
+    """
+    threads_count = 8
+    prs_per_thread = 5
+
+    def setUp(self):
+        self.team = Team.objects.create(name="backend")
+        self.members = [
+            User.objects.create(id=f"u{i}", username=f"User {i}", is_active=True, team=self.team)
+            for i in range(8)
+        ]
+        PullRequestService.create_pull_request("hot", "Hot PR", "u0")
+
+    def _run_threads(self, target):
+        barrier = threading.Barrier(self.threads_count)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                target(index)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(self.threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    @staticmethod
+    @retry_on_conflict
+    def _current_reviewers(pr_id) -> list:
+        # В SQLite чтение вне транзакции тоже упирается в блокировку таблицы пишущим потоком
+        return list(PullRequest.objects.get(id=pr_id).reviewers.values_list('id', flat=True))
+
+    def _assert_invariants(self):
+        through = PullRequest.reviewers.through
+        pairs = list(through.objects.values_list('pullrequest_id', 'user_id'))
+        self.assertEqual(len(pairs), len(set(pairs)), 'duplicate reviewers')
+
+        for pr in PullRequest.objects.prefetch_related('reviewers'):
+            reviewer_ids = [reviewer.id for reviewer in pr.reviewers.all()]
+            self.assertLessEqual(len(reviewer_ids), 2)
+            self.assertNotIn(pr.author_id, reviewer_ids, f'author reviews own PR {pr.id}')
+
+        counters = dict(User.objects.values_list('id', 'open_reviews'))
+        StatsService.rebuild_review_counters()
+        self.assertEqual(counters, dict(User.objects.values_list('id', 'open_reviews')))
+
+    def test_parallel_create_and_reassign(self):
+        """Стресс-тест: гонки создания PR с одним id и переназначения на одном PR"""
+        outcomes = {'created': 0, 'exists': 0, 'reassigned': 0, 'rejected': 0}
+        lock = threading.Lock()
+
+        def count(outcome):
+            with lock:
+                outcomes[outcome] += 1
+
+        def scenario(index):
+            author_id = f"u{index}"
+            for i in range(self.prs_per_thread):
+                PullRequestService.create_pull_request(f"pr-{index}-{i}", "PR", author_id)
+
+            try:
+                PullRequestService.create_pull_request("dup", "Duplicate", author_id)
+                count('created')
+            except ValidationError as e:
+                self.assertEqual(e.code, 'PR_EXISTS')
+                count('exists')
+
+            for _ in range(3):
+                current = self._current_reviewers("hot")
+                try:
+                    PullRequestService.reassign_reviewer("hot", random.choice(current))
+                    count('reassigned')
+                except ValidationError as e:
+                    # Ревьювера уже заменил параллельный поток
+                    self.assertEqual(e.code, 'NOT_ASSIGNED')
+                    count('rejected')
+
+        self._run_threads(scenario)
+
+        self.assertEqual((outcomes['created'], outcomes['exists']), (1, self.threads_count - 1))
+        self.assertEqual(outcomes['reassigned'] + outcomes['rejected'], 3 * self.threads_count)
+        self.assertEqual(PullRequest.objects.count(), 2 + self.threads_count * self.prs_per_thread)
+        self.assertEqual(PullRequest.objects.get(id="hot").reviewers.count(), 2)
+        self._assert_invariants()
+
+    def test_parallel_merge_and_reassign(self):
+        """Стресс-тест: мерж и переназначение одних и тех же PR из разных потоков"""
+        for i in range(self.threads_count):
+            PullRequestService.create_pull_request(f"pr-{i}", "PR", f"u{i}")
+
+        def scenario(index):
+            for i in range(self.threads_count):
+                pr_id = f"pr-{(index + i) % self.threads_count}"
+                if (index + i) % 3 == 0:
+                    PullRequestService.merge_pull_request(pr_id)
+                    continue
+                current = self._current_reviewers(pr_id)
+                if not current:
+                    continue
+                try:
+                    PullRequestService.reassign_reviewer(pr_id, random.choice(current))
+                except ValidationError as e:
+                    self.assertIn(e.code, ('NOT_ASSIGNED', 'PR_MERGED'))
+
+        self._run_threads(scenario)
+
+        merged_reviews = sum(User.objects.values_list('merged_reviews', flat=True))
+        self._assert_invariants()
+        self.assertEqual(merged_reviews, sum(User.objects.values_list('merged_reviews', flat=True)))
+
+
+@override_settings(DB_CONFLICT_RETRIES=50)
+class ConcurrentAssignmentStressTest(ConcurrentAssignmentScenarios, TransactionTestCase):
+    """
+    На SQLite запись блокирует всю базу, поэтому потокам нужно много повторов
+    """
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only: DATABASE_URL=postgresql://...')
+class PostgresConcurrentAssignmentTest(ConcurrentAssignmentScenarios, TransactionTestCase):
+    """
+    Те же гонки на PostgreSQL, где работают блокировки строк FOR UPDATE, с DB_CONFLICT_RETRIES по умолчанию
+    """
+
+
+class RetryOnConflictTest(TestCase):
+    def _flaky(self, failures: int, message: str = 'database is locked'):
+        calls = []
+
+        @retry_on_conflict
+        def operation():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return len(calls)
+
+        return operation
+
+    @override_settings(DB_CONFLICT_RETRIES=3)
+    def test_retries_conflicts_outside_transaction(self):
+        """Тест повтора при конфликте и проброса после исчерпания попыток"""
+        # TestCase оборачивает тест в транзакцию, поэтому выходим из нее так же, как сервис вне запроса
+        with patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(self._flaky(2)(), 3)
+            with self.assertRaises(OperationalError):
+                self._flaky(3)()
+            with self.assertRaises(OperationalError):
+                self._flaky(1, 'no such table: users')()
+
+    def test_no_retry_inside_outer_transaction(self):
+        """Тест что внутри внешней транзакции конфликт пробрасывается сразу"""
+        with transaction.atomic():
+            with self.assertRaises(OperationalError):
+                self._flaky(1)()
@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+from django.db import connections, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.db_router import ReplicaRouter, pin_to_primary, unpin, read_from_replica
+from api.middleware import REPLICA_PIN_COOKIE
+from api.models import Team, User
+from api.services import TeamService, UserService, StatsService
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # Реплика-зеркало в тестах - то же соединение: второе соединение к in-memory SQLite
+        # упирается в блокировку незакоммиченной транзакции теста
+        replica = connections['replica']
+        connections['replica'] = connections['default']
+        cls.addClassCleanup(connections.__setitem__, 'replica', replica)
+        super().setUpClass()
+
+    def setUp(self):
+        self.team = Team.objects.create(name="backend")
+        User.objects.create(id="u1", username="Alice", is_active=True, team=self.team)
+        # TestCase держит default внутри транзакции, а сервис в запросе работает вне ее
+        self.outside_transaction = patch.object(connections['default'], 'in_atomic_block', False)
+
+    def test_read_methods_use_replica(self):
+        """Тест что читающие методы сервисов читают из реплики"""
+        with self.outside_transaction:
+            team = TeamService.get_team_with_members("backend")
+            UserService.get_user_review_assignments("u1")
+            StatsService.get_review_stats(team_name="backend")
+
+        self.assertEqual(team._state.db, 'replica')
+        # Вне сервисов чтения по-прежнему идут в default
+        self.assertEqual(Team.objects.get(name="backend")._state.db, 'default')
+
+    async def test_async_read_methods_use_replica(self):
+        """Тест что async-методы тоже читают из реплики"""
+        with self.outside_transaction:
+            team = await TeamService.aget_team_with_members("backend")
+        self.assertEqual(team._state.db, 'replica')
+
+    def test_pinned_and_transactional_reads_use_default(self):
+        """Тест read-your-writes: после записи и внутри транзакции чтения идут в default"""
+        token = pin_to_primary()
+        try:
+            with self.outside_transaction:
+                self.assertEqual(TeamService.get_team_with_members("backend")._state.db, 'default')
+        finally:
+            unpin(token)
+
+        with transaction.atomic():
+            self.assertEqual(TeamService.get_team_with_members("backend")._state.db, 'default')
+
+    def test_writes_and_migrations_stay_on_default(self):
+        """Тест что записи и миграции никогда не идут в реплику"""
+        router = ReplicaRouter()
+        with self.outside_transaction:
+            self.assertEqual(read_from_replica(lambda: router.db_for_read(Team))(), 'replica')
+            self.assertEqual(read_from_replica(lambda: router.db_for_write(Team))(), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'api'))
+        self.assertTrue(router.allow_migrate('default', 'api'))
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'replica_1'])
+    def test_one_replica_per_request(self):
+        """Тест что все чтения запроса идут в одну реплику, а следующий запрос выбирает ее заново"""
+        router = ReplicaRouter()
+        choose = read_from_replica(lambda: router.db_for_read(Team))
+
+        def request_reads():
+            token = pin_to_primary(False)
+            try:
+                return {choose() for _ in range(5)}
+            finally:
+                unpin(token)
+
+        with self.outside_transaction, patch('api.db_router.random.choice', side_effect=['replica_1', 'replica']):
+            self.assertEqual(request_reads(), {'replica_1'})
+            self.assertEqual(request_reads(), {'replica'})
+
+    def test_write_request_sets_pin_cookie(self):
+        """Тест что POST выставляет cookie окна read-your-writes, а GET - нет"""
+        response = self.client.post(
+            reverse('api:user-set-active'), {'user_id': 'u1', 'is_active': False}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+        self.client.cookies.clear()
+        response = self.client.get(reverse('api:team-get'), {'team_name': 'backend'})
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from api.models import Team, User, PullRequest
+from api.services import ExportService
+
+
+class ExportServiceTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name="backend")
+        self.author = User.objects.create(id="author", username="Author", is_active=True, team=self.team)
+        self.reviewer = User.objects.create(id="reviewer", username="Reviewer", is_active=True, team=self.team)
+        for i in range(5):
+            pr = PullRequest.objects.create(id=f"pr-{i}", name=f"PR {i}", author=self.author)
+            if i % 2 == 0:
+                pr.reviewers.add(self.reviewer)
+
+    def test_iter_pull_requests_joins_reviewers_in_batches(self):
+        """Тест что ревьюверы подгружаются одним запросом на пачку"""
+        # 1 запрос строк PR + по одному запросу ревьюверов на каждую из трех пачек
+        with self.assertNumQueries(4):
+            pull_requests = list(ExportService.iter_pull_requests(chunk_size=2))
+
+        self.assertEqual([pr['id'] for pr in pull_requests], [f"pr-{i}" for i in range(5)])
+        self.assertEqual(pull_requests[0]['reviewers'], ["reviewer"])
+        self.assertEqual(pull_requests[1]['reviewers'], [])
+        self.assertEqual(pull_requests[0]['team_name'], "backend")
+
+    def test_iter_pull_requests_since(self):
+        """Тест что since отбирает созданные или смерженные после указанного момента PR"""
+        old = timezone.now() - timedelta(days=10)
+        PullRequest.objects.exclude(id="pr-4").update(created_at=old)
+        PullRequest.objects.filter(id="pr-0").update(status=PullRequest.Status.MERGED, merged_at=timezone.now())
+
+        pull_requests = ExportService.iter_pull_requests(since=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(sorted(pr['id'] for pr in pull_requests), ["pr-0", "pr-4"])
+
+    def test_iter_pull_requests_status_filter(self):
+        """Тест фильтра по статусу"""
+        PullRequest.objects.filter(id="pr-1").update(status=PullRequest.Status.MERGED, merged_at=timezone.now())
+
+        pull_requests = ExportService.iter_pull_requests(status=PullRequest.Status.MERGED)
+
+        self.assertEqual([pr['id'] for pr in pull_requests], ["pr-1"])
+
+    async def test_aiter_pull_requests_matches_sync(self):
+        """Тест что асинхронная выгрузка совпадает с синхронной"""
+        pull_requests = [pr async for pr in ExportService.aiter_pull_requests(chunk_size=2)]
+
+        self.assertEqual([pr['id'] for pr in pull_requests], [f"pr-{i}" for i in range(5)])
+        self.assertEqual(pull_requests[0]['reviewers'], ["reviewer"])
+
+    async def test_export_streams_by_chunk_under_asgi(self):
+        """Тест что под ASGI выгрузка отдается по пачкам, а не собирается целиком до первого байта"""
+        with patch('api.services.EXPORT_CHUNK_SIZE', 2), \
+                patch.object(ExportService, '_with_reviewers', wraps=ExportService._with_reviewers) as with_reviewers:
+            response = await self.async_client.get(reverse('api:export-pull-requests'))
+            self.assertTrue(response.is_async)
+
+            chunks = aiter(response.streaming_content)
+            first = await anext(chunks)
+            # Прочитана первая строка - загружена только первая пачка
+            self.assertEqual(with_reviewers.call_count, 1)
+            rest = [chunk async for chunk in chunks]
+
+        self.assertEqual(with_reviewers.call_count, 3)
+        self.assertEqual(len([first, *rest]), 5)
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from api.idempotency import lease_renewer
+from api.models import IdempotencyKey, PullRequest
+from api.services import PullRequestService, TeamService
+
+
+class IdempotencyKeyTest(APITestCase):
+    def setUp(self):
+        TeamService.create_team_with_members("backend", [
+            {"user_id": f"u{i}", "username": f"User {i}", "is_active": True} for i in range(1, 4)
+        ])
+        self.pr_data = {"pull_request_id": "pr-1", "pull_request_name": "PR", "author_id": "u1"}
+
+    def _create(self, key, data=None):
+        return self.client.post(reverse('api:pr-create'), data or self.pr_data, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        """Тест что повтор create с тем же ключом получает исходный 201, а не PR_EXISTS"""
+        first = self._create("key-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        # Только SELECT сохраненного ответа: сервис и блокировки не задействуются
+        with patch.object(PullRequestService, 'create_pull_request') as create, self.assertNumQueries(1):
+            retry = self._create("key-1")
+
+        create.assert_not_called()
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+        # Без ключа повтор выполняется заново и упирается в занятый id
+        self.assertEqual(self.client.post(reverse('api:pr-create'), self.pr_data, format='json').status_code,
+                         status.HTTP_409_CONFLICT)
+
+    def test_team_add_retry_skips_upsert(self):
+        """Тест что повтор /team/add не повторяет upsert участников"""
+        team_data = {"team_name": "frontend", "members": [
+            {"user_id": f"f{i}", "username": f"Front {i}", "is_active": True} for i in range(50)
+        ]}
+        url = reverse('api:team-add')
+        first = self.client.post(url, team_data, format='json', HTTP_IDEMPOTENCY_KEY="team-1")
+
+        with patch.object(TeamService, 'create_team_with_members') as create:
+            retry = self.client.post(url, team_data, format='json', HTTP_IDEMPOTENCY_KEY="team-1")
+
+        create.assert_not_called()
+        self.assertEqual((retry.status_code, retry.content), (first.status_code, first.content))
+
+    def test_key_reused_for_another_request(self):
+        """Тест что ключ от другого запроса отклоняется, а не отдает чужой ответ"""
+        self._create("key-1")
+
+        response = self._create("key-1", {**self.pr_data, "pull_request_id": "pr-2"})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.json()['error']['code'], 'IDEMPOTENCY_KEY_REUSED')
+        self.assertFalse(PullRequest.objects.filter(id="pr-2").exists())
+
+    def test_in_progress_and_expired_lease(self):
+        """Тест что выполняющийся запрос блокирует ключ, сколько бы он ни шел, а запрос с истекшей арендой - нет"""
+        self._create("key-1")
+        # Ключ занят запросом, который выполняется уже 5 минут, но продлевает аренду
+        IdempotencyKey.objects.filter(key="key-1").update(
+            status_code=None, created_at=timezone.now() - timedelta(minutes=5),
+            lease_until=timezone.now() + timedelta(seconds=30)
+        )
+
+        response = self._create("key-1")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()['error']['code'], 'IDEMPOTENCY_IN_PROGRESS')
+
+        # Аренда истекла - воркер упал и перестал ее продлевать: запрос выполняется заново
+        IdempotencyKey.objects.filter(key="key-1").update(lease_until=timezone.now() - timedelta(seconds=1))
+        response = self._create("key-1")
+        self.assertEqual(response.json()['error']['code'], 'PR_EXISTS')
+        self.assertEqual(IdempotencyKey.objects.get(key="key-1").status_code, status.HTTP_409_CONFLICT)
+
+    def test_running_request_renews_lease(self):
+        """Тест что аренда ключа продлевается, пока запрос выполняется, и не продлевается после"""
+        create = PullRequestService.create_pull_request
+        renewed = []
+
+        def slow_create(*args, **kwargs):
+            IdempotencyKey.objects.filter(key="key-1").update(lease_until=timezone.now())
+            renewed.append(lease_renewer.renew())
+            return create(*args, **kwargs)
+
+        with patch.object(PullRequestService, 'create_pull_request', side_effect=slow_create):
+            self.assertEqual(self._create("key-1").status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(renewed, [1])
+        self.assertGreater(IdempotencyKey.objects.get(key="key-1").lease_until, timezone.now())
+        self.assertEqual(lease_renewer.renew(), 0)
+
+    def test_lost_lease_does_not_overwrite(self):
+        """Тест что запрос, у которого забрали ключ, не перезаписывает ответ нового владельца"""
+        create = PullRequestService.create_pull_request
+
+        def taken_over(*args, **kwargs):
+            IdempotencyKey.objects.filter(key="key-1").update(owner="other")
+            return create(*args, **kwargs)
+
+        with patch.object(PullRequestService, 'create_pull_request', side_effect=taken_over):
+            self.assertEqual(self._create("key-1").status_code, status.HTTP_201_CREATED)
+
+        self.assertIsNone(IdempotencyKey.objects.get(key="key-1").status_code)
+
+    def test_framework_errors_not_stored(self):
+        """Тест что ответы, не зависящие от тела запроса (405), не сохраняются и не занимают ключ"""
+        response = self.client.get(reverse('api:pr-create'), HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self._create("key-1").status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._create("key-1")['Idempotent-Replayed'], 'true')
+
+    def test_server_errors_not_stored(self):
+        """Тест что ответ 5xx не сохраняется и повтор выполняется заново"""
+        with patch.object(PullRequestService, 'create_pull_request', side_effect=RuntimeError):
+            self.assertEqual(self._create("key-1").status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self._create("key-1").status_code, status.HTTP_201_CREATED)
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=60)
+    def test_expired_keys(self):
+        """Тест что протухший ключ выполняет запрос заново и удаляется очисткой"""
+        self._create("key-1")
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+
+        self.assertEqual(self._create("key-1").status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,56 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.instrumentation import start_request, finish_request, UNATTRIBUTED
+from api.services import TeamService, UserService
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        TeamService.create_team_with_members("backend", [
+            {"user_id": f"u{i}", "username": f"User {i}", "is_active": True} for i in range(1, 4)
+        ])
+
+    def test_queries_attributed_to_service_methods(self):
+        """Тест учета запросов по методам сервисов, вложенный вызов - на внутренний метод"""
+        stats, token = start_request()
+        try:
+            TeamService.get_team_with_members("backend")
+            UserService.set_user_active_status("u1", False)
+        finally:
+            finish_request(token)
+
+        self.assertEqual(stats.services["TeamService.get_team_with_members"][0], 2)
+        self.assertIn("UserService.set_user_active_status", stats.services)
+        self.assertEqual(stats.queries, sum(queries for queries, _ in stats.services.values()))
+
+    def test_not_recorded_outside_request(self):
+        """Тест что вне измеряемого запроса ничего не учитывается"""
+        stats, token = start_request()
+        finish_request(token)
+        TeamService.get_team_with_members("backend")
+        self.assertEqual(stats.queries, 0)
+
+    def test_server_timing_header_and_log_line(self):
+        """Тест заголовка Server-Timing и структурированной строки лога"""
+        with self.assertLogs('api.requests', 'INFO') as logs:
+            response = self.client.post(reverse('api:pr-create'), {
+                "pull_request_id": "pr-1", "pull_request_name": "PR", "author_id": "u1"
+            }, content_type='application/json')
+
+        self.assertIn('svc.PullRequestService.create_pull_request;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['path'], record['status']), ('/pullRequest/create', 201))
+        self.assertGreater(record['services']['PullRequestService.create_pull_request']['queries'], 0)
+        self.assertEqual(record['queries'], sum(service['queries'] for service in record['services'].values()))
+
+        response = self.client.get(reverse('api:team-get'), {'team_name': 'backend'})
+        self.assertIn('svc.TeamService.aget_team_with_members', response['Server-Timing'])
+        self.assertIn(f'svc.{UNATTRIBUTED}', response['Server-Timing'])
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled(self):
+        """Тест что выключенный учет не добавляет заголовок"""
+        response = self.client.get(reverse('api:team-get'), {'team_name': 'backend'})
+        self.assertNotIn('Server-Timing', response)
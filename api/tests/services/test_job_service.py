@@ -0,0 +1,94 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+from api.models import Team, User, PullRequest, Job
+from api.services import JobService
+
+
+class JobServiceTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name="backend")
+        self.users = [
+            User.objects.create(id=f"u{i}", username=f"User {i}", is_active=True, team=self.team)
+            for i in range(5)
+        ]
+        for i in range(5):
+            pr = PullRequest.objects.create(id=f"pr-{i}", name=f"PR {i}", author=self.users[0])
+            pr.reviewers.add(self.users[1], self.users[2])
+
+    def _assert_reassigned(self):
+        for pr in PullRequest.objects.prefetch_related('reviewers'):
+            reviewer_ids = {reviewer.id for reviewer in pr.reviewers.all()}
+            self.assertEqual(reviewer_ids, {"u3", "u4"})
+
+    @override_settings(BULK_DEACTIVATE_CHUNK_SIZE=2)
+    def test_bulk_deactivation_job_processes_in_chunks(self):
+        """Тест фоновой деактивации частями"""
+        job = JobService.start_bulk_deactivation("backend", ["u1", "u2"])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.total_prs, 5)
+        self.assertEqual(job.processed_prs, 5)
+        self.assertEqual(job.cursor, "pr-4")
+        self.assertEqual(job.result, {'deactivated': 2, 'reassigned': 10})
+        self.assertFalse(User.objects.filter(id__in=["u1", "u2"], is_active=True).exists())
+        self._assert_reassigned()
+
+    def test_bulk_deactivation_job_team_not_found(self):
+        """Тест запуска задачи для несуществующей команды"""
+        with self.assertRaises(ObjectDoesNotExist):
+            JobService.start_bulk_deactivation("nonexistent")
+
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(BULK_DEACTIVATE_CHUNK_SIZE=2)
+    def test_resume_stale_job_continues_from_cursor(self):
+        """Тест перезапуска задачи, прерванной после первой части"""
+        # Состояние после падения процесса: пользователи деактивированы, обработаны pr-0 и pr-1
+        User.objects.filter(id__in=["u1", "u2"]).update(is_active=False)
+        through = PullRequest.reviewers.through
+        through.objects.filter(pullrequest_id__in=["pr-0", "pr-1"]).delete()
+        for pr_id in ["pr-0", "pr-1"]:
+            PullRequest.objects.get(id=pr_id).reviewers.add(self.users[3], self.users[4])
+
+        Job.objects.create(
+            id="stale",
+            kind=Job.Kind.BULK_DEACTIVATE,
+            status=Job.Status.RUNNING,
+            payload={
+                'team_name': 'backend', 'user_ids': ["u1", "u2"],
+                'deactivating_ids': ["u1", "u2"], 'reassigned': 4
+            },
+            cursor="pr-1",
+            total_prs=5,
+            processed_prs=2
+        )
+        Job.objects.filter(id="stale").update(updated_at=timezone.now() - timedelta(hours=1))
+
+        resumed = JobService.resume_stale_jobs()
+
+        job = Job.objects.get(id="stale")
+        self.assertEqual(resumed, ["stale"])
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.processed_prs, 5)
+        self.assertEqual(job.result, {'deactivated': 2, 'reassigned': 10})
+        self._assert_reassigned()
+
+    def test_resume_skips_fresh_running_job(self):
+        """Тест что выполняющаяся задача другого процесса не перезапускается"""
+        Job.objects.create(
+            id="fresh",
+            kind=Job.Kind.BULK_DEACTIVATE,
+            status=Job.Status.RUNNING,
+            payload={'team_name': 'backend', 'user_ids': ["u1"]}
+        )
+
+        self.assertEqual(JobService.resume_stale_jobs(), [])
+        self.assertEqual(Job.objects.get(id="fresh").status, Job.Status.RUNNING)
+
+    def test_get_job_not_found(self):
+        """Тест получения несуществующей задачи"""
+        with self.assertRaises(Job.DoesNotExist):
+            JobService.get_job("nonexistent")
\ No newline at end of file
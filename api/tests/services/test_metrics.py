@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import threading
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.core.exceptions import ValidationError
+
+from api import metrics
+from api.roster_cache import roster_cache
+from api.services import TeamService, PullRequestService
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics.clear()
+        TeamService.create_team_with_members("backend", [
+            {"user_id": "u1", "username": "User 1", "is_active": True},
+            {"user_id": "u2", "username": "User 2", "is_active": True},
+        ])
+
+    def test_request_counter_and_histogram(self):
+        """Тест счетчика запросов по маршруту и гистограммы задержек"""
+        self.client.get(reverse('api:team-get'), {'team_name': 'backend'})
+        self.client.get(reverse('api:team-get'), {'team_name': 'missing'})
+
+        response = self.client.get(reverse('api:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{route="team/get",method="GET",status="200"} 1', body)
+        self.assertIn('http_requests_total{route="team/get",method="GET",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{route="team/get",method="GET",le="+Inf"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{route="team/get",method="GET"} 2', body)
+        self.assertIn('db_query_duration_seconds_count{alias="default"}', body)
+
+    def test_domain_error_counters(self):
+        """Тест счетчиков доменных ошибок"""
+        PullRequestService.create_pull_request("pr-1", "PR", "u1")
+        with self.assertRaises(ValidationError):
+            PullRequestService.create_pull_request("pr-1", "PR", "u1")
+        with self.assertRaises(ValidationError):
+            PullRequestService.reassign_reviewer("pr-1", "u2")
+
+        body = metrics.render()
+        self.assertIn('pr_domain_errors_total{code="PR_EXISTS"} 1', body)
+        self.assertIn('pr_domain_errors_total{code="NO_CANDIDATE"} 1', body)
+
+    def test_cache_ratios(self):
+        """Тест долей попаданий в кэши процесса"""
+        body = metrics.render()
+        for cache in ('roster', 'response', 'coalescing'):
+            self.assertIn(f'cache_hit_ratio{{cache="{cache}"}}', body)
+
+    def test_counter_sums_thread_shards(self):
+        """Тест что значения из разных потоков складываются"""
+        thread = threading.Thread(target=metrics.REASSIGNMENTS.inc, args=('reassign',))
+        thread.start()
+        thread.join()
+        metrics.REASSIGNMENTS.inc('reassign', amount=2)
+        self.assertIn('reviewer_reassignments_total{operation="reassign"} 3', metrics.render())
+
+    def test_sums_worker_snapshots(self):
+        """Тест что /metrics складывает снимки всех воркеров, а завершившийся воркер теряет только пулы"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, '999999.json'), 'w', encoding='utf-8') as file:
+            json.dump({
+                'metrics': {'reviewer_reassignments_total': [[['reassign'], 2]]},
+                'caches': {'roster': [3, 1]},
+                'pools': {'default': {'pool_size': 4}},
+            }, file)
+        metrics.REASSIGNMENTS.inc('reassign')
+        roster_cache.clear()
+
+        with self.settings(METRICS_MULTIPROCESS_DIR=directory.name):
+            body = metrics.render()
+            self.assertIn('reviewer_reassignments_total{operation="reassign"} 3', body)
+            self.assertIn('db_pool_size{alias="default"} 4', body)
+            self.assertIn(f'{os.getpid()}.json', os.listdir(directory.name))
+
+            metrics.mark_process_dead(999999, directory.name)
+            body = metrics.render()
+
+        self.assertIn('reviewer_reassignments_total{operation="reassign"} 3', body)
+        self.assertIn('cache_hits_total{cache="roster"} 3', body)
+        self.assertNotIn('db_pool_size', body)
+        self.assertNotIn('999999.json', os.listdir(directory.name))
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Тест что выключенные метрики не отдаются"""
+        self.assertEqual(self.client.get(reverse('api:metrics')).status_code, 404)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.profiling import PROFILE_ID_HEADER
+from api.services import TeamService
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        TeamService.create_team_with_members("backend", [
+            {"user_id": "u1", "username": "User 1", "is_active": True}
+        ])
+
+    def add_team(self, **headers):
+        return self.client.post(reverse('api:team-add'), {
+            "team_name": "payments",
+            "members": [{"user_id": f"p{i}", "username": f"P {i}", "is_active": True} for i in range(20)]
+        }, content_type='application/json', headers=headers)
+
+    def test_profile_written_on_flag(self):
+        """Тест что запрос с флагом профилируется, а id профиля возвращается в заголовке"""
+        with self.settings(PROFILING_ENABLED=True, PROFILING_SECRET=None, PROFILING_DIR=self.directory.name):
+            response = self.add_team(**{'X-Profile': '1'})
+
+        self.assertEqual(response.status_code, 201)
+        path = os.path.join(self.directory.name, response[PROFILE_ID_HEADER])
+        self.assertTrue(os.path.exists(f'{path}.prof'))
+        with open(f'{path}.txt', encoding='utf-8') as file:
+            summary = file.read()
+        self.assertIn('POST /team/add -> 201', summary)
+        self.assertIn('create_team_with_members', summary)
+
+    async def test_async_view_profiled(self):
+        """Тест профилирования под ASGI через параметр запроса"""
+        with self.settings(PROFILING_ENABLED=True, PROFILING_SECRET=None, PROFILING_DIR=self.directory.name):
+            response = await self.async_client.get(reverse('api:health-check'), {'_profile': '1'})
+
+        self.assertEqual(response.status_code, 200)
+        path = os.path.join(self.directory.name, response[PROFILE_ID_HEADER])
+        self.assertTrue(os.path.exists(f'{path}.prof'))
+
+    def test_secret_required(self):
+        """Тест что при заданном секрете флаг с другим значением игнорируется"""
+        with self.settings(PROFILING_ENABLED=True, PROFILING_SECRET='s3cret', PROFILING_DIR=self.directory.name):
+            self.assertNotIn(PROFILE_ID_HEADER, self.add_team(**{'X-Profile': '1'}))
+            self.assertIn(PROFILE_ID_HEADER, self.client.get(reverse('api:health-check'), headers={'X-Profile': 's3cret'}))
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        """Тест что без PROFILING_ENABLED флаг ничего не делает"""
+        self.assertNotIn(PROFILE_ID_HEADER, self.add_team(**{'X-Profile': '1'}))
+        self.assertEqual(os.listdir(self.directory.name), [])
@@ -1,8 +1,12 @@
-from django.test import TestCase
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.utils import timezone
 from unittest.mock import patch
 from api.models import Team, User, PullRequest
+from api import metrics
+from api.db_retry import WriteConflict, is_conflict
+from api.roster_cache import roster_cache
 from api.services import PullRequestService
 
 
@@ -20,7 +24,7 @@ class PullRequestServiceTest(TestCase):
     def test_create_pull_request_success(self):
         """Тест успешного создания PR"""
         with patch('random.sample') as mock_sample:
-            mock_sample.return_value = [self.reviewer1, self.reviewer2]
+            mock_sample.return_value = [self.reviewer1.id, self.reviewer2.id]
 
             pr = PullRequestService.create_pull_request("pr-1", "Test PR", "author1")
 
@@ -41,6 +45,38 @@ class PullRequestServiceTest(TestCase):
 
         self.assertEqual(context.exception.code, 'PR_EXISTS')
 
+    @override_settings(ROSTER_CACHE_SIZE=16)
+    def test_create_pull_request_query_budget(self):
+        """Тест бюджета запросов создания PR при составе команды из кэша"""
+        roster_cache.clear()
+        self.addCleanup(roster_cache.clear)
+        PullRequestService._assign_reviewers(self.author)
+
+        # SELECT автора с командой, INSERT PR, INSERT ревьюверов, UPDATE счетчиков и версий. Вне теста это
+        # одна транзакция, SAVEPOINT/RELEASE появляются только внутри транзакции TestCase
+        with self.assertNumQueries(6):
+            pr = PullRequestService.create_pull_request("pr-1", "Test PR", "author1")
+
+        self.assertEqual(pr.reviewers.count(), 2)
+        self.assertEqual(sum(User.objects.values_list("open_reviews", flat=True)), 2)
+
+        # Занятый id: SELECT автора, неудачный INSERT и проверка, что id действительно занят + SAVEPOINT/ROLLBACK/RELEASE
+        with self.assertNumQueries(6):
+            with self.assertRaises(ValidationError) as context:
+                PullRequestService.create_pull_request("pr-1", "Another PR", "author1")
+
+        self.assertEqual(context.exception.code, 'PR_EXISTS')
+        self.assertEqual(PullRequest.objects.get(id="pr-1").name, "Test PR")
+        self.assertEqual(sum(User.objects.values_list("open_reviews", flat=True)), 2)
+
+    def test_create_pull_request_other_integrity_error_not_pr_exists(self):
+        """Тест что нарушение целостности при свободном id (внешний ключ) не выдается за PR_EXISTS"""
+        with patch("api.services.UserService.shift_review_counters", side_effect=IntegrityError("FOREIGN KEY")):
+            with self.assertRaises(IntegrityError):
+                PullRequestService.create_pull_request("pr-1", "Test PR", "author1")
+
+        self.assertFalse(PullRequest.objects.filter(id="pr-1").exists())
+
     def test_create_pull_request_author_not_found(self):
         """Тест создания PR с несуществующим автором"""
         with self.assertRaises(ObjectDoesNotExist):
@@ -119,7 +155,7 @@ class PullRequestServiceTest(TestCase):
         pr.reviewers.add(self.reviewer1, self.reviewer2)
 
         with patch('random.choice') as mock_choice:
-            mock_choice.return_value = self.reviewer3
+            mock_choice.return_value = self.reviewer3.id
 
             updated_pr, new_reviewer = PullRequestService.reassign_reviewer("pr-1", "reviewer1")
 
@@ -191,5 +227,202 @@ class PullRequestServiceTest(TestCase):
 
         # Должны быть назначены 2 активных ревьювера (исключая автора)
         self.assertEqual(len(reviewers), 2)
-        self.assertNotIn(self.author, reviewers)
-        self.assertNotIn(self.inactive_reviewer, reviewers)
\ No newline at end of file
+        self.assertNotIn(self.author.id, reviewers)
+        self.assertNotIn(self.inactive_reviewer.id, reviewers)
+
+    def test_bulk_create_pull_requests_per_item_errors(self):
+        """Тест пакетного создания PR с ошибками по отдельным элементам"""
+        PullRequest.objects.create(id="pr-existing", name="Existing", author=self.author)
+        User.objects.create(id="no_team", username="No Team", is_active=True)
+        metrics.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            results = PullRequestService.bulk_create_pull_requests([
+                {"pull_request_id": "pr-1", "pull_request_name": "First", "author_id": "author1"},
+                {"pull_request_id": "pr-existing", "pull_request_name": "Dup", "author_id": "author1"},
+                {"pull_request_id": "pr-1", "pull_request_name": "Dup in batch", "author_id": "author1"},
+                {"pull_request_id": "pr-2", "pull_request_name": "Ghost", "author_id": "nonexistent"},
+                {"pull_request_id": "pr-3", "pull_request_name": "No team", "author_id": "no_team"},
+                {"pull_request_id": "pr-4", "author_id": "author1"},
+            ])
+
+        self.assertEqual(results[0]["pr"].id, "pr-1")
+        self.assertEqual(
+            [result.get("error", {}).get("code") for result in results],
+            [None, "PR_EXISTS", "PR_EXISTS", "NOT_FOUND", "NOT_FOUND", "VALIDATION_ERROR"]
+        )
+        self.assertEqual(PullRequest.objects.filter(id="pr-1").get().name, "First")
+        self.assertFalse(PullRequest.objects.filter(id__in=["pr-2", "pr-3", "pr-4"]).exists())
+        # Доменные ошибки считаются после коммита
+        self.assertIn('pr_domain_errors_total{code="PR_EXISTS"} 2', metrics.render())
+
+    def test_bulk_create_pull_requests_lost_race(self):
+        """Тест PR, созданного параллельным запросом между проверкой id и INSERT пачки"""
+        load_rosters = roster_cache.get_many_or_load
+
+        def create_concurrently(*args):
+            PullRequest.objects.create(id="pr-raced", name="Raced", author=self.reviewer3)
+            return load_rosters(*args)
+
+        metrics.clear()
+        with self.captureOnCommitCallbacks(execute=True), \
+                patch("api.services.roster_cache.get_many_or_load", side_effect=create_concurrently), \
+                self.assertRaises(WriteConflict) as context:
+            PullRequestService.bulk_create_pull_requests([
+                {"pull_request_id": "pr-1", "pull_request_name": "First", "author_id": "author1"},
+                {"pull_request_id": "pr-raced", "pull_request_name": "Mine", "author_id": "author1"},
+                {"pull_request_id": "pr-2", "pull_request_name": "", "author_id": "author1"},
+            ])
+
+        # Попытка откатилась целиком, ее доменные ошибки не посчитаны; retry_on_conflict вне внешней
+        # транзакции повторит ее, и занятый id попадет в PR_EXISTS еще до выбора ревьюверов
+        self.assertTrue(is_conflict(context.exception))
+        self.assertFalse(PullRequest.objects.filter(id="pr-1").exists())
+        self.assertEqual(sum(User.objects.values_list("open_reviews", flat=True)), 0)
+        self.assertNotIn('pr_domain_errors_total{code="VALIDATION_ERROR"}', metrics.render())
+
+    def test_bulk_create_pull_requests_non_string_ids(self):
+        """Тест что нестроковые id дают VALIDATION_ERROR, а не падение"""
+        results = PullRequestService.bulk_create_pull_requests([
+            {"pull_request_id": ["pr-1"], "pull_request_name": "List id", "author_id": "author1"},
+            {"pull_request_id": "pr-2", "pull_request_name": "Dict author", "author_id": {"id": "author1"}},
+            {"pull_request_id": 3, "pull_request_name": "Int id", "author_id": "author1"},
+            {"pull_request_id": "pr-4", "pull_request_name": "Valid", "author_id": "author1"},
+        ])
+
+        self.assertEqual(
+            [result.get("error", {}).get("code") for result in results],
+            ["VALIDATION_ERROR"] * 3 + [None]
+        )
+        self.assertEqual(list(PullRequest.objects.values_list("id", flat=True)), ["pr-4"])
+
+    def test_bulk_create_pull_requests_assigns_reviewers(self):
+        """Тест назначения ревьюверов и счетчиков при пакетном создании"""
+        results = PullRequestService.bulk_create_pull_requests([
+            {"pull_request_id": f"pr-{i}", "pull_request_name": f"PR {i}", "author_id": "author1"}
+            for i in range(3)
+        ])
+
+        for result in results:
+            reviewers = [reviewer.id for reviewer in result["pr"].reviewers.all()]
+            self.assertEqual(len(reviewers), 2)
+            self.assertNotIn(self.author.id, reviewers)
+            self.assertNotIn(self.inactive_reviewer.id, reviewers)
+
+        open_reviews = sum(User.objects.filter(team=self.team).values_list("open_reviews", flat=True))
+        self.assertEqual(open_reviews, 6)
+
+    def test_bulk_create_pull_requests_constant_queries(self):
+        """Тест что число запросов не зависит от размера пачки"""
+        other_team = Team.objects.create(name="frontend")
+        for i in range(3):
+            User.objects.create(id=f"front{i}", username=f"Front {i}", is_active=True, team=other_team)
+
+        items = [
+            {"pull_request_id": f"pr-{i}", "pull_request_name": f"PR {i}", "author_id": ["author1", "front0"][i % 2]}
+            for i in range(50)
+        ]
+
+        # SAVEPOINT, занятые id, авторы, составы, INSERT PR, INSERT ревьюверов, счетчики и версии, ревьюверы, RELEASE
+        with self.assertNumQueries(9):
+            results = PullRequestService.bulk_create_pull_requests(items)
+
+        self.assertTrue(all("pr" in result for result in results))
+        self.assertEqual(PullRequest.reviewers.through.objects.count(), 100)
+
+    def test_bulk_merge_pull_requests(self):
+        """Тест пакетного мержа: идемпотентность, ненайденные PR и счетчики"""
+        pr1 = PullRequest.objects.create(id="pr-1", name="PR 1", author=self.author)
+        pr1.reviewers.add(self.reviewer1, self.reviewer2)
+        pr2 = PullRequest.objects.create(id="pr-2", name="PR 2", author=self.author)
+        pr2.reviewers.add(self.reviewer1)
+        merged_at = timezone.now()
+        PullRequest.objects.create(
+            id="pr-merged", name="Merged", author=self.author,
+            status=PullRequest.Status.MERGED, merged_at=merged_at
+        )
+        User.objects.filter(id="reviewer1").update(open_reviews=2)
+        User.objects.filter(id="reviewer2").update(open_reviews=1)
+
+        results = PullRequestService.bulk_merge_pull_requests(["pr-1", "pr-2", "pr-merged", "missing"])
+
+        self.assertEqual([result["pr"].status for result in results[:3]], [PullRequest.Status.MERGED] * 3)
+        self.assertEqual(results[2]["pr"].merged_at, merged_at)
+        self.assertEqual(results[3]["error"]["code"], "NOT_FOUND")
+        self.assertEqual(
+            list(User.objects.filter(id__in=["reviewer1", "reviewer2"]).order_by("id")
+                 .values_list("open_reviews", "merged_reviews")),
+            [(0, 2), (0, 1)]
+        )
+
+        # Повторный мерж не меняет счетчики
+        PullRequestService.bulk_merge_pull_requests(["pr-1"])
+        self.assertEqual(User.objects.get(id="reviewer1").merged_reviews, 2)
+
+    def test_bulk_reassign_reviewers_domain_errors(self):
+        """Тест пакетного переназначения с доменными ошибками по элементам"""
+        pr = PullRequest.objects.create(id="pr-1", name="PR 1", author=self.author)
+        pr.reviewers.add(self.reviewer1, self.reviewer2)
+        merged = PullRequest.objects.create(
+            id="pr-merged", name="Merged", author=self.author, status=PullRequest.Status.MERGED
+        )
+        merged.reviewers.add(self.reviewer1)
+
+        results = PullRequestService.bulk_reassign_reviewers([
+            {"pull_request_id": "pr-1", "old_user_id": "reviewer1"},
+            {"pull_request_id": "pr-merged", "old_user_id": "reviewer1"},
+            {"pull_request_id": "pr-1", "old_user_id": "reviewer1"},
+            {"pull_request_id": "missing", "old_user_id": "reviewer1"},
+            {"pull_request_id": "pr-1", "old_user_id": "nonexistent"},
+            {"pull_request_id": "pr-1", "old_user_id": "reviewer2"},
+        ])
+
+        self.assertEqual(
+            [result.get("error", {}).get("code") for result in results],
+            [None, "PR_MERGED", "NOT_ASSIGNED", "NOT_FOUND", "NOT_FOUND", None]
+        )
+        # Снятый в этой же пачке reviewer1 снова становится кандидатом
+        self.assertEqual([results[0]["replaced_by"], results[5]["replaced_by"]], ["reviewer3", "reviewer1"])
+        self.assertEqual(
+            sorted(reviewer.id for reviewer in results[0]["pr"].reviewers.all()), ["reviewer1", "reviewer3"]
+        )
+
+        User.objects.filter(id="reviewer2").update(is_active=False)
+        results = PullRequestService.bulk_reassign_reviewers([{"pull_request_id": "pr-1", "old_user_id": "reviewer1"}])
+        self.assertEqual(results[0]["error"]["code"], "NO_CANDIDATE")
+
+    def test_bulk_reassign_reviewers_chained_in_batch(self):
+        """Тест что замены внутри пачки видны следующим элементам"""
+        reviewer4 = User.objects.create(id="reviewer4", username="Reviewer 4", is_active=True, team=self.team)
+        pr = PullRequest.objects.create(id="pr-1", name="PR 1", author=self.author)
+        pr.reviewers.add(self.reviewer1, self.reviewer2)
+        User.objects.filter(id__in=["reviewer1", "reviewer2"]).update(open_reviews=1)
+
+        with patch('random.choice') as mock_choice:
+            mock_choice.side_effect = ["reviewer3", "reviewer4"]
+            results = PullRequestService.bulk_reassign_reviewers([
+                {"pull_request_id": "pr-1", "old_user_id": "reviewer1"},
+                {"pull_request_id": "pr-1", "old_user_id": "reviewer3"},
+            ])
+
+        self.assertEqual([result["replaced_by"] for result in results], ["reviewer3", "reviewer4"])
+        self.assertEqual(sorted(pr.reviewers.values_list("id", flat=True)), ["reviewer2", "reviewer4"])
+        self.assertEqual(
+            dict(User.objects.filter(team=self.team).values_list("id", "open_reviews")),
+            {"author1": 0, "reviewer1": 0, "reviewer2": 1, "reviewer3": 0, "reviewer4": 1, "inactive1": 0}
+        )
+
+    def test_bulk_reassign_reviewers_constant_queries(self):
+        """Тест что число запросов пакетного переназначения не зависит от размера пачки"""
+        items = []
+        for i in range(30):
+            pr = PullRequest.objects.create(id=f"pr-{i}", name=f"PR {i}", author=self.author)
+            pr.reviewers.add(self.reviewer1)
+            items.append({"pull_request_id": pr.id, "old_user_id": "reviewer1"})
+
+        # SAVEPOINT, PR, пользователи, ревьюверы, состав, DELETE, INSERT, счетчики и версии, PR и ревьюверы для ответа, RELEASE
+        with self.assertNumQueries(11):
+            results = PullRequestService.bulk_reassign_reviewers(items)
+
+        self.assertTrue(all("replaced_by" in result for result in results))
+        self.assertFalse(PullRequest.objects.filter(reviewers=self.reviewer1).exists())
@@ -0,0 +1,78 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from api.models import Team, User
+from api.response_cache import response_cache
+from api.services import PullRequestService, TeamService, VersionService
+
+
+@override_settings(RESPONSE_CACHE_SIZE=16)
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        TeamService.create_team_with_members("backend", [
+            {"user_id": "author1", "username": "Author", "is_active": True},
+            {"user_id": "reviewer1", "username": "Reviewer 1", "is_active": True},
+        ])
+        self.team_url = f"{reverse('api:team-get')}?team_name=backend"
+
+    def tearDown(self):
+        response_cache.clear()
+
+    def test_repeat_read_skips_orm_and_serialization(self):
+        """Тест что повторное чтение отдает те же байты по одному запросу версии"""
+        first = self.client.get(self.team_url)
+
+        # Только SELECT версии: команда, участники и сериализация пропускаются
+        with self.assertNumQueries(1):
+            second = self.client.get(self.team_url)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual((response_cache.hits, response_cache.misses), (1, 1))
+
+    def test_invalidated_on_write(self):
+        """Тест явного сброса ответов команды и очереди ревью при записи в сервисах"""
+        self.client.get(self.team_url)
+        review_url = f"{reverse('api:user-get-review')}?user_id=reviewer1"
+        self.client.get(review_url)
+
+        PullRequestService.create_pull_request("pr-1", "PR", "author1")
+        TeamService.create_team_with_members("backend", [
+            {"user_id": "newbie", "username": "Newbie", "is_active": True},
+        ])
+
+        self.assertEqual(len(self.client.get(review_url).json()['pull_requests']), 1)
+        self.assertEqual(len(self.client.get(self.team_url).json()['members']), 3)
+        self.assertEqual(response_cache.hits, 0)
+
+    def test_unversioned_data_not_cached(self):
+        """Тест что данные без версии (измененные в обход сервисов) не кэшируются"""
+        team = Team.objects.create(name="manual")
+        User.objects.create(id="m1", username="Manual", is_active=True, team=team)
+        url = f"{reverse('api:team-get')}?team_name=manual"
+
+        self.assertEqual(self.client.get(url)['ETag'], VersionService.UNVERSIONED_ETAG)
+        User.objects.filter(id="m1").update(username="Renamed")
+
+        self.assertEqual(self.client.get(url).json()['members'][0]['username'], "Renamed")
+        self.assertEqual(response_cache.hits, 0)
+        # Без версии и 304 не отдается: клиент с ETag "0" получает актуальные данные
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=VersionService.UNVERSIONED_ETAG)
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_version_is_a_miss(self):
+        """Тест что ответ другой версии не отдается"""
+        response_cache.set("team:backend", '"v1"', b'{}')
+
+        self.assertIsNone(response_cache.get("team:backend", '"v2"'))
+        self.assertEqual(response_cache.get("team:backend", '"v1"'), b'{}')
+        self.assertEqual(response_cache.hit_ratio, 0.5)
+
+    @override_settings(RESPONSE_CACHE_SIZE=1)
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не использованных ответов"""
+        response_cache.set("team:a", '"1"', b'a')
+        response_cache.set("team:b", '"1"', b'b')
+
+        self.assertIsNone(response_cache.get("team:a", '"1"'))
+        self.assertEqual(response_cache.get("team:b", '"1"'), b'b')
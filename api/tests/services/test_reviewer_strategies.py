@@ -0,0 +1,144 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.core.exceptions import ValidationError
+from api.models import Team, User, PullRequest
+from api.reviewer_strategies import STRATEGIES, RoundRobinStrategy, LeastLoadedStrategy, get_strategy, undo_on_error
+from api.services import PullRequestService, TeamService, StatsService, UserService
+
+
+class ReviewerStrategiesTest(TestCase):
+    def setUp(self):
+        self.round_robin = RoundRobinStrategy()
+        self.least_loaded = STRATEGIES['least_loaded']
+        self.least_loaded.reset()
+
+        self.team = Team.objects.create(name="backend", review_strategy=Team.ReviewStrategy.ROUND_ROBIN)
+        self.author = User.objects.create(id="author", username="Author", is_active=True, team=self.team)
+        self.users = [
+            User.objects.create(id=f"u{i}", username=f"User {i}", is_active=True, team=self.team)
+            for i in range(4)
+        ]
+
+    def tearDown(self):
+        self.least_loaded.reset()
+
+    def test_round_robin_rotates(self):
+        """Тест что round_robin обходит состав по кругу"""
+        roster = ("a", "b", "c", "d")
+
+        self.assertEqual(self.round_robin.pick(1, roster, set(), 2), ["a", "b"])
+        self.assertEqual(self.round_robin.pick(1, roster, set(), 2), ["c", "d"])
+        self.assertEqual(self.round_robin.pick(1, roster, set(), 2), ["a", "b"])
+
+    def test_round_robin_skips_excluded(self):
+        """Тест что round_robin пропускает исключенных"""
+        roster = ("a", "b", "c")
+
+        self.assertEqual(self.round_robin.pick(1, roster, {"a", "c"}, 2), ["b"])
+        self.assertEqual(self.round_robin.pick(1, roster, {"b"}, 1), ["c"])
+
+    def test_least_loaded_picks_least_busy(self):
+        """Тест что least_loaded выбирает участников с наименьшим числом открытых ревью"""
+        for i in range(3):
+            pr = PullRequest.objects.create(id=f"busy-{i}", name="Busy", author=self.author)
+            pr.reviewers.add(self.users[0], self.users[1])
+        merged = PullRequest.objects.create(id="merged", name="Merged", author=self.author,
+                                            status=PullRequest.Status.MERGED)
+        merged.reviewers.add(self.users[2])
+        StatsService.rebuild_review_counters()
+
+        roster = ("u0", "u1", "u2", "u3")
+        self.assertEqual(sorted(self.least_loaded.pick(self.team.id, roster, set(), 2)), ["u2", "u3"])
+
+        # Счетчики ведутся в памяти: следующий выбор без запросов к БД
+        with self.assertNumQueries(0):
+            self.assertEqual(sorted(self.least_loaded.pick(self.team.id, roster, set(), 2)), ["u2", "u3"])
+
+        self.least_loaded.release(["u0", "u0", "u0"])
+        self.assertEqual(self.least_loaded.pick(self.team.id, roster, {"u2"}, 1), ["u0"])
+
+    def test_team_strategy_overrides_settings(self):
+        """Тест что стратегия команды важнее настройки по умолчанию"""
+        self.assertEqual(get_strategy(self.team).name, 'round_robin')
+        self.assertEqual(get_strategy(Team(name="other")).name, 'random')
+
+        with override_settings(REVIEWER_STRATEGY='least_loaded'):
+            self.assertEqual(get_strategy(Team(name="other")).name, 'least_loaded')
+
+    def test_create_and_reassign_use_team_strategy(self):
+        """Тест что создание PR и переназначение используют стратегию команды"""
+        STRATEGIES['round_robin']._cursors.pop(self.team.id, None)
+
+        pr = PullRequestService.create_pull_request("pr-1", "PR", "author")
+        self.assertEqual(sorted(pr.reviewers.values_list('id', flat=True)), ["u0", "u1"])
+
+        pr, new_reviewer = PullRequestService.reassign_reviewer("pr-1", "u0")
+        self.assertEqual(new_reviewer.id, "u2")
+
+    def test_create_team_with_review_strategy(self):
+        """Тест задания стратегии команды через /team/add"""
+        team = TeamService.create_team_with_members("frontend", [], Team.ReviewStrategy.LEAST_LOADED)
+        self.assertEqual(team.review_strategy, 'least_loaded')
+
+        team = TeamService.create_team_with_members("frontend", [], Team.ReviewStrategy.RANDOM)
+        self.assertEqual(Team.objects.get(name="frontend").review_strategy, 'random')
+
+        # Та же стратегия без участников ничего не меняет - команда уже существует
+        with self.assertRaises(ValidationError) as context:
+            TeamService.create_team_with_members("frontend", [], Team.ReviewStrategy.RANDOM)
+        self.assertEqual(context.exception.code, 'TEAM_EXISTS')
+
+    def test_least_loaded_not_charged_for_duplicate_pr(self):
+        """Тест что неудачное создание PR с занятым id не увеличивает нагрузку в памяти"""
+        Team.objects.filter(id=self.team.id).update(review_strategy=Team.ReviewStrategy.LEAST_LOADED)
+        PullRequestService.create_pull_request("pr-1", "PR", "author")
+        counts = dict(self.least_loaded._counts)
+
+        with self.assertRaises(ValidationError):
+            PullRequestService.create_pull_request("pr-1", "PR", "author")
+
+        self.assertEqual(self.least_loaded._counts, counts)
+
+    def test_least_loaded_not_charged_for_duplicate_in_bulk(self):
+        """Тест что PR пачки с уже занятым id не увеличивает нагрузку в памяти"""
+        Team.objects.filter(id=self.team.id).update(review_strategy=Team.ReviewStrategy.LEAST_LOADED)
+        PullRequestService.create_pull_request("pr-1", "PR", "author")
+        counts = dict(self.least_loaded._counts)
+
+        results = PullRequestService.bulk_create_pull_requests([
+            {"pull_request_id": "pr-1", "pull_request_name": "PR", "author_id": "author"},
+        ])
+
+        self.assertEqual(results[0]["error"]["code"], "PR_EXISTS")
+        self.assertEqual(self.least_loaded._counts, counts)
+
+    def test_least_loaded_undone_after_rollback(self):
+        """Тест что выбор в откаченном блоке записи не оставляет нагрузку в памяти, а в успешном - оставляет"""
+        roster = ("u0", "u1", "u2", "u3")
+        self.least_loaded.pick(self.team.id, roster, set(), 1)
+        counts = dict(self.least_loaded._counts)
+
+        with self.assertRaises(RuntimeError):
+            with undo_on_error(), transaction.atomic():
+                self.least_loaded.pick(self.team.id, roster, set(), 2)
+                self.least_loaded.release(["u0"])
+                raise RuntimeError
+
+        self.assertEqual(self.least_loaded._counts, counts)
+
+        with undo_on_error(), transaction.atomic():
+            selected = self.least_loaded.pick(self.team.id, roster, set(), 2)
+        self.assertEqual(sum(self.least_loaded._counts.values()), sum(counts.values()) + len(selected))
+
+    def test_least_loaded_skips_users_left_roster(self):
+        """Тест что деактивированный ревьювер не возвращается в выбор least_loaded после переназначения"""
+        Team.objects.filter(id=self.team.id).update(review_strategy=Team.ReviewStrategy.LEAST_LOADED)
+        pr = PullRequestService.create_pull_request("pr-1", "PR", "author")
+        reviewer_id = pr.reviewers.values_list('id', flat=True)[0]
+
+        UserService.set_user_active_status(reviewer_id, False)
+        PullRequestService.reassign_reviewer("pr-1", reviewer_id)
+
+        for i in range(10):
+            pr = PullRequestService.create_pull_request(f"pr-{i + 2}", "PR", "author")
+            self.assertNotIn(reviewer_id, pr.reviewers.values_list('id', flat=True))
@@ -0,0 +1,135 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from api.models import Team, User
+from api.roster_cache import roster_cache
+from api.services import PullRequestService, TeamService, UserService
+
+
+@override_settings(ROSTER_CACHE_SIZE=16)
+class RosterCacheTest(TestCase):
+    def setUp(self):
+        roster_cache.clear()
+        self.team = Team.objects.create(name="backend")
+        self.author = User.objects.create(id="author1", username="Author", is_active=True, team=self.team)
+        self.reviewer1 = User.objects.create(id="reviewer1", username="Reviewer 1", is_active=True, team=self.team)
+        self.reviewer2 = User.objects.create(id="reviewer2", username="Reviewer 2", is_active=True, team=self.team)
+
+    def tearDown(self):
+        roster_cache.clear()
+
+    def test_assign_reviewers_cache_hit_without_queries(self):
+        """Тест что при попадании в кэш состав не запрашивается из БД"""
+        PullRequestService._assign_reviewers(self.author)
+
+        with self.assertNumQueries(0):
+            reviewers = PullRequestService._assign_reviewers(self.author)
+
+        self.assertEqual(sorted(reviewers), ["reviewer1", "reviewer2"])
+        self.assertEqual(roster_cache.hits, 1)
+        self.assertEqual(roster_cache.misses, 1)
+
+    def test_invalidated_on_user_save(self):
+        """Тест сброса состава при сохранении пользователя"""
+        PullRequestService._assign_reviewers(self.author)
+
+        UserService.set_user_active_status("reviewer1", False)
+
+        self.assertEqual(PullRequestService._assign_reviewers(self.author), ["reviewer2"])
+
+    def test_invalidated_on_team_change(self):
+        """Тест сброса составов обеих команд при переводе пользователя через /team/add"""
+        other = Team.objects.create(name="frontend")
+        PullRequestService._assign_reviewers(self.author)
+
+        TeamService.create_team_with_members("frontend", [
+            {"user_id": "reviewer1", "username": "Reviewer 1", "is_active": True},
+        ])
+
+        self.assertEqual(PullRequestService._assign_reviewers(self.author), ["reviewer2"])
+        self.assertEqual(roster_cache.get_or_load(other.id, UserService.load_active_ids), ("reviewer1",))
+
+    def test_invalidated_on_bulk_deactivate(self):
+        """Тест сброса состава после массовой деактивации"""
+        PullRequestService._assign_reviewers(self.author)
+
+        TeamService.bulk_deactivate_team_members("backend", ["reviewer2"])
+
+        self.assertEqual(PullRequestService._assign_reviewers(self.author), ["reviewer1"])
+
+    @override_settings(ROSTER_CACHE_SIZE=1)
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не использованных составов"""
+        other = Team.objects.create(name="frontend")
+
+        roster_cache.get_or_load(self.team.id, UserService.load_active_ids)
+        roster_cache.get_or_load(other.id, UserService.load_active_ids)
+
+        with self.assertNumQueries(1):
+            roster_cache.get_or_load(self.team.id, UserService.load_active_ids)
+
+    @override_settings(ROSTER_CACHE_LOCAL_TTL=5)
+    def test_local_entry_expires(self):
+        """Тест что локальный состав перечитывается по истечении срока: сброс из другого процесса сюда не доходит"""
+        with mock.patch('api.roster_cache.time.monotonic', return_value=100.0):
+            PullRequestService._assign_reviewers(self.author)
+        # Другой воркер деактивирует участника, сброс в этом процессе не происходит
+        User.objects.filter(id="reviewer1").update(is_active=False)
+
+        with mock.patch('api.roster_cache.time.monotonic', return_value=104.0), self.assertNumQueries(0):
+            roster_cache.get_many_or_load([self.team.id], UserService.load_active_ids_many)
+
+        with mock.patch('api.roster_cache.time.monotonic', return_value=105.0):
+            self.assertEqual(PullRequestService._assign_reviewers(self.author), ["reviewer2"])
+
+    @override_settings(
+        CACHES={'rosters': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rosters'}},
+        ROSTER_CACHE_BACKEND='rosters'
+    )
+    def test_shared_backend(self):
+        """Тест хранения составов в общем кэше"""
+        PullRequestService._assign_reviewers(self.author)
+
+        with self.assertNumQueries(0):
+            PullRequestService._assign_reviewers(self.author)
+
+        UserService.set_user_active_status("reviewer1", False)
+
+        self.assertEqual(PullRequestService._assign_reviewers(self.author), ["reviewer2"])
+
+    def test_get_many_loads_only_misses(self):
+        """Тест пакетного чтения составов: промахи загружаются одним запросом"""
+        other = Team.objects.create(name="frontend")
+        User.objects.create(id="front1", username="Front 1", is_active=True, team=other)
+        roster_cache.get_or_load(self.team.id, UserService.load_active_ids)
+
+        with self.assertNumQueries(1):
+            rosters = roster_cache.get_many_or_load([self.team.id, other.id], UserService.load_active_ids_many)
+
+        self.assertEqual(rosters, {self.team.id: ("author1", "reviewer1", "reviewer2"), other.id: ("front1",)})
+        with self.assertNumQueries(0):
+            roster_cache.get_many_or_load([self.team.id, other.id], UserService.load_active_ids_many)
+
+    def test_invalidate_during_load_skips_store(self):
+        """Тест что состав, прочитанный до сброса, не попадает в кэш"""
+        def load_then_commit_elsewhere(team_id):
+            active_ids = UserService.load_active_ids(team_id)
+            # Параллельная запись коммитится между чтением и сохранением состава
+            User.objects.filter(id="reviewer1").update(is_active=False)
+            roster_cache.invalidate([team_id])
+            return active_ids
+
+        stale = roster_cache.get_or_load(self.team.id, load_then_commit_elsewhere)
+        self.assertIn("reviewer1", stale)
+        self.assertNotIn("reviewer1", roster_cache.get_or_load(self.team.id, UserService.load_active_ids))
+
+        def load_many_then_commit_elsewhere(team_ids):
+            rosters = UserService.load_active_ids_many(team_ids)
+            User.objects.filter(id="reviewer2").update(is_active=False)
+            roster_cache.invalidate(team_ids)
+            return rosters
+
+        roster_cache.clear()
+        roster_cache.get_many_or_load([self.team.id], load_many_then_commit_elsewhere)
+        self.assertEqual(
+            roster_cache.get_many_or_load([self.team.id], UserService.load_active_ids_many), {self.team.id: ("author1",)}
+        )
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.test import TestCase
+from api.services import TeamService
+from api.slow_queries import slow_query_log, explain
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'slow.jsonl')
+        TeamService.create_team_with_members("backend", [
+            {"user_id": "u1", "username": "User 1", "is_active": True}
+        ])
+
+    def read_records(self, path=None):
+        slow_query_log.flush()
+        with open(path or self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_slow_query_recorded_with_service(self):
+        """Тест записи медленного запроса с SQL, параметрами, временем и методом сервиса"""
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=False, SLOW_QUERY_LOG_PARAMS=True,
+                           SLOW_QUERY_LOG_FILE=self.path):
+            TeamService.get_team_with_members("backend")
+            records = self.read_records()
+
+        record = next(record for record in records if 'FROM "teams"' in record['sql'])
+        self.assertEqual(record['service'], 'TeamService.get_team_with_members')
+        self.assertEqual(record['alias'], 'default')
+        self.assertIn('backend', record['params'])
+        self.assertGreaterEqual(record['duration_ms'], 0)
+
+    def test_params_redacted_by_default(self):
+        """Тест что без SLOW_QUERY_LOG_PARAMS значения параметров не попадают ни в запись, ни в план"""
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=self.path):
+            TeamService.get_team_with_members("backend")
+            records = self.read_records()
+
+        record = next(record for record in records if 'FROM "teams"' in record['sql'])
+        self.assertNotIn('params', record)
+        self.assertEqual(record['params_count'], 1)
+        self.assertIn('plan', record)
+        with open(self.path, encoding='utf-8') as file:
+            self.assertNotIn('backend', file.read())
+
+    def test_fast_queries_not_recorded(self):
+        """Тест что запросы быстрее порога не пишутся"""
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=60_000, SLOW_QUERY_LOG_FILE=self.path):
+            TeamService.get_team_with_members("backend")
+            slow_query_log.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_explain_plan(self):
+        """Тест плана запроса без его выполнения"""
+        plan = explain('default', 'SELECT "id" FROM "users" WHERE "id" = %s', ['u1'])
+        self.assertTrue(plan)
+
+    def test_explain_without_params(self):
+        """Тест общего плана без значений параметров, в том числе с экранированным %"""
+        plan = explain('default', 'SELECT "id" FROM "users" WHERE "id" = %s AND "username" LIKE \'U%%\'')
+        self.assertTrue(plan)
+        self.assertNotIn('u1', plan)
+        self.assertTrue(explain('default', 'SELECT "id" FROM "users" WHERE "username" LIKE \'U%%\''))
+
+    def test_record_without_plan_before_postgresql_16(self):
+        """Тест что без GENERIC_PLAN (PostgreSQL 15) запись пишется без плана и без значений параметров"""
+        connection = connections['default']
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(connection, 'pg_version', 150000, create=True), \
+                mock.patch.object(connection, 'cursor') as cursor, \
+                mock.patch.object(connections, 'close_all'):
+            self.assertIsNone(explain('default', 'SELECT "id" FROM "users" WHERE "id" = %s'))
+            cursor.assert_not_called()
+
+            # prepare работает в потоке записи и закрывает его соединения, тестовое закрывать нельзя
+            entry = slow_query_log.prepare({
+                'alias': 'default', 'sql': 'SELECT "id" FROM "users" WHERE "id" = %s', 'params_count': 1
+            })
+
+        self.assertNotIn('plan', entry)
+        self.assertEqual(entry['plan_error'], 'GENERIC_PLAN requires PostgreSQL 16')
+
+    def test_rotation(self):
+        """Тест ротации файла журнала по размеру"""
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=False, SLOW_QUERY_LOG_MAX_BYTES=300,
+                           SLOW_QUERY_LOG_FILE=self.path):
+            for _ in range(3):
+                TeamService.get_team_with_members("backend")
+            slow_query_log.flush()
+        self.assertTrue(os.path.exists(f'{self.path}.1'))
+
+    def test_dropped_when_queue_full(self):
+        """Тест что при переполненной очереди записи отбрасываются, а не копятся"""
+        dropped = slow_query_log.dropped
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_MAX_PENDING=0, SLOW_QUERY_LOG_FILE=self.path):
+            TeamService.get_team_with_members("backend")
+        self.assertGreater(slow_query_log.dropped, dropped)
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,162 @@
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from api.models import Team, User, PullRequest
+from api.services import PullRequestService, TeamService, StatsService
+
+
+class StatsServiceTest(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name="backend")
+        self.author = User.objects.create(id="author", username="Author", is_active=True, team=self.team)
+        for i in range(1, 4):
+            User.objects.create(id=f"r{i}", username=f"Reviewer {i}", is_active=True, team=self.team)
+
+    def _counters(self):
+        return {
+            user_id: (open_reviews, merged_reviews)
+            for user_id, open_reviews, merged_reviews
+            in User.objects.values_list('id', 'open_reviews', 'merged_reviews')
+        }
+
+    def _assert_counters_consistent(self):
+        counters = self._counters()
+        StatsService.rebuild_review_counters()
+        self.assertEqual(counters, self._counters())
+
+    def test_counters_follow_pr_lifecycle(self):
+        """Тест что счетчики ревью обновляются при создании, переназначении и мерже PR"""
+        pr = PullRequestService.create_pull_request("pr-1", "PR", "author")
+        reviewer_ids = set(pr.reviewers.values_list('id', flat=True))
+        for reviewer_id in reviewer_ids:
+            self.assertEqual(self._counters()[reviewer_id], (1, 0))
+        self._assert_counters_consistent()
+
+        old_reviewer_id = sorted(reviewer_ids)[0]
+        pr, new_reviewer = PullRequestService.reassign_reviewer("pr-1", old_reviewer_id)
+        self.assertEqual(self._counters()[old_reviewer_id], (0, 0))
+        self.assertEqual(self._counters()[new_reviewer.id], (1, 0))
+        self._assert_counters_consistent()
+
+        PullRequestService.merge_pull_request("pr-1")
+        PullRequestService.merge_pull_request("pr-1")
+        self.assertEqual(self._counters()[new_reviewer.id], (0, 1))
+        self._assert_counters_consistent()
+
+    def test_counters_follow_bulk_deactivation(self):
+        """Тест что счетчики сдвигаются при переназначении во время массовой деактивации"""
+        for i in range(3):
+            PullRequestService.create_pull_request(f"pr-{i}", "PR", "author")
+
+        TeamService.bulk_deactivate_team_members("backend", ["r1"])
+
+        self.assertEqual(self._counters()["r1"], (0, 0))
+        self._assert_counters_consistent()
+
+    def test_rebuild_review_counters_command(self):
+        """Тест пересчета счетчиков командой управления"""
+        pr = PullRequest.objects.create(id="pr-1", name="PR", author=self.author)
+        pr.reviewers.add("r1", "r2")
+        merged = PullRequest.objects.create(id="pr-2", name="PR", author=self.author,
+                                            status=PullRequest.Status.MERGED)
+        merged.reviewers.add("r1")
+
+        call_command('rebuild_review_counters', stdout=StringIO())
+
+        counters = self._counters()
+        self.assertEqual(counters["r1"], (1, 1))
+        self.assertEqual(counters["r2"], (1, 0))
+        self.assertEqual(counters["r3"], (0, 0))
+
+    def test_get_review_stats_reads_counters(self):
+        """Тест что пользовательская часть статистики читается из счетчиков"""
+        User.objects.filter(id="r1").update(open_reviews=2, merged_reviews=3)
+        User.objects.filter(id="r2").update(open_reviews=1)
+
+        stats = StatsService.get_review_stats()
+
+        self.assertEqual(stats['user_review_stats'], [
+            {'id': 'r1', 'username': 'Reviewer 1', 'prs_reviewed': 5,
+             'open_prs_reviewed': 2, 'merged_prs_reviewed': 3},
+            {'id': 'r2', 'username': 'Reviewer 2', 'prs_reviewed': 1,
+             'open_prs_reviewed': 1, 'merged_prs_reviewed': 0},
+        ])
+
+    def _create_prs(self, count, author=None, **fields):
+        for i in range(count):
+            PullRequest.objects.create(
+                id=f"{fields.get('status', 'OPEN').lower()}-{author or 'author'}-{i}",
+                name="PR", author_id=author or "author", **fields
+            )
+
+    def test_get_review_stats_keyset_pagination(self):
+        """Тест что страницы по курсору покрывают все PR без повторов"""
+        self._create_prs(7)
+        # Одинаковое время создания, чтобы порядок решал id
+        PullRequest.objects.filter(id__in=["open-author-1", "open-author-2"]).update(
+            created_at=PullRequest.objects.get(id="open-author-3").created_at
+        )
+
+        seen = []
+        stats = StatsService.get_review_stats(limit=3)
+        pages = 1
+        seen += [pr['id'] for pr in stats['pr_reviewer_stats']]
+        while stats['next_cursor']:
+            stats = StatsService.get_review_stats(limit=3, cursor=stats['next_cursor'])
+            self.assertEqual(stats['user_review_stats'], [])
+            seen += [pr['id'] for pr in stats['pr_reviewer_stats']]
+            pages += 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(PullRequest.objects.values_list('id', flat=True)))
+
+    def test_get_review_stats_user_pagination(self):
+        """Тест что ревьюверы сверх limit доступны по своему курсору"""
+        for i in range(4, 9):
+            User.objects.create(id=f"r{i}", username=f"Reviewer {i}", is_active=True, team=self.team)
+        User.objects.filter(id__startswith="r").update(open_reviews=1)
+        User.objects.filter(id__in=["r5", "r7"]).update(merged_reviews=2)
+
+        stats = StatsService.get_review_stats(limit=3)
+        seen = [user['id'] for user in stats['user_review_stats']]
+        self.assertEqual(seen, ["r5", "r7", "r1"])
+        while stats['next_user_cursor']:
+            stats = StatsService.get_review_stats(limit=3, user_cursor=stats['next_user_cursor'])
+            self.assertEqual(stats['pr_reviewer_stats'], [])
+            seen += [user['id'] for user in stats['user_review_stats']]
+
+        self.assertEqual(seen, ["r5", "r7", "r1", "r2", "r3", "r4", "r6", "r8"])
+        with self.assertRaises(ValidationError):
+            StatsService.get_review_stats(user_cursor="not-a-cursor")
+
+    def test_get_review_stats_filters(self):
+        """Тест фильтров статистики по команде и статусу"""
+        other = Team.objects.create(name="frontend")
+        User.objects.create(id="f1", username="Frontend", is_active=True, team=other)
+        self._create_prs(2)
+        self._create_prs(3, author="f1")
+        self._create_prs(1, author="f1", status=PullRequest.Status.MERGED)
+
+        stats = StatsService.get_review_stats(team_name="frontend", status=PullRequest.Status.OPEN)
+
+        self.assertEqual(len(stats['pr_reviewer_stats']), 3)
+        self.assertTrue(all(pr['team_name'] == 'frontend' for pr in stats['pr_reviewer_stats']))
+        self.assertIsNone(stats['next_cursor'])
+
+    async def test_aget_review_stats_matches_sync(self):
+        """Тест что асинхронная статистика совпадает с синхронной постранично"""
+        await sync_to_async(self._create_prs)(5)
+
+        stats = await StatsService.aget_review_stats(limit=3)
+        self.assertEqual(stats, await sync_to_async(StatsService.get_review_stats)(limit=3))
+
+        next_page = await StatsService.aget_review_stats(limit=3, cursor=stats['next_cursor'])
+        self.assertEqual(len(next_page['pr_reviewer_stats']), 2)
+        self.assertIsNone(next_page['next_cursor'])
+
+    def test_get_review_stats_invalid_cursor(self):
+        """Тест некорректного курсора"""
+        with self.assertRaises(ValidationError):
+            StatsService.get_review_stats(cursor="not-a-cursor")
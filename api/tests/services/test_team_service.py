@@ -1,6 +1,7 @@
+from asgiref.sync import sync_to_async
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from api.models import Team, User
+from api.models import Team, User, PullRequest
 from api.services import TeamService
 
 
@@ -58,26 +59,121 @@ class TeamServiceTest(TestCase):
         with self.assertRaises(Team.DoesNotExist):
             TeamService.get_team_with_members("nonexistent")
 
-    def test_create_or_update_user_new_user(self):
-        """Тест создания нового пользователя"""
+    async def test_aget_team_with_members(self):
+        """Тест асинхронного получения команды: участники уже загружены"""
+        await sync_to_async(TeamService.create_team_with_members)(self.team_name, self.members_data)
+
+        team = await TeamService.aget_team_with_members(self.team_name)
+
+        self.assertEqual(len(team.members.all()), 3)
+        with self.assertRaises(Team.DoesNotExist):
+            await TeamService.aget_team_with_members("nonexistent")
+
+    def test_create_team_with_members_new_user(self):
+        """Тест создания нового пользователя в существующей команде"""
         team = Team.objects.create(name="test_team")
         member_data = {"user_id": "new_user", "username": "New User", "is_active": True}
 
-        user = TeamService._create_or_update_user(team, member_data)
+        TeamService.create_team_with_members("test_team", [member_data])
 
-        self.assertEqual(user.id, "new_user")
+        user = User.objects.get(id="new_user")
         self.assertEqual(user.username, "New User")
         self.assertTrue(user.is_active)
         self.assertEqual(user.team, team)  # Проверяем связь с командой
 
-    def test_create_or_update_user_existing_user(self):
-        """Тест обновления существующего пользователя"""
+    def test_create_team_with_members_existing_user(self):
+        """Тест обновления существующего пользователя без команды"""
         team = Team.objects.create(name="test_team")
         User.objects.create(id="existing", username="Old Name", is_active=False)
 
         member_data = {"user_id": "existing", "username": "New Name", "is_active": True}
-        user = TeamService._create_or_update_user(team, member_data)
+        TeamService.create_team_with_members("test_team", [member_data])
 
+        user = User.objects.get(id="existing")
         self.assertEqual(user.username, "New Name")
         self.assertTrue(user.is_active)
-        self.assertEqual(user.team, team)  # Проверяем что пользователь теперь в команде
\ No newline at end of file
+        self.assertEqual(user.team, team)  # Проверяем что пользователь теперь в команде
+
+    def test_create_team_with_members_updates_existing_users(self):
+        """Тест что upsert обновляет существующих пользователей и переносит их в команду"""
+        other_team = Team.objects.create(name="other")
+        User.objects.create(id="u1", username="Old Alice", is_active=False, team=other_team)
+
+        team = TeamService.create_team_with_members(self.team_name, self.members_data)
+
+        user1 = User.objects.get(id="u1")
+        self.assertEqual(user1.username, "Alice")
+        self.assertTrue(user1.is_active)
+        self.assertEqual(user1.team, team)
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_create_team_with_members_duplicate_ids(self):
+        """Тест что при повторе user_id в списке побеждает последняя запись"""
+        members_data = self.members_data + [{"user_id": "u1", "username": "Alice 2", "is_active": False}]
+
+        TeamService.create_team_with_members(self.team_name, members_data)
+
+        user1 = User.objects.get(id="u1")
+        self.assertEqual(user1.username, "Alice 2")
+        self.assertFalse(user1.is_active)
+
+    def test_create_team_with_members_constant_queries(self):
+        """Тест что число запросов не растет вместе с числом участников"""
+        small = [{"user_id": f"s{i}", "username": f"S{i}", "is_active": True} for i in range(2)]
+        large = [{"user_id": f"l{i}", "username": f"L{i}", "is_active": True} for i in range(100)]
+
+        with self.assertNumQueries(6):
+            TeamService.create_team_with_members("small", small)
+        with self.assertNumQueries(6):
+            TeamService.create_team_with_members("large", large)
+
+
+    def _create_deactivation_fixture(self, prs_count):
+        team = Team.objects.create(name="deact")
+        users = [
+            User.objects.create(id=f"d{i}", username=f"D{i}", is_active=True, team=team)
+            for i in range(6)
+        ]
+        for i in range(prs_count):
+            pr = PullRequest.objects.create(id=f"pr-{i}", name=f"PR {i}", author=users[0])
+            pr.reviewers.add(users[1], users[2])
+        return team, users
+
+    def test_bulk_deactivate_reassigns_reviewers(self):
+        """Тест что деактивированные ревьюверы заменяются активными участниками команды"""
+        team, users = self._create_deactivation_fixture(3)
+
+        TeamService.bulk_deactivate_team_members("deact", ["d1", "d2"])
+
+        self.assertFalse(User.objects.get(id="d1").is_active)
+        self.assertFalse(User.objects.get(id="d2").is_active)
+        for pr in PullRequest.objects.prefetch_related('reviewers'):
+            reviewer_ids = {reviewer.id for reviewer in pr.reviewers.all()}
+            self.assertEqual(len(reviewer_ids), 2)
+            self.assertTrue(reviewer_ids <= {"d3", "d4", "d5"})
+
+    def test_bulk_deactivate_keeps_reviewer_without_candidates(self):
+        """Тест что без кандидатов ревьювер остается назначенным"""
+        team, users = self._create_deactivation_fixture(1)
+
+        TeamService.bulk_deactivate_team_members("deact", ["d1", "d2", "d3", "d4", "d5"])
+
+        reviewer_ids = set(PullRequest.objects.get(id="pr-0").reviewers.values_list('id', flat=True))
+        self.assertEqual(reviewer_ids, {"d1", "d2"})
+
+    def test_bulk_deactivate_skips_merged_prs(self):
+        """Тест что мерженые PR не трогаются"""
+        team, users = self._create_deactivation_fixture(1)
+        PullRequest.objects.filter(id="pr-0").update(status=PullRequest.Status.MERGED)
+
+        TeamService.bulk_deactivate_team_members("deact", ["d1"])
+
+        reviewer_ids = set(PullRequest.objects.get(id="pr-0").reviewers.values_list('id', flat=True))
+        self.assertEqual(reviewer_ids, {"d1", "d2"})
+
+    def test_bulk_deactivate_constant_queries(self):
+        """Тест что число запросов не зависит от количества открытых PR"""
+        self._create_deactivation_fixture(30)
+
+        with self.assertNumQueries(12):
+            TeamService.bulk_deactivate_team_members("deact", ["d1", "d2"])
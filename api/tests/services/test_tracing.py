@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.urls import reverse
+from api.services import TeamService
+from api.tracing import trace_log
+
+
+class TracingTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'traces.jsonl')
+        TeamService.create_team_with_members("backend", [
+            {"user_id": f"u{i}", "username": f"User {i}", "is_active": True} for i in range(1, 4)
+        ])
+
+    def tracing(self, **overrides):
+        return self.settings(**{
+            'TRACING_ENABLED': True, 'TRACING_SAMPLE_RATE': 1.0, 'TRACING_MAX_TRACES_PER_SECOND': 1000,
+            'TRACING_LOG_FILE': self.path, **overrides
+        })
+
+    def read_traces(self):
+        trace_log.flush()
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def find(self, span, name):
+        if span['name'] == name:
+            return span
+        for child in span.get('children', []):
+            found = self.find(child, name)
+            if found is not None:
+                return found
+        return None
+
+    def create_pr(self):
+        return self.client.post(reverse('api:pr-create'), {
+            "pull_request_id": "pr-1", "pull_request_name": "PR", "author_id": "u1"
+        }, content_type='application/json')
+
+    def test_trace_tree(self):
+        """Тест дерева трассы: view, метод сервиса, внутренний метод и SQL-запросы"""
+        with self.tracing():
+            response = self.create_pr()
+            traces = self.read_traces()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(traces), 1)
+        trace = traces[0]
+        self.assertEqual(trace['trace_id'], response['X-Trace-Id'])
+        root = trace['root']
+        self.assertEqual((root['name'], root['kind']), ('api:pr-create', 'view'))
+        self.assertEqual(root['attributes']['status'], 201)
+
+        create = self.find(root, 'PullRequestService.create_pull_request')
+        self.assertEqual(create['kind'], 'service')
+        self.assertIsNotNone(self.find(create, 'PullRequestService._assign_reviewers'))
+        insert = self.find(create, 'PullRequestService._insert_pull_request')
+        queries = [child for child in insert['children'] if child['kind'] == 'db']
+        self.assertTrue(any('INSERT INTO "pull_requests"' in query['attributes']['sql'] for query in queries))
+        for child in create['children']:
+            self.assertGreaterEqual(child['start_ms'], create['start_ms'])
+            self.assertLessEqual(child['duration_ms'], create['duration_ms'])
+
+    async def test_async_view_traced(self):
+        """Тест что span-ы из sync_to_async попадают в дерево async-view"""
+        with self.tracing():
+            await self.async_client.get(reverse('api:team-get'), {'team_name': 'backend'})
+            traces = await sync_to_async(self.read_traces)()
+
+        service = self.find(traces[0]['root'], 'TeamService.aget_team_with_members')
+        self.assertTrue(any(child['kind'] == 'db' for child in service['children']))
+
+    def test_sampling_and_rate_limit(self):
+        """Тест что запросы вне выборки и сверх лимита не трассируются"""
+        with self.tracing(TRACING_SAMPLE_RATE=0.0):
+            self.assertNotIn('X-Trace-Id', self.client.get(reverse('api:health-check')))
+
+        with self.tracing(TRACING_MAX_TRACES_PER_SECOND=2):
+            responses = [self.client.get(reverse('api:health-check')) for _ in range(5)]
+        self.assertLessEqual(sum('X-Trace-Id' in response for response in responses), 2)
+
+    def test_span_limit(self):
+        """Тест ограничения числа span-ов в одной трассе"""
+        with self.tracing(TRACING_MAX_SPANS=2):
+            self.create_pr()
+            trace = self.read_traces()[0]
+
+        self.assertEqual(trace['spans'], 2)
+        self.assertGreater(trace['dropped_spans'], 0)
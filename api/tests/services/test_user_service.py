@@ -54,6 +54,15 @@ class UserServiceTest(TestCase):
         with self.assertRaises(User.DoesNotExist):
             UserService.get_user_review_assignments("nonexistent")
 
+    async def test_aget_user_review_assignments(self):
+        """Тест асинхронного получения PR пользователя как ревьювера"""
+        assigned_prs = await UserService.aget_user_review_assignments("u2")
+
+        self.assertEqual([pr.id for pr in assigned_prs], ["pr-1"])
+        self.assertEqual(assigned_prs[0].author_id, self.user1.id)
+        with self.assertRaises(User.DoesNotExist):
+            await UserService.aget_user_review_assignments("nonexistent")
+
     def test_get_user_review_assignments_multiple_prs(self):
         """Тест получения нескольких PR пользователя"""
         # Создаем еще один PR с тем же ревьювером
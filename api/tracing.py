@@ -0,0 +1,179 @@
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jsonl_log import JsonlLog
+
+# Текущий span трассируемого запроса (None - запрос не трассируется)
+_current_span = ContextVar('current_span', default=None)
+
+
+class Trace:
+    """
+    Общие данные дерева span-ов одного запроса
+    """
+    __slots__ = ('trace_id', 'started_at', 'spans', 'dropped_spans')
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = timezone.now()
+        self.spans = 0
+        self.dropped_spans = 0
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'kind', 'start', 'duration', 'attributes', 'children')
+
+    def __init__(self, trace: Trace, name: str, kind: str, start: float = None, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter() if start is None else start
+        self.duration = None
+        self.attributes = attributes
+        self.children = []
+
+    def child(self, name: str, kind: str, start: float = None, attributes: dict = None):
+        """
+        Новый дочерний span или None, если в трассе уже TRACING_MAX_SPANS span-ов
+        """
+        trace = self.trace
+        if trace.spans >= settings.TRACING_MAX_SPANS:
+            trace.dropped_spans += 1
+            return None
+        trace.spans += 1
+        span = Span(trace, name, kind, start, attributes)
+        self.children.append(span)
+        return span
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def to_dict(self, origin: float) -> dict:
+        data = {
+            'name': self.name,
+            'kind': self.kind,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': None if self.duration is None else round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.children:
+            data['children'] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+class _RateLimiter:
+    """
+    Token bucket: не больше rate трасс в секунду в среднем, всплеск - до rate
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._updated = time.monotonic()
+
+    def allow(self, rate: float) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            tokens = rate if self._tokens is None else self._tokens
+            self._tokens = min(rate, tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+_rate_limiter = _RateLimiter()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_trace(name: str, attributes: dict = None):
+    """
+    Начинает трассу запроса, если он попал в выборку TRACING_SAMPLE_RATE и в лимит
+    TRACING_MAX_TRACES_PER_SECOND. Возвращает (корневой span, токен) или None
+    """
+    if not settings.TRACING_ENABLED or random.random() >= settings.TRACING_SAMPLE_RATE:
+        return None
+    if not _rate_limiter.allow(settings.TRACING_MAX_TRACES_PER_SECOND):
+        return None
+    span = Span(Trace(), name, 'view', attributes=attributes)
+    span.trace.spans = 1
+    return span, _current_span.set(span)
+
+
+def finish_trace(started):
+    """
+    Завершает трассу start_trace и ставит ее в очередь записи
+    """
+    span, token = started
+    span.finish()
+    _current_span.reset(token)
+    return trace_log.submit(span)
+
+
+def enter_span(name: str, kind: str = 'service'):
+    """
+    Открывает дочерний span текущего, возвращает токен для exit_span или None вне трассы
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    span = parent.child(name, kind)
+    if span is None:
+        return None
+    return span, _current_span.set(span)
+
+
+def exit_span(entered):
+    if entered is None:
+        return
+    span, token = entered
+    span.finish()
+    _current_span.reset(token)
+
+
+def record_query(parent: Span, alias: str, sql: str, started: float, duration: float):
+    """
+    Завершенный SQL-запрос как лист дерева
+    """
+    max_length = settings.TRACING_MAX_SQL_LENGTH
+    span = parent.child('db', 'db', started, {
+        'alias': alias,
+        'sql': sql if len(sql) <= max_length else f'{sql[:max_length]}...',
+    })
+    if span is not None:
+        span.duration = duration
+
+
+class TraceLog(JsonlLog):
+    """
+    Трассы запросов: дерево span-ов на строку JSON в файл TRACING_LOG_FILE с ротацией
+    """
+
+    def __init__(self):
+        super().__init__('TRACING')
+
+    def prepare(self, span: Span) -> dict:
+        trace = span.trace
+        entry = {
+            'trace_id': trace.trace_id,
+            'time': trace.started_at.isoformat(),
+            'spans': trace.spans,
+        }
+        if trace.dropped_spans:
+            entry['dropped_spans'] = trace.dropped_spans
+        entry['root'] = span.to_dict(span.start)
+        return entry
+
+
+trace_log = TraceLog()
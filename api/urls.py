@@ -1,5 +1,7 @@
 from django.urls import path
-from .views import team_views, user_views, health_views, pull_request_views, statistic_view
+from .views import (
+    team_views, user_views, health_views, pull_request_views, statistic_view, job_views, export_views, metrics_views
+)
 
 app_name = 'api'
 
@@ -9,9 +11,15 @@ urlpatterns = [
     path('users/setIsActive', user_views.user_set_active, name='user-set-active'),
     path('users/getReview', user_views.users_get_review, name='user-get-review'),
     path('pullRequest/create', pull_request_views.pullrequest_create, name='pr-create'),
+    path('pullRequest/bulkCreate', pull_request_views.pullrequest_bulk_create, name='pr-bulk-create'),
     path('pullRequest/merge', pull_request_views.pullrequest_merge, name='pr-merge'),
     path('pullRequest/reassign', pull_request_views.pullrequest_reassign, name='pr-reassign'),
+    path('pullRequest/bulkMerge', pull_request_views.pullrequest_bulk_merge, name='pr-bulk-merge'),
+    path('pullRequest/bulkReassign', pull_request_views.pullrequest_bulk_reassign, name='pr-bulk-reassign'),
     path('health', health_views.health_check, name='health-check'),
+    path('metrics', metrics_views.metrics_view, name='metrics'),
     path('statistic', statistic_view.stats_overview, name='statistic-view'),
     path('team/bulkDeactivate', team_views.team_bulk_deactivate, name='team-bulk-deactivate'),
+    path('jobs/get', job_views.jobs_get, name='jobs-get'),
+    path('export/pullRequests', export_views.export_pull_requests, name='export-pull-requests'),
 ]
\ No newline at end of file
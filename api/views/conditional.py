@@ -0,0 +1,45 @@
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+
+from api.response_cache import response_cache
+from api.services import VersionService
+
+
+def not_modified(request, etag: str):
+    """
+    HTTP 304 с тем же ETag, если у клиента актуальная версия (If-None-Match), иначе None.
+    UNVERSIONED_ETAG не подтверждает ничего: он же у несуществующих команд и пользователей
+    и у данных, измененных в обход сервисов, поэтому такие запросы всегда доходят до view
+    """
+    if etag == VersionService.UNVERSIONED_ETAG:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
+
+
+def cached_response(key: str, etag: str):
+    """
+    Готовый ответ из response_cache для версии etag, без ORM и сериализации, иначе None
+    """
+    if etag == VersionService.UNVERSIONED_ETAG:
+        return None
+    content = response_cache.get(key, etag)
+    if content is None:
+        return None
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+def versioned_response(key: str, etag: str, data) -> JsonResponse:
+    """
+    JSON-ответ с ETag, отрендеренные байты запоминаются в response_cache.
+    Данные без версии не кэшируются: их могли изменить в обход сервисов
+    """
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    if etag != VersionService.UNVERSIONED_ETAG:
+        response_cache.set(key, etag, response.content)
+    return response
@@ -0,0 +1,76 @@
+import json
+from datetime import timezone as dt_timezone
+
+from rest_framework import status
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.models import PullRequest
+from api.services import ExportService
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _format_datetime(value):
+    return value.strftime(DATETIME_FORMAT) if value else None
+
+
+async def _ndjson_lines(pull_requests):
+    # Асинхронный генератор: под ASGI Django отдает его по мере чтения, а синхронный итератор
+    # сначала целиком собрал бы в память
+    async for pr in pull_requests:
+        yield json.dumps({
+            'pull_request_id': pr['id'],
+            'pull_request_name': pr['name'],
+            'author_id': pr['author_id'],
+            'team_name': pr['team_name'],
+            'status': pr['status'],
+            'assigned_reviewers': pr['reviewers'],
+            'createdAt': _format_datetime(pr['created_at']),
+            'mergedAt': _format_datetime(pr['merged_at']),
+        }, ensure_ascii=False).encode() + b'\n'
+
+
+@require_GET
+async def export_pull_requests(request):
+    """GET /export/pullRequests - Потоковая выгрузка PR с ревьюверами в NDJSON"""
+    try:
+        since = request.GET.get('since')
+        pr_status = request.GET.get('status')
+        team_name = request.GET.get('team')
+
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return JsonResponse({
+                    'error': {
+                        'code': 'VALIDATION_ERROR',
+                        'message': 'since must be an ISO 8601 datetime'
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since, dt_timezone.utc)
+
+        if pr_status is not None and pr_status not in PullRequest.Status.values:
+            return JsonResponse({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': f'status must be one of {", ".join(PullRequest.Status.values)}'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        pull_requests = ExportService.aiter_pull_requests(since=since, status=pr_status, team_name=team_name)
+        return StreamingHttpResponse(_ndjson_lines(pull_requests), content_type='application/x-ndjson')
+
+    except Exception as e:
+        return JsonResponse({
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'Internal server error'
+            }
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
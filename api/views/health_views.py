@@ -1,8 +1,8 @@
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
 
-@api_view(['GET'])
-def health_check(request):
+@require_GET
+async def health_check(request):
     """GET /health - Health check"""
-    return Response({'status': 'healthy'})
\ No newline at end of file
+    return JsonResponse({'status': 'healthy'})
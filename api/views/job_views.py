@@ -0,0 +1,44 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from django.core.exceptions import ObjectDoesNotExist
+
+from api.services import JobService
+from api.serializers import JobSerializer
+
+
+@api_view(['GET'])
+def jobs_get(request):
+    """GET /jobs/get - Получить прогресс и результат фоновой задачи"""
+    try:
+        job_id = request.query_params.get('job_id')
+
+        if not job_id:
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'job_id parameter is required'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        job = JobService.get_job(job_id)
+        serializer = JobSerializer(job)
+
+        return Response({
+            'job': serializer.data
+        })
+
+    except ObjectDoesNotExist:
+        return Response({
+            'error': {
+                'code': 'NOT_FOUND',
+                'message': 'Job not found'
+            }
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'Internal server error'
+            }
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,13 @@
+from django.http import HttpResponse, Http404
+from django.conf import settings
+from django.views.decorators.http import require_GET
+
+from api import metrics
+
+
+@require_GET
+async def metrics_view(request):
+    """GET /metrics - Метрики процесса в текстовом формате Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -3,10 +3,12 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 
-from api.services import PullRequestService
+from api.idempotency import idempotent
+from api.services import PullRequestService, PR_BULK_MAX_ITEMS
 from api.serializers import PullRequestSerializer
 
 
+@idempotent
 @api_view(['POST'])
 def pullrequest_create(request):
     """POST /pullRequest/create - Создать PR"""
@@ -53,6 +55,48 @@ def pullrequest_create(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+
+@idempotent
+@api_view(['POST'])
+def pullrequest_bulk_create(request):
+    """POST /pullRequest/bulkCreate - Создать пачку PR, ошибки возвращаются по каждому PR"""
+    try:
+        items = request.data.get('pull_requests')
+
+        if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'pull_requests must be a non-empty list of objects'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(items) > PR_BULK_MAX_ITEMS:
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': f'pull_requests must contain at most {PR_BULK_MAX_ITEMS} items'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = PullRequestService.bulk_create_pull_requests(items)
+        for result in results:
+            if 'pr' in result:
+                result['pr'] = PullRequestSerializer(result['pr']).data
+
+        return Response({
+            'results': results
+        })
+
+    except Exception as e:
+        return Response({
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'Internal server error'
+            }
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@idempotent
 @api_view(['POST'])
 def pullrequest_merge(request):
     """POST /pullRequest/merge - Пометить PR как MERGED"""
@@ -90,6 +134,7 @@ def pullrequest_merge(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@idempotent
 @api_view(['POST'])
 def pullrequest_reassign(request):
     """POST /pullRequest/reassign - Переназначить ревьювера"""
@@ -133,4 +178,86 @@ def pullrequest_reassign(request):
                 'code': 'SERVER_ERROR',
                 'message': 'Internal server error'
             }
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@idempotent
+@api_view(['POST'])
+def pullrequest_bulk_merge(request):
+    """POST /pullRequest/bulkMerge - Пометить пачку PR как MERGED, ошибки возвращаются по каждому PR"""
+    try:
+        pr_ids = request.data.get('pull_request_ids')
+
+        if not isinstance(pr_ids, list) or not pr_ids or not all(isinstance(pr_id, str) and pr_id for pr_id in pr_ids):
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'pull_request_ids must be a non-empty list of ids'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(pr_ids) > PR_BULK_MAX_ITEMS:
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': f'pull_request_ids must contain at most {PR_BULK_MAX_ITEMS} items'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = PullRequestService.bulk_merge_pull_requests(pr_ids)
+        for result in results:
+            if 'pr' in result:
+                result['pr'] = PullRequestSerializer(result['pr']).data
+
+        return Response({
+            'results': results
+        })
+
+    except Exception as e:
+        return Response({
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'Internal server error'
+            }
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@idempotent
+@api_view(['POST'])
+def pullrequest_bulk_reassign(request):
+    """POST /pullRequest/bulkReassign - Переназначить пачку ревьюверов, ошибки возвращаются по каждой замене"""
+    try:
+        items = request.data.get('reassignments')
+
+        if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': 'reassignments must be a non-empty list of objects'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(items) > PR_BULK_MAX_ITEMS:
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': f'reassignments must contain at most {PR_BULK_MAX_ITEMS} items'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = PullRequestService.bulk_reassign_reviewers(items)
+        for result in results:
+            if 'pr' in result:
+                result['pr'] = PullRequestSerializer(result['pr']).data
+
+        return Response({
+            'results': results
+        })
+
+    except Exception as e:
+        return Response({
+            'error': {
+                'code': 'SERVER_ERROR',
+                'message': 'Internal server error'
+            }
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,23 +1,87 @@
+from datetime import timezone as dt_timezone
+
 from rest_framework import status
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from api.coalescing import coalesce_requests
+from api.models import PullRequest
 from api.services import StatsService
 from api.serializers import StatsSerializer
 
-@api_view(['GET'])
-def stats_overview(request):
+DATETIME_PARAMS = ['created_from', 'created_to', 'merged_from', 'merged_to']
+
+
+@require_GET
+@coalesce_requests
+async def stats_overview(request):
     """
     GET /stats/overview - Общая статистика системы
     """
     try:
-        stats = StatsService.get_review_stats()
+        filters = {}
+
+        limit = request.GET.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) == 0:
+                return JsonResponse({
+                    'error': {
+                        'code': 'VALIDATION_ERROR',
+                        'message': 'limit must be a positive integer'
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+            filters['limit'] = int(limit)
+
+        pr_status = request.GET.get('status')
+        if pr_status is not None:
+            if pr_status not in PullRequest.Status.values:
+                return JsonResponse({
+                    'error': {
+                        'code': 'VALIDATION_ERROR',
+                        'message': f'status must be one of {", ".join(PullRequest.Status.values)}'
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+            filters['status'] = pr_status
+
+        for param in DATETIME_PARAMS:
+            value = request.GET.get(param)
+            if value is None:
+                continue
+            try:
+                filters[param] = parse_datetime(value)
+            except ValueError:
+                filters[param] = None
+            if filters[param] is not None and timezone.is_naive(filters[param]):
+                filters[param] = timezone.make_aware(filters[param], dt_timezone.utc)
+            if filters[param] is None:
+                return JsonResponse({
+                    'error': {
+                        'code': 'VALIDATION_ERROR',
+                        'message': f'{param} must be an ISO 8601 datetime'
+                    }
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = await StatsService.aget_review_stats(
+            cursor=request.GET.get('cursor'),
+            user_cursor=request.GET.get('user_cursor'),
+            team_name=request.GET.get('team'),
+            **filters
+        )
         serializer = StatsSerializer(stats)
-        return Response(serializer.data)
+        return JsonResponse(serializer.data)
 
+    except ValidationError as e:
+        return JsonResponse({
+            'error': {
+                'code': e.code if hasattr(e, 'code') else 'VALIDATION_ERROR',
+                'message': str(e)
+            }
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'error': {
                 'code': 'SERVER_ERROR',
                 'message': 'Internal server error'
@@ -2,17 +2,24 @@ from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
-from api.services import TeamService
-from api.serializers import TeamSerializer
+from api.models import Team
+from api.idempotency import idempotent
+from api.services import TeamService, JobService, VersionService
+from api.views.conditional import not_modified, cached_response, versioned_response
+from api.serializers import TeamSerializer, JobSerializer
 
 
+@idempotent
 @api_view(['POST'])
 def team_add(request):
     """POST /team/add - Создать команду с участниками"""
     try:
         team_name = request.data.get('team_name')
         members_data = request.data.get('members', [])
+        review_strategy = request.data.get('review_strategy')
 
         if not team_name:
             return Response({
@@ -39,7 +46,15 @@ def team_add(request):
                     }
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-        team = TeamService.create_team_with_members(team_name, members_data)
+        if review_strategy is not None and review_strategy not in Team.ReviewStrategy.values:
+            return Response({
+                'error': {
+                    'code': 'VALIDATION_ERROR',
+                    'message': f'review_strategy must be one of {", ".join(Team.ReviewStrategy.values)}'
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        team = TeamService.create_team_with_members(team_name, members_data, review_strategy)
         serializer = TeamSerializer(team)
 
         return Response({
@@ -62,34 +77,42 @@ def team_add(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def team_get(request):
+@require_GET
+async def team_get(request):
     """GET /team/get - Получить команду с участниками"""
     try:
-        team_name = request.query_params.get('team_name')
+        team_name = request.GET.get('team_name')
 
         if not team_name:
-            return Response({
+            return JsonResponse({
                 'error': {
                     'code': 'VALIDATION_ERROR',
                     'message': 'team_name parameter is required'
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        team = TeamService.get_team_with_members(team_name)
+        # Версия читается до данных: при совпадении с If-None-Match или с версией
+        # в кэше ответов основные таблицы не читаются
+        key = VersionService.team_key(team_name)
+        etag = await VersionService.aget_team_etag(team_name)
+        cached = not_modified(request, etag) or cached_response(key, etag)
+        if cached is not None:
+            return cached
+
+        team = await TeamService.aget_team_with_members(team_name)
         serializer = TeamSerializer(team)
 
-        return Response(serializer.data)
+        return versioned_response(key, etag, serializer.data)
 
     except ObjectDoesNotExist:
-        return Response({
+        return JsonResponse({
             'error': {
                 'code': 'NOT_FOUND',
                 'message': 'Team not found'
             }
         }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'error': {
                 'code': 'SERVER_ERROR',
                 'message': 'Internal server error'
@@ -97,6 +120,7 @@ def team_get(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@idempotent
 @api_view(['POST'])
 def team_bulk_deactivate(request):
     """POST /team/bulkDeactivate - Массовая деактивация пользователей команды"""
@@ -112,6 +136,15 @@ def team_bulk_deactivate(request):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        # Опциональный фоновый режим: сразу отдаем id задачи, прогресс смотрим через /jobs/get
+        if request.data.get('async') is True:
+            job = JobService.start_bulk_deactivation(team_name, user_ids)
+            serializer = JobSerializer(job)
+
+            return Response({
+                'job': serializer.data
+            }, status=status.HTTP_202_ACCEPTED)
+
         TeamService.bulk_deactivate_team_members(team_name, user_ids)
 
         return Response({
@@ -2,11 +2,16 @@ from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
-from api.services import UserService
+from api.idempotency import idempotent
+from api.services import UserService, VersionService
+from api.views.conditional import not_modified, cached_response, versioned_response
 from api.serializers import UserSerializer, PullRequestShortSerializer
 
 
+@idempotent
 @api_view(['POST'])
 def user_set_active(request):
     """POST /users/setIsActive - Установить флаг активности пользователя"""
@@ -45,37 +50,45 @@ def user_set_active(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def users_get_review(request):
+@require_GET
+async def users_get_review(request):
     """GET /users/getReview - Получить PR'ы, где пользователь назначен ревьювером"""
     try:
-        user_id = request.query_params.get('user_id')
+        user_id = request.GET.get('user_id')
 
         if not user_id:
-            return Response({
+            return JsonResponse({
                 'error': {
                     'code': 'VALIDATION_ERROR',
                     'message': 'user_id parameter is required'
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        assigned_prs = UserService.get_user_review_assignments(user_id)
+        # Версия читается до данных: при совпадении с If-None-Match или с версией
+        # в кэше ответов основные таблицы не читаются
+        key = VersionService.user_key(user_id)
+        etag = await VersionService.aget_user_etag(user_id)
+        cached = not_modified(request, etag) or cached_response(key, etag)
+        if cached is not None:
+            return cached
+
+        assigned_prs = await UserService.aget_user_review_assignments(user_id)
         serializer = PullRequestShortSerializer(assigned_prs, many=True)
 
-        return Response({
+        return versioned_response(key, etag, {
             'user_id': user_id,
             'pull_requests': serializer.data
         })
 
     except ObjectDoesNotExist:
-        return Response({
+        return JsonResponse({
             'error': {
                 'code': 'NOT_FOUND',
                 'message': 'User not found'
             }
         }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({
+        return JsonResponse({
             'error': {
                 'code': 'SERVER_ERROR',
                 'message': 'Internal server error'
@@ -0,0 +1,44 @@
+"""
+Конфигурация gunicorn для боевого профиля (DJANGO_PROFILE=production):
+gunicorn -c gunicorn.conf.py PullRequester.asgi:application
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8080')
+
+# Воркеры - отдельные процессы с собственным пулом соединений к БД,
+# поэтому WEB_CONCURRENCY * DB_POOL_MAX_SIZE не должно превышать max_connections PostgreSQL
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Перезапуск воркеров после N запросов ограничивает рост памяти
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+# Снимки метрик воркеров для суммарного /metrics (METRICS_MULTIPROCESS_DIR в settings.py)
+metrics_dir = os.environ.get('METRICS_MULTIPROCESS_DIR', '/tmp/pr_metrics')
+
+
+def on_starting(server):
+    # Снимки прошлого запуска не должны попасть в суммы
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def worker_exit(server, worker):
+    # Вызывается в самом воркере: последние значения до его завершения
+    from api.metrics import snapshot_writer
+    snapshot_writer.write()
+
+
+def child_exit(server, worker):
+    from api.metrics import mark_process_dead
+    mark_process_dead(worker.pid, metrics_dir)